@@ -0,0 +1,187 @@
+/**
+ * Helpers for the /ws/battles protocol.
+ *
+ * battle_delta: { battle_id, seq, events, changes } carries the events
+ * appended since the previous delta and the changed top-level fields;
+ * seq is the seq of the battle's last event.
+ * battle_snapshot: { battle_id, seq, battle } carries the full battle and
+ * is sent in reply to a { type: 'snapshot', battle_id } request.
+ * battle_summaries: { battles, offset, total, next_offset } carries a page
+ * of battle summaries, most recent first; the first page is sent on
+ * connect, later ones in reply to a { type: 'summaries', offset } request.
+ * battle_created: { battle } carries the summary and queue_position of a
+ * new battle, for summary subscribers.
+ * agent_delta: { agent_id, changes } carries the changed status, ready and
+ * live fields of an agent, or { deleted: true }, for agents subscribers.
+ *
+ * Clients only receive what they subscribe to: the deltas of given
+ * battles, and/or the summary feed of every battle's deltas without events,
+ * whose changes carry the new event_count instead.
+ * A client that reconnects passes the last seq it has of each battle and
+ * first gets a battle_delta of the events it missed.
+ */
+
+/**
+ * Subscribe to battle updates
+ * @param ws - Open /ws/battles socket
+ * @param topics - Battles to follow, whether to receive the summary feed
+ *   and agent status changes, and the last seq already known of followed battles
+ */
+export function subscribeBattles(
+  ws: WebSocket | null,
+  {
+    battleIds = [],
+    summary = false,
+    agents = false,
+    resumeFrom = {}
+  }: {
+    battleIds?: string[];
+    summary?: boolean;
+    agents?: boolean;
+    resumeFrom?: Record<string, number>;
+  }
+) {
+  if (ws?.readyState === WebSocket.OPEN) {
+    ws.send(
+      JSON.stringify({
+        type: 'subscribe',
+        battle_ids: battleIds,
+        summary,
+        agents,
+        last_seq: resumeFrom
+      })
+    );
+  }
+}
+
+/**
+ * Reopen a dropped /ws/battles socket with the same handlers
+ * @param ws - Closed socket
+ * @returns The new socket
+ */
+export function reopenSocket(ws: WebSocket): WebSocket {
+  const next = new WebSocket(ws.url);
+  next.onopen = ws.onopen;
+  next.onmessage = ws.onmessage;
+  next.onerror = ws.onerror;
+  next.onclose = ws.onclose;
+  return next;
+}
+
+/**
+ * Seq of the last event of a battle
+ * @param battle - Battle with its interact_history
+ * @returns The seq, or 0 without events
+ */
+export function lastSeq(battle: any): number {
+  const history = battle?.interact_history;
+  return history?.length ? history[history.length - 1].seq ?? history.length : 0;
+}
+
+/**
+ * Apply a battle_delta to a battle
+ * @param battle - Current battle with its interact_history
+ * @param delta - battle_delta message
+ * @returns Updated copy of the battle, or null if events were missed and a snapshot is needed
+ */
+export function applyBattleDelta(battle: any, delta: any): any | null {
+  const seq = lastSeq(battle);
+  const events = (delta.events || []).filter((event: any) => event.seq > seq);
+  if (events.length && events[0].seq !== seq + 1) {
+    return null;
+  }
+  return {
+    ...battle,
+    ...delta.changes,
+    interact_history: [...(battle?.interact_history || []), ...events]
+  };
+}
+
+/**
+ * Merge a battle_delta into a list of battles
+ * @param battles - Battles shown by a list view
+ * @param delta - battle_delta message
+ * @returns Updated list; unknown battles are added once their fields are known,
+ *   with the delta's events as their history only if it starts at the first event
+ */
+export function mergeBattleDelta(battles: any[], delta: any): any[] {
+  const idx = battles.findIndex((b) => b.battle_id === delta.battle_id);
+  if (idx === -1) {
+    if (!delta.changes?.battle_id) return battles;
+    const events = delta.events || [];
+    const complete = events.length ? events[0].seq === 1 : !delta.seq;
+    const { interact_history, ...fields } = delta.changes;
+    return [complete ? { ...fields, interact_history: events } : fields, ...battles];
+  }
+  const battle = battles[idx];
+  const updated = applyBattleDelta(battle, delta) ?? { ...battle, ...delta.changes };
+  return battles.map((b, i) => (i === idx ? updated : b));
+}
+
+/**
+ * Merge a battle_summaries page into a list of battles
+ * @param battles - Battles shown by a list view
+ * @param summaries - battle_summaries message
+ * @returns Updated list; known battles keep the fields summaries lack
+ */
+export function mergeBattleSummaries(battles: any[], summaries: any): any[] {
+  const byId = new Map(battles.map((b) => [b.battle_id, b]));
+  for (const summary of summaries.battles || []) {
+    byId.set(summary.battle_id, { ...byId.get(summary.battle_id), ...summary });
+  }
+  return [...byId.values()];
+}
+
+/**
+ * Apply an agent_delta to a list of agents
+ * @param agents - Agents shown by a view
+ * @param delta - agent_delta message
+ * @returns Updated list; unknown agents are left out
+ */
+export function applyAgentDelta(agents: any[], delta: any): any[] {
+  if (delta.changes?.deleted) {
+    return agents.filter((a) => (a.agent_id || a.id) !== delta.agent_id);
+  }
+  return agents.map((a) =>
+    (a.agent_id || a.id) === delta.agent_id ? { ...a, ...delta.changes } : a
+  );
+}
+
+/**
+ * Ask the server for a page of battle_summaries
+ * @param ws - Open /ws/battles socket
+ * @param offset - Number of (most recent) battles to skip
+ */
+export function requestBattleSummaries(ws: WebSocket | null, offset: number) {
+  if (ws?.readyState === WebSocket.OPEN) {
+    ws.send(JSON.stringify({ type: 'summaries', offset }));
+  }
+}
+
+/**
+ * Ask the server for a battle_snapshot
+ * @param ws - Open /ws/battles socket
+ * @param battleId - The unique identifier of the battle
+ */
+export function requestBattleSnapshot(ws: WebSocket | null, battleId: string) {
+  if (ws?.readyState === WebSocket.OPEN) {
+    ws.send(JSON.stringify({ type: 'snapshot', battle_id: battleId }));
+  }
+}
+
+/**
+ * Answer the server's connection-level messages
+ * @param ws - Open /ws/battles socket
+ * @param msg - Parsed message
+ * @returns True if msg needs no further handling
+ */
+export function handleControlMessage(ws: WebSocket | null, msg: any): boolean {
+  if (msg?.type === 'heartbeat') {
+    // The server disconnects clients that stay silent
+    if (ws?.readyState === WebSocket.OPEN) {
+      ws.send(JSON.stringify({ type: 'ack' }));
+    }
+    return true;
+  }
+  return msg?.type === 'pong' || msg?.type === 'subscribed';
+}
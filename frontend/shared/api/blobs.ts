@@ -0,0 +1,50 @@
+/**
+ * Large event payloads are stored by the backend as content-addressed
+ * blobs; an event then carries `blobs: { [field]: { hash, size, content_type } }`
+ * instead of the field itself. Blobs never change, so they are cached by hash.
+ */
+const blobCache = new Map<string, Promise<any>>();
+
+/**
+ * Fetch the content of a blob
+ * @param ref - Blob reference from an event's `blobs` map
+ * @returns Promise with the parsed JSON or text content
+ */
+export function fetchBlob(ref: { hash: string; content_type: string }) {
+  let content = blobCache.get(ref.hash);
+  if (!content) {
+    content = fetch(`/api/blobs/${ref.hash}`).then(async (res) => {
+      if (!res.ok) {
+        throw new Error(`Failed to fetch blob ${ref.hash}: ${res.status}`);
+      }
+      return ref.content_type === 'application/json' ? res.json() : res.text();
+    });
+    blobCache.set(ref.hash, content);
+    content.catch(() => blobCache.delete(ref.hash));
+  }
+  return content;
+}
+
+/**
+ * Resolve the blob references of events into their fields
+ * @param events - Battle events, e.g. a battle's interact_history
+ * @returns Promise with copies of the events carrying their full payloads
+ */
+export async function inlineBlobs(events: any[] = []) {
+  return Promise.all(
+    events.map(async (event) => {
+      if (!event?.blobs) return event;
+      const { blobs, ...inlined } = event;
+      await Promise.all(
+        Object.entries(blobs).map(async ([field, ref]: [string, any]) => {
+          try {
+            inlined[field] = await fetchBlob(ref);
+          } catch (error) {
+            console.error('Failed to fetch event payload:', error);
+          }
+        })
+      );
+      return inlined;
+    })
+  );
+}
@@ -10,6 +10,10 @@ export default defineConfig({
 		exclude: ['@lucide/svelte']
 	},
 	server: {
+    fs: {
+      // $shared lives outside the app
+      allow: ['../shared']
+    },
     proxy: {
       '/api': {
         target: 'http://localhost:9000',
@@ -44,6 +44,20 @@ export async function fetchAgentCard(agentUrl: string) {
   }
 }
 
+export async function getAgentBattles(agentId: string, limit: number = 50, offset: number = 0) {
+  try {
+    const res = await fetch(`/api/agents/${agentId}/battles?limit=${limit}&offset=${offset}`);
+    if (!res.ok) {
+      const errorData = await res.json();
+      throw new Error(errorData.detail || 'Failed to fetch agent battles');
+    }
+    return await res.json();
+  } catch (error) {
+    console.error('Failed to fetch agent battles:', error);
+    throw error;
+  }
+}
+
 export async function getAgentById(agentId: string) {
   try {
     const res = await fetch(`/api/agents/${agentId}`);
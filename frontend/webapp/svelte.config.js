@@ -13,7 +13,11 @@ const config = {
 		// See https://svelte.dev/docs/kit/adapters for more information about adapters.
 		adapter: adapter({
 			out: 'build'
-		})
+		}),
+		// Helpers shared with webapp-v2
+		alias: {
+			$shared: '../shared'
+		}
 	}
 };
 
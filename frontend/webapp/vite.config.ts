@@ -8,6 +8,10 @@ export default defineConfig({
 		exclude: ['@lucide/svelte']
 	},
 	server: {
+    fs: {
+      // $shared lives outside the app
+      allow: ['../shared']
+    },
     proxy: {
       '/api': {
         target: process.env.BACKEND_URL || 'http://localhost:9000',
@@ -6,6 +6,7 @@ AgentBeats SDK implementation for the AgentBeats platform.
 
 import os
 import json
+import hashlib
 import tomllib
 import uvicorn
 import functools
@@ -29,12 +30,17 @@ from agents import (
 from agents.mcp import MCPServerSse
 from openai import AsyncOpenAI
 
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
 from a2a.server.apps import A2AStarletteApplication
 from a2a.server.tasks import TaskUpdater, InMemoryTaskStore
 from a2a.server.agent_execution import AgentExecutor, RequestContext
 from a2a.server.request_handlers import DefaultRequestHandler
 from a2a.server.events import EventQueue
 from a2a.utils import new_task, new_agent_text_message
+from a2a.utils.constants import AGENT_CARD_WELL_KNOWN_PATH
 from a2a.types import Part, TextPart, TaskState, AgentCard
 from a2a.types import Part, TextPart, TaskState, AgentCard, Message
 
@@ -69,6 +75,9 @@ __all__ = [
     "AgentBeatsExecutor",
 ]
 
+# Served by every agent, lets the launcher clear battle state in place
+SOFT_RESET_PATH = "/agentbeats/reset"
+
 
 def create_agent(
     agent_name: str,
@@ -155,6 +164,9 @@ class BeatsAgent:
         self.mcp_url_list: List[str] = []
         self.agent_card_json = None
         self.app = None
+        self.executor: Optional[AgentBeatsExecutor] = None
+        self._card_body: bytes = b""
+        self._card_etag: str = ""
 
     def load_agent_card(self, card_path: str):
         """Load agent card from a TOML file."""
@@ -190,19 +202,52 @@ class BeatsAgent:
 
     def _make_app(self) -> None:
         """Asynchronously create the application instance for the agent."""
+        self.executor = AgentBeatsExecutor(
+            agent_card_json=self.agent_card_json,
+            model_type=self.model_type,
+            model_name=self.model_name,
+            mcp_url_list=self.mcp_url_list,
+            tool_list=self.tool_list,
+        )
+        agent_card = AgentCard(**self.agent_card_json)
+        self._card_body = json.dumps(
+            agent_card.model_dump(exclude_none=True, by_alias=True)
+        ).encode("utf-8")
+        self._card_etag = f'"{hashlib.sha256(self._card_body).hexdigest()[:32]}"'
         self.app = A2AStarletteApplication(
-            agent_card=AgentCard(**self.agent_card_json),
+            agent_card=agent_card,
             http_handler=DefaultRequestHandler(
-                agent_executor=AgentBeatsExecutor(
-                    agent_card_json=self.agent_card_json,
-                    model_type=self.model_type,
-                    model_name=self.model_name,
-                    mcp_url_list=self.mcp_url_list,
-                    tool_list=self.tool_list,
-                ),
+                agent_executor=self.executor,
                 task_store=InMemoryTaskStore(),
             ),
-        ).build()
+        ).build(
+            routes=[
+                # Matched before the A2A card route, which sends no ETag
+                Route(
+                    AGENT_CARD_WELL_KNOWN_PATH,
+                    self._agent_card_endpoint,
+                    methods=["GET"],
+                ),
+                Route(
+                    SOFT_RESET_PATH,
+                    self._soft_reset_endpoint,
+                    methods=["POST"],
+                )
+            ]
+        )
+
+    async def _agent_card_endpoint(self, request: Request) -> Response:
+        """The agent card with an ETag, so card caches revalidate with a 304."""
+        headers = {"ETag": self._card_etag}
+        if_none_match = request.headers.get("if-none-match", "")
+        if self._card_etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+        return Response(self._card_body, media_type="application/json", headers=headers)
+
+    async def _soft_reset_endpoint(self, request: Request) -> JSONResponse:
+        """Used by the launcher to reuse this process for the next battle."""
+        self.executor.soft_reset()
+        return JSONResponse({"status": "reset", "mode": "soft"})
 
     def _register_tool(self, func: Callable, name: str | None = None):
         """Register a tool function with the agent."""
@@ -245,6 +290,7 @@ class AgentBeatsExecutor(AgentExecutor):
         self.model_type = model_type
         self.model_name = model_name
         self.chat_history: List[Dict[str, str]] = []
+        self._reset_generation = 0
 
         self.mcp_url_list = mcp_url_list or []
         self.mcp_list = [
@@ -419,8 +465,11 @@ class AgentBeatsExecutor(AgentExecutor):
             }
         ]
 
+        generation = self._reset_generation
         result = await Runner.run(self.main_agent, query_ctx, max_turns=100)
-        self.chat_history = result.to_input_list()
+        if generation == self._reset_generation:
+            # Don't resurrect the history of a battle that was soft reset meanwhile
+            self.chat_history = result.to_input_list()
         # print(self.chat_history)
 
         # print agent output
@@ -511,6 +560,16 @@ class AgentBeatsExecutor(AgentExecutor):
         )
         await updater.complete()
 
+    def soft_reset(self) -> None:
+        """
+        Clear the conversation and battle context in place, keeping the
+        initialized agent and its MCP connections for the next battle.
+        """
+        self._reset_generation += 1
+        self.chat_history = []
+        set_battle_context({})
+        print("[AgentBeatsExecutor] Soft reset, conversation and battle context cleared.")
+
     async def cancel(
         self, context: RequestContext, event_queue: EventQueue
     ) -> None:
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import time
+import httpx
 import asyncio
 import uvicorn
 import requests
@@ -13,7 +14,8 @@ from typing import List, Optional
 from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
 
-from agentbeats.utils.agents import get_agent_card
+from agentbeats.utils.agents import agent_card_cache, get_agent_card, get_http_client
+from agentbeats.agent_executor import SOFT_RESET_PATH
 
 __all__ = ["BeatsAgentLauncher"]
 
@@ -23,6 +25,7 @@ class _SignalPayload(BaseModel):
     signal: str
     agent_id: str
     extra_args: Optional[dict] = None
+    mode: str = "hard"  # requested reset mode, "soft" or "hard"
 
 
 class BeatsAgentLauncher:
@@ -39,9 +42,15 @@ class BeatsAgentLauncher:
             {"arg1": "value1"}} will restart the agent.
         The server will respond to backend_url/agents/{agent_id} with
         {"ready": true} when the agent is ready.
+    A reset may ask for "mode": "soft", in which case the running agent
+    only clears its conversation and battle context in place. The launcher
+    falls back to a hard restart whenever that is not possible, and reports
+    the mode it actually used in the response.
     """
 
     AGENT_KILL_TIMEOUT = 5
+    SOFT_RESET_TIMEOUT = 5
+    RESET_MODES = ["hard", "soft"]
 
     def __init__(
         self,
@@ -100,6 +109,9 @@ class BeatsAgentLauncher:
 
         return cmd
 
+    def _agent_url(self) -> str:
+        return f"http://{self.agent_host}:{self.agent_port}"
+
     def _start_agent(self) -> subprocess.Popen:
         print("[Launcher] Starting agent with command:", " ".join(self._agent_cmd()))
         return subprocess.Popen(self._agent_cmd())
@@ -119,31 +131,56 @@ class BeatsAgentLauncher:
         attempt = 0
         
         while attempt < max_attempts:
-            await asyncio.sleep(2)  # Wait 2 seconds between checks
             attempt += 1
 
-            agent_card = await get_agent_card(f"http://{self.agent_host}:{self.agent_port}")
-            if agent_card:
-                try:
-                    requests.put(
-                        f"{backend_url}/agents/{agent_id}",
-                        json={"ready": True},
-                        timeout=5,
-                    )
-                    print(f"[Launcher] Successfully notified backend that agent {agent_id} is ready")
-                    return
-                except requests.RequestException as e:
-                    print(f"[Launcher] WARNING: failed to notify backend: {e}")
-                    return
+            # A soft reset agent answers right away, a restarted one takes a while
+            agent_card = await get_agent_card(self._agent_url())
+            if not agent_card:
+                await asyncio.sleep(2)  # Wait 2 seconds between checks
+                continue
+
+            try:
+                requests.put(
+                    f"{backend_url}/agents/{agent_id}",
+                    json={"ready": True},
+                    timeout=5,
+                )
+                print(f"[Launcher] Successfully notified backend that agent {agent_id} is ready")
+                return
+            except requests.RequestException as e:
+                print(f"[Launcher] WARNING: failed to notify backend: {e}")
+                return
         
         print(f"[Launcher] WARNING: Agent {agent_id} did not become ready within timeout")
 
+    async def _soft_reset_agent(self) -> bool:
+        """Ask the running agent to clear its state in place."""
+        if not self._agent_proc or self._agent_proc.poll() is not None:
+            return False
+        try:
+            response = await get_http_client().post(
+                f"{self._agent_url()}{SOFT_RESET_PATH}",
+                timeout=self.SOFT_RESET_TIMEOUT,
+            )
+            return response.status_code == 200
+        except httpx.HTTPError as e:
+            print(f"[Launcher] WARNING: soft reset failed: {e}")
+            return False
+
     # reset router
     async def _reset_endpoint(self, payload: _SignalPayload) -> dict:
         if payload.signal != "reset":
             raise HTTPException(400, "unsupported signal")
 
+        # The readiness check must see the reset agent, not a cached card
+        agent_card_cache.invalidate(self._agent_url())
         async with self._state_lock:
+            if payload.mode == "soft" and await self._soft_reset_agent():
+                asyncio.create_task(
+                    self._wait_for_agent_and_notify(payload.backend_url, payload.agent_id)
+                )
+                return {"status": "reset", "mode": "soft", "pid": self._agent_proc.pid}
+
             self._terminate_agent()
             self._agent_proc = self._start_agent()
             
@@ -152,7 +189,7 @@ class BeatsAgentLauncher:
                 self._wait_for_agent_and_notify(payload.backend_url, payload.agent_id)
             )
 
-            return {"status": "restarting", "pid": self._agent_proc.pid}
+            return {"status": "restarting", "mode": "hard", "pid": self._agent_proc.pid}
 
     
     def _build_app(self) -> FastAPI:
@@ -166,9 +203,11 @@ class BeatsAgentLauncher:
         async def _status():
             if self._agent_proc and self._agent_proc.poll() is None:
                 return {"status":   "server up, with agent running", 
-                        "pid":      self._agent_proc.pid}
+                        "pid":      self._agent_proc.pid,
+                        "reset_modes": self.RESET_MODES}
             else:
-                return {"status": "server up, no agents running"}
+                return {"status": "server up, no agents running",
+                        "reset_modes": self.RESET_MODES}
 
         return app
 
@@ -23,6 +23,14 @@ from .logging import (
     update_battle_process, 
 )
 
+# Background event upload
+from .reporter import (
+    EventReporter,
+    get_reporter,
+    flush_events,
+)
+from .spool import EventSpool
+
 # Interaction history functions
 from .interaction_history import (
     record_battle_event,
@@ -41,6 +49,12 @@ __all__ = [
     'log_shutdown',
     'update_battle_process',
     
+    # Background event upload
+    'EventReporter',
+    'get_reporter',
+    'flush_events',
+    'EventSpool',
+
     # Interaction history
     'record_battle_event',
     'record_battle_result',
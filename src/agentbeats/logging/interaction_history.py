@@ -4,7 +4,6 @@ Interaction history utilities for AgentBeats scenarios.
 """
 
 import logging
-import requests
 from datetime import datetime
 from typing import Dict, Any, Optional
 
@@ -13,6 +12,9 @@ logger = logging.getLogger(__name__)
 
 # Import context management
 from .context import BattleContext
+from .reporter import (
+    DEFAULT_TIMEOUT, RESULT_SENT, RESULT_SPOOLED, report_event, report_result,
+)
 
 def record_battle_event(
     context: BattleContext,
@@ -27,21 +29,11 @@ def record_battle_event(
         "timestamp": datetime.utcnow().isoformat() + "Z",
         "detail": detail or {},
     }
-    try:
-        response = requests.post(
-            f"{context.backend_url}/battles/{context.battle_id}",
-            json=event_data,
-            headers={"Content-Type": "application/json"},
-            timeout=10
-        )
-        if response.status_code == 204:
-            logger.info("Successfully recorded battle event to backend for battle %s", context.battle_id)
-            return 'event recorded to backend'
-        else:
-            logger.error("Failed to record battle event to backend for battle %s: %s", context.battle_id, response.text)
-            return 'event recording to backend failed'
-    except Exception as e:
-        logger.error("Exception recording battle event to backend for battle %s: %s", context.battle_id, str(e))
+    if report_event(context.backend_url, context.battle_id, event_data):
+        logger.info("Queued battle event to backend for battle %s", context.battle_id)
+        return 'event recorded to backend'
+    else:
+        logger.error("Failed to record battle event to backend for battle %s: event dropped", context.battle_id)
         return 'event recording to backend failed'
 
 
@@ -51,7 +43,11 @@ def record_battle_result(
     winner: str,
     detail: Optional[Dict[str, Any]] = None
 ) -> str:
-    """Record the final battle result to the backend server."""
+    """
+    Record the final battle result to the backend server.
+    Blocks until the result and all previously queued events were sent,
+    or spooled for upload once the backend is reachable again.
+    """
     result_data = {
         "is_result": True,
         "message": message,
@@ -60,21 +56,16 @@ def record_battle_result(
         "reported_by": context.agent_name,
         "detail": detail or {},
     }
-    try:
-        response = requests.post(
-            f"{context.backend_url}/battles/{context.battle_id}",
-            json=result_data,
-            headers={"Content-Type": "application/json"},
-            timeout=10
-        )
-        if response.status_code == 204:
-            logger.info("Successfully recorded battle result to backend for battle %s", context.battle_id)
-            return f'battle result recorded to backend: winner={winner}'
-        else:
-            logger.error("Failed to record battle result to backend for battle %s: %s", context.battle_id, response.text)
-            return 'result recording to backend failed'
-    except Exception as e:
-        logger.error("Exception recording battle result to backend for battle %s: %s", context.battle_id, str(e))
+    # The battle ends here: send the result with everything still queued
+    delivery = report_result(context.backend_url, context.battle_id, result_data, DEFAULT_TIMEOUT)
+    if delivery == RESULT_SENT:
+        logger.info("Successfully recorded battle result to backend for battle %s", context.battle_id)
+        return f'battle result recorded to backend: winner={winner}'
+    elif delivery == RESULT_SPOOLED:
+        logger.warning("Backend unreachable, spooled battle result for battle %s", context.battle_id)
+        return f'battle result spooled, will be uploaded when the backend is back: winner={winner}'
+    else:
+        logger.error("Failed to record battle result to backend for battle %s", context.battle_id)
         return 'result recording to backend failed'
 
 
@@ -93,19 +84,9 @@ def record_agent_action(
         "detail": detail or {},
         "interaction_details": interaction_details or {},
     }
-    try:
-        response = requests.post(
-            f"{context.backend_url}/battles/{context.battle_id}",
-            json=event_data,
-            headers={"Content-Type": "application/json"},
-            timeout=10
-        )
-        if response.status_code == 204:
-            logger.info("Successfully recorded agent action to backend for battle %s", context.battle_id)
-            return 'action recorded to backend'
-        else:
-            logger.error("Failed to record agent action to backend for battle %s: %s", context.battle_id, response.text)
-            return 'action recording to backend failed'
-    except Exception as e:
-        logger.error("Exception recording agent action to backend for battle %s: %s", context.battle_id, str(e))
-        return 'action recording to backend failed' 
\ No newline at end of file
+    if report_event(context.backend_url, context.battle_id, event_data):
+        logger.info("Queued agent action to backend for battle %s", context.battle_id)
+        return 'action recorded to backend'
+    else:
+        logger.error("Failed to record agent action to backend for battle %s: event dropped", context.battle_id)
+        return 'action recording to backend failed'
@@ -4,7 +4,6 @@ System logging utilities for AgentBeats scenarios.
 """
 
 import logging
-import requests
 from datetime import datetime
 from typing import Dict, Any, Optional
 
@@ -13,6 +12,7 @@ _logger = logging.getLogger(__name__)
 
 # Import context management
 from .context import BattleContext
+from .reporter import report_event
 
 
 def update_battle_process(
@@ -28,6 +28,7 @@ def update_battle_process(
 ) -> str:
     """
     Log battle process updates to backend API.
+    The event is queued and uploaded in the background.
     """
     event_data = {
         "is_result": False,
@@ -48,18 +49,10 @@ def update_battle_process(
     if asciinema_url:
         event_data["asciinema_url"] = asciinema_url
 
-    try:
-        requests.post(
-            f"{backend_url}/battles/{battle_id}",
-            json=event_data,
-            headers={"Content-Type": "application/json"},
-            timeout=10,
-        )
-    except Exception as e:
+    if not report_event(backend_url, battle_id, event_data):
         _logger.error(
-            "Error when recording to backend for battle %s: %s",
+            "Error when recording to backend for battle %s: event dropped",
             battle_id,
-            str(e),
         )
         return False
 
@@ -72,22 +65,18 @@ def update_battle_process(
 def _make_api_request(
     context: BattleContext, endpoint: str, data: Dict[str, Any]
 ) -> bool:
-    """Make API request to backend and return success status."""
-    try:
-        response = requests.post(
-            f"{context.backend_url}/battles/{context.battle_id}/{endpoint}",
-            json=data,
-            headers={"Content-Type": "application/json"},
-            timeout=10,
-        )
-        return response.status_code == 204
-    except requests.exceptions.RequestException as e:
-        _logger.error(
-            "Network error when recording to backend for battle %s: %s",
-            context.battle_id,
-            str(e),
-        )
-        return False
+    """
+    Queue a system event (endpoint names its kind) as a battle log entry
+    and return whether it was accepted for upload.
+    """
+    event_data = {
+        "is_result": False,
+        "message": data.get("event_type", endpoint),
+        "reported_by": context.agent_name,
+        "timestamp": data.get("timestamp", datetime.utcnow().isoformat() + "Z"),
+        "detail": data,
+    }
+    return report_event(context.backend_url, context.battle_id, event_data)
 
 
 def log_ready(
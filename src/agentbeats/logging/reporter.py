@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""
+Background reporter that uploads battle events to the backend in batches.
+"""
+
+import atexit
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import requests
+
+from .spool import EventSpool, SpoolReplayer, SEND_OK, SEND_RETRY, SEND_DROP
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_QUEUE = 10000
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_FLUSH_INTERVAL = 0.5
+DEFAULT_TIMEOUT = 10
+DEFAULT_MAX_RETRIES = 3
+EXIT_FLUSH_TIMEOUT = 5
+
+# How a result was delivered, see EventReporter.send_result
+RESULT_SENT = "sent"
+RESULT_SPOOLED = "spooled"
+RESULT_FAILED = "failed"
+
+# (enqueued_at, backend_url, battle_id, event)
+_Item = Tuple[float, str, str, Dict[str, Any]]
+
+
+class EventReporter:
+    """
+    Uploads battle events from a background thread.
+
+    Events are queued without blocking the caller (up to max_queue, newer
+    events are dropped beyond that) and posted to the backend's
+    /battles/{battle_id}/events:batch endpoint over a keep-alive session.
+    A batch is sent once batch_size events are pending or the oldest one
+    waited flush_interval seconds. Results and flush() send immediately.
+
+    Every event gets an idempotency_key, so the backend can drop repeated
+    uploads. With a spool, batches the backend could not take (network
+    errors, 5xx) are written to it and replayed in the background; while
+    it holds events, new ones are spooled behind them to keep their order.
+    The replayer posts over a session of its own, requests.Session not
+    being thread-safe, and stats are only updated under the condition.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        spool: Optional[EventSpool] = None,
+    ):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.max_retries = max_retries
+
+        self._cond = threading.Condition()
+        self._pending: Deque[_Item] = deque()
+        self._submitted = 0
+        self._completed = 0
+        self._urgent = False
+        self._closed = False
+        # idempotency_key -> delivery of results someone waits on
+        self._results: Dict[str, Optional[str]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._session = _new_session()
+        self.stats = {"sent": 0, "failed": 0, "dropped": 0, "batches": 0, "spooled": 0}
+
+        self.spool = spool
+        self._replayer: Optional[SpoolReplayer] = None
+        self._replay_session: Optional[requests.Session] = None
+        if spool is not None:
+            self._replay_session = _new_session()
+            self._replayer = SpoolReplayer(spool, self._replay)
+            if spool.has_pending():
+                self._replayer.start()
+
+    def submit(self, backend_url: str, battle_id: str, event: Dict[str, Any]) -> bool:
+        """Queue an event for upload. Returns False if it had to be dropped."""
+        event = dict(event)
+        event.setdefault("idempotency_key", uuid.uuid4().hex)
+        with self._cond:
+            if self._closed or len(self._pending) >= self.max_queue:
+                self.stats["dropped"] += 1
+                logger.error(
+                    "Event queue full, dropping event for battle %s", battle_id
+                )
+                return False
+            self._pending.append((time.monotonic(), backend_url, battle_id, event))
+            self._submitted += 1
+            if event.get("is_result"):
+                # The battle is over, don't hold its last events back
+                self._urgent = True
+            if self._urgent or len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+            self._ensure_thread()
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Send every event submitted so far and wait until they were handled.
+        Returns False if timeout expired first.
+        """
+        with self._cond:
+            target = self._submitted
+            self._urgent = True
+            self._cond.notify_all()
+            return self._cond.wait_for(
+                lambda: self._completed >= target, timeout
+            )
+
+    def send_result(
+        self,
+        backend_url: str,
+        battle_id: str,
+        event: Dict[str, Any],
+        timeout: Optional[float] = None,
+    ) -> str:
+        """
+        Queue a result, flush it with everything queued before it and
+        return how it was delivered: RESULT_SENT once the backend took it,
+        RESULT_SPOOLED if it only reached the spool, else RESULT_FAILED.
+        """
+        event = dict(event)
+        key = event.setdefault("idempotency_key", uuid.uuid4().hex)
+        with self._cond:
+            self._results[key] = None
+        try:
+            if self.submit(backend_url, battle_id, event) and self.flush(timeout):
+                with self._cond:
+                    return self._results[key] or RESULT_FAILED
+            return RESULT_FAILED
+        finally:
+            with self._cond:
+                self._results.pop(key, None)
+
+    def close(self, timeout: Optional[float] = EXIT_FLUSH_TIMEOUT):
+        """Flush pending events and stop the background thread."""
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._replayer is not None:
+            self._replayer.stop()
+        if self.spool is not None:
+            self.spool.close()
+            self._replay_session.close()
+        self._session.close()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="agentbeats-event-reporter", daemon=True
+            )
+            self._thread.start()
+
+    def _next_batch(self) -> List[_Item]:
+        """Wait for the next batch to send; empty once closed and drained."""
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._urgent = False
+                self._cond.wait()
+            while (
+                self._pending
+                and len(self._pending) < self.batch_size
+                and not self._urgent
+                and not self._closed
+            ):
+                remaining = self._pending[0][0] + self.flush_interval - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            count = min(len(self._pending), self.batch_size)
+            return [self._pending.popleft() for _ in range(count)]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            try:
+                for backend_url, battle_id, events in _group_batch(batch):
+                    delivery = self._send(backend_url, battle_id, events)
+                    with self._cond:
+                        for event in events:
+                            if event["idempotency_key"] in self._results:
+                                self._results[event["idempotency_key"]] = delivery
+            except Exception as e:
+                logger.error("Unexpected error in event reporter: %s", str(e))
+            finally:
+                with self._cond:
+                    self._completed += len(batch)
+                    self._cond.notify_all()
+
+    def _send(self, backend_url: str, battle_id: str, events: List[Dict[str, Any]]) -> str:
+        """
+        Post one batch of a battle, retrying while the backend asks to back
+        off. Batches it could not take are spooled when there is a spool.
+        Returns RESULT_SENT, RESULT_SPOOLED or RESULT_FAILED.
+        """
+        if self.spool is not None and self.spool.has_pending():
+            return self._spool(backend_url, battle_id, events)
+        for attempt in range(self.max_retries + 1):
+            outcome, retry_after = self._post(
+                self._session, backend_url, battle_id, events
+            )
+            if retry_after is None or attempt == self.max_retries:
+                break
+            time.sleep(retry_after)
+        if outcome == SEND_OK:
+            return RESULT_SENT
+        if outcome == SEND_RETRY and self.spool is not None:
+            return self._spool(backend_url, battle_id, events)
+        self._count("failed", len(events))
+        return RESULT_FAILED
+
+    def _count(self, name: str, amount: int = 1):
+        """Add to a stats counter; both the reporter and replayer threads do."""
+        with self._cond:
+            self.stats[name] += amount
+
+    def _post(
+        self,
+        session: requests.Session,
+        backend_url: str,
+        battle_id: str,
+        events: List[Dict[str, Any]],
+    ) -> Tuple[str, Optional[float]]:
+        """
+        Post one batch once over session. Returns SEND_OK, SEND_RETRY or
+        SEND_DROP, and the seconds to wait if the backend asked to back off.
+        """
+        url = f"{backend_url}/battles/{battle_id}/events:batch"
+        try:
+            response = session.post(url, json=events, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            logger.error(
+                "Network error when recording to backend for battle %s: %s",
+                battle_id,
+                str(e),
+            )
+            return SEND_RETRY, None
+        if response.ok:
+            with self._cond:
+                self.stats["sent"] += len(events)
+                self.stats["batches"] += 1
+            return SEND_OK, None
+        if response.status_code in (429, 503):
+            return SEND_RETRY, _retry_after(response)
+        logger.error(
+            "Failed to record %d events to backend for battle %s: %s",
+            len(events),
+            battle_id,
+            response.text,
+        )
+        if response.status_code >= 500:
+            return SEND_RETRY, None
+        return SEND_DROP, None
+
+    def _replay(self, backend_url: str, battle_id: str, events: List[Dict[str, Any]]) -> str:
+        """Upload a batch read back from the spool; the replayer does the backoff."""
+        return self._post(self._replay_session, backend_url, battle_id, events)[0]
+
+    def _spool(self, backend_url: str, battle_id: str, events: List[Dict[str, Any]]) -> str:
+        try:
+            self.spool.append(backend_url, battle_id, events)
+        except OSError as e:
+            logger.error("Failed to spool events for battle %s: %s", battle_id, str(e))
+            self._count("failed", len(events))
+            return RESULT_FAILED
+        self._count("spooled", len(events))
+        self._replayer.start()
+        self._replayer.wake()
+        return RESULT_SPOOLED
+
+
+def _new_session() -> requests.Session:
+    session = requests.Session()
+    session.headers.update({"Content-Type": "application/json"})
+    return session
+
+
+def _retry_after(response: requests.Response) -> float:
+    """Seconds to wait before retrying, from the Retry-After header."""
+    try:
+        return max(0.0, float(response.headers.get("Retry-After", 1)))
+    except ValueError:
+        return 1.0
+
+
+def _group_batch(batch: List[_Item]) -> List[Tuple[str, str, List[Dict[str, Any]]]]:
+    """
+    Split a batch into per-battle event lists, keeping their order.
+    A result closes its battle's list, since it must be the last event
+    of a request.
+    """
+    groups: List[Tuple[str, str, List[Dict[str, Any]]]] = []
+    open_groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for _, backend_url, battle_id, event in batch:
+        key = (backend_url, battle_id)
+        events = open_groups.get(key)
+        if events is None:
+            events = open_groups[key] = []
+            groups.append((backend_url, battle_id, events))
+        events.append(event)
+        if event.get("is_result"):
+            del open_groups[key]
+    return groups
+
+
+_reporter: Optional[EventReporter] = None
+_reporter_lock = threading.Lock()
+
+
+def get_reporter() -> EventReporter:
+    """
+    Return the process-wide event reporter, creating it on first use.
+    It spools failed uploads under AGENTBEATS_SPOOL_DIR.
+    """
+    global _reporter
+    with _reporter_lock:
+        if _reporter is None:
+            try:
+                spool = EventSpool()
+            except OSError as e:
+                logger.error("Event spool unavailable: %s", str(e))
+                spool = None
+            _reporter = EventReporter(spool=spool)
+            atexit.register(_reporter.close)
+        return _reporter
+
+
+def report_event(backend_url: str, battle_id: str, event: Dict[str, Any]) -> bool:
+    """Queue a battle event for upload by the process-wide reporter."""
+    return get_reporter().submit(backend_url, battle_id, event)
+
+
+def report_result(
+    backend_url: str, battle_id: str, event: Dict[str, Any], timeout: Optional[float] = None
+) -> str:
+    """
+    Upload a battle result with the events queued before it, returning
+    RESULT_SENT, RESULT_SPOOLED or RESULT_FAILED.
+    """
+    return get_reporter().send_result(backend_url, battle_id, event, timeout)
+
+
+def flush_events(timeout: Optional[float] = None) -> bool:
+    """Wait until every queued battle event was uploaded (or failed)."""
+    if _reporter is None:
+        return True
+    return _reporter.flush(timeout)
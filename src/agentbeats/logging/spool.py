@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+Durable local spool for battle events that could not be uploaded.
+"""
+
+import glob
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPOOL_DIR = os.getenv(
+    "AGENTBEATS_SPOOL_DIR", os.path.join(os.path.expanduser("~"), ".agentbeats", "spool")
+)
+DEFAULT_SEGMENT_BYTES = 1024 * 1024
+DEFAULT_REPLAY_BATCH = 50
+
+# Outcomes of an upload attempt
+SEND_OK = "ok"          # stored by the backend
+SEND_RETRY = "retry"    # backend unavailable, try again later
+SEND_DROP = "drop"      # rejected for good, retrying won't help
+
+# send(backend_url, battle_id, events) -> SEND_OK | SEND_RETRY | SEND_DROP
+SendFn = Callable[[str, str, List[Dict[str, Any]]], str]
+
+
+def _lock(handle) -> bool:
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+class EventSpool:
+    """
+    Append-only spool of battle events, stored as JSONL segment files.
+
+    Each line is {"seq", "backend_url", "battle_id", "event"}, seq growing
+    with every record this spool writes. Segments are named after their
+    creation time so replay keeps the original order, and each keeps its
+    upload progress in a sidecar .offset file. A process appends only to
+    its own open segment and segments are locked while in use, so several
+    processes can share one spool directory.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_SPOOL_DIR,
+        max_segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+    ):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._segment = None
+        self._seq = 0
+        # Segments left over by earlier runs need replaying too
+        self._pending = bool(self._segment_paths())
+
+    def has_pending(self) -> bool:
+        """Whether spooled events may still be waiting for upload."""
+        return self._pending
+
+    def append(self, backend_url: str, battle_id: str, events: List[Dict[str, Any]]):
+        """Durably append events of a battle to the spool."""
+        with self._lock:
+            if self._segment is None or self._segment.tell() >= self.max_segment_bytes:
+                self._open_segment()
+            lines = []
+            for event in events:
+                self._seq += 1
+                lines.append(json.dumps({
+                    "seq": self._seq,
+                    "backend_url": backend_url,
+                    "battle_id": battle_id,
+                    "event": event,
+                }, default=str) + "\n")
+            self._segment.write("".join(lines))
+            self._segment.flush()
+            os.fsync(self._segment.fileno())
+            self._pending = True
+
+    def replay(self, send: SendFn, batch_size: int = DEFAULT_REPLAY_BATCH) -> bool:
+        """
+        Upload spooled events in order through send.
+        Returns False if the backend asked to retry later, True once every
+        segment this process can access was replayed.
+        """
+        with self._lock:
+            self._close_segment()
+        for path in self._segment_paths():
+            if not self._replay_segment(path, send, batch_size):
+                return False
+        with self._lock:
+            if self._segment is None:
+                self._pending = False
+        return True
+
+    def close(self):
+        with self._lock:
+            self._close_segment()
+
+    def _segment_paths(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.directory, "*.jsonl")))
+
+    def _open_segment(self):
+        self._close_segment()
+        path = os.path.join(
+            self.directory, f"{time.time_ns():020d}-{os.getpid()}.jsonl"
+        )
+        self._segment = open(path, "a", encoding="utf-8")
+        _lock(self._segment)
+
+    def _close_segment(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+    def _replay_segment(self, path: str, send: SendFn, batch_size: int) -> bool:
+        offset_path = path + ".offset"
+        try:
+            handle = open(path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return True  # replayed by another process meanwhile
+        with handle:
+            if not _lock(handle):
+                return True  # in use by another process
+            try:
+                with open(offset_path, "r") as f:
+                    offset = int(f.read().strip() or 0)
+            except (FileNotFoundError, ValueError):
+                offset = 0
+            handle.seek(offset)
+
+            while True:
+                records, next_offset = _read_batch(handle, batch_size)
+                if not records:
+                    break
+                outcome = send(records[0]["backend_url"], records[0]["battle_id"],
+                               [record["event"] for record in records])
+                if outcome == SEND_RETRY:
+                    return False
+                if outcome == SEND_DROP:
+                    logger.error(
+                        "Backend rejected %d spooled events for battle %s, dropping them",
+                        len(records), records[0]["battle_id"],
+                    )
+                offset = next_offset
+                _write_offset(offset_path, offset)
+                handle.seek(offset)
+
+            os.remove(path)
+            if os.path.exists(offset_path):
+                os.remove(offset_path)
+        return True
+
+
+def _read_batch(handle, batch_size: int) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Read up to batch_size consecutive records of one battle from handle.
+    Returns them with the offset just past the last one. A result ends
+    the batch, as it must be the last event of an upload.
+    """
+    records: List[Dict[str, Any]] = []
+    offset = handle.tell()
+    while len(records) < batch_size:
+        line = handle.readline()
+        if not line.endswith("\n"):
+            break  # end of file, or a write cut short by a crash
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            logger.error("Skipping corrupt spool record: %s", line[:200])
+            offset = handle.tell()
+            continue
+        if records and (
+            record["backend_url"] != records[0]["backend_url"]
+            or record["battle_id"] != records[0]["battle_id"]
+        ):
+            break
+        records.append(record)
+        offset = handle.tell()
+        if record["event"].get("is_result"):
+            break
+    return records, offset
+
+
+def _write_offset(path: str, offset: int):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(str(offset))
+    os.replace(tmp_path, path)
+
+
+class SpoolReplayer:
+    """
+    Background thread replaying an EventSpool with exponential backoff
+    while the backend is unavailable.
+    """
+
+    def __init__(
+        self,
+        spool: EventSpool,
+        send: SendFn,
+        min_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        idle_interval: float = 30.0,
+    ):
+        self.spool = spool
+        self.send = send
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.idle_interval = idle_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="agentbeats-spool-replayer", daemon=True
+            )
+            self._thread.start()
+
+    def wake(self):
+        """Replay soon, e.g. after new events were spooled. Backoff still applies."""
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        backoff = self.min_backoff
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                drained = self.spool.replay(self.send)
+            except Exception as e:
+                logger.error("Error replaying event spool: %s", str(e))
+                drained = False
+            if drained:
+                backoff = self.min_backoff
+                self._wake.wait(self.idle_interval)
+            else:
+                # Jitter keeps many agents from retrying in lockstep
+                self._stop.wait(backoff * random.uniform(0.5, 1.0))
+                backoff = min(self.max_backoff, backoff * 2)
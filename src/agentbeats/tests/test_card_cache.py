@@ -0,0 +1,137 @@
+"""
+Tests for the AgentBeats agent card cache.
+"""
+
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import httpx
+from a2a.client.errors import A2AClientHTTPError
+from a2a.utils.constants import AGENT_CARD_WELL_KNOWN_PATH, PREV_AGENT_CARD_WELL_KNOWN_PATH
+
+from agentbeats.utils.agents.card_cache import AgentCardCache
+
+CARD = {
+    "name": "Test Agent",
+    "description": "An agent for tests",
+    "url": "http://agent:9999/",
+    "version": "1.0.0",
+    "capabilities": {"streaming": True},
+    "defaultInputModes": ["text"],
+    "defaultOutputModes": ["text"],
+    "skills": [],
+}
+ETAG = '"card-v1"'
+
+
+class TestAgentCardCache(unittest.TestCase):
+    """Test card caching, revalidation and invalidation."""
+
+    def setUp(self):
+        """Serve CARD with an ETag from a mock agent, recording requests."""
+        self.requests = []
+        self.status = 200
+        self.card_path = AGENT_CARD_WELL_KNOWN_PATH
+
+        async def handler(request):
+            self.requests.append(request)
+            await asyncio.sleep(0.01)
+            if request.url.path != self.card_path:
+                return httpx.Response(404)
+            if self.status != 200:
+                return httpx.Response(self.status)
+            if request.headers.get("if-none-match") == ETAG:
+                return httpx.Response(304, headers={"ETag": ETAG})
+            return httpx.Response(200, json=CARD, headers={"ETag": ETAG})
+
+        self.transport = httpx.MockTransport(handler)
+
+    def run_with_cache(self, test, ttl=60):
+        """Run test(cache) with the cache's HTTP client replaced by the mock agent."""
+        async def run():
+            async with httpx.AsyncClient(transport=self.transport) as client:
+                with patch("agentbeats.utils.agents.card_cache.get_http_client", return_value=client):
+                    return await test(AgentCardCache(ttl=ttl))
+
+        return asyncio.run(run())
+
+    def test_fresh_card_served_from_memory(self):
+        """Test lookups within the TTL don't reach the agent."""
+        async def test(cache):
+            first = await cache.get("http://agent:9999/")
+            second = await cache.get("http://agent:9999")
+            return first, second, cache.stats()
+
+        first, second, stats = self.run_with_cache(test)
+        self.assertEqual(first.name, "Test Agent")
+        self.assertIs(first, second)
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(stats["hits"], 1)
+
+    def test_stale_card_revalidated(self):
+        """Test an expired card is revalidated with If-None-Match and kept on 304."""
+        async def test(cache):
+            first = await cache.get("http://agent:9999")
+            second = await cache.get("http://agent:9999", max_age=0)
+            return first, second, cache.stats()
+
+        first, second, stats = self.run_with_cache(test)
+        self.assertIs(first, second)
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(self.requests[1].headers.get("if-none-match"), ETAG)
+        self.assertEqual(stats["fetches"], 1)
+        self.assertEqual(stats["revalidations"], 1)
+
+    def test_concurrent_lookups_share_request(self):
+        """Test concurrent lookups of one URL make a single request."""
+        async def test(cache):
+            return await asyncio.gather(*[cache.get("http://agent:9999") for _ in range(5)])
+
+        cards = self.run_with_cache(test)
+        self.assertEqual(len(self.requests), 1)
+        self.assertTrue(all(card is cards[0] for card in cards))
+
+    def test_invalidate_refetches(self):
+        """Test an invalidated card is fetched again without validators."""
+        async def test(cache):
+            await cache.get("http://agent:9999")
+            cache.invalidate("http://agent:9999/")
+            await cache.get("http://agent:9999")
+
+        self.run_with_cache(test)
+        self.assertEqual(len(self.requests), 2)
+        self.assertIsNone(self.requests[1].headers.get("if-none-match"))
+
+    def test_previous_path_fallback(self):
+        """Test an agent only serving the previous card path is found and revalidated there."""
+        self.card_path = PREV_AGENT_CARD_WELL_KNOWN_PATH
+
+        async def test(cache):
+            first = await cache.get("http://agent:9999")
+            second = await cache.get("http://agent:9999", max_age=0)
+            return first, second
+
+        first, second = self.run_with_cache(test)
+        self.assertIs(first, second)
+        self.assertEqual(
+            [request.url.path for request in self.requests],
+            [AGENT_CARD_WELL_KNOWN_PATH, PREV_AGENT_CARD_WELL_KNOWN_PATH, PREV_AGENT_CARD_WELL_KNOWN_PATH],
+        )
+        self.assertEqual(self.requests[2].headers.get("if-none-match"), ETAG)
+
+    def test_failure_drops_card(self):
+        """Test a failed revalidation raises and forgets the cached card."""
+        async def test(cache):
+            await cache.get("http://agent:9999")
+            self.status = 503
+            with self.assertRaises(A2AClientHTTPError):
+                await cache.get("http://agent:9999", max_age=0)
+            return cache.stats()
+
+        stats = self.run_with_cache(test)
+        self.assertEqual(stats["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
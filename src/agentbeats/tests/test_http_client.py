@@ -0,0 +1,91 @@
+"""
+Tests for the AgentBeats shared HTTP client.
+"""
+
+import asyncio
+import gc
+import unittest
+
+import httpx
+
+from agentbeats.utils.agents.http_client import (
+    PerHostLimitTransport, close_http_client, get_http_client,
+)
+
+
+class TestSharedClient(unittest.TestCase):
+    """Test one client is shared per event loop."""
+
+    def test_same_client_within_loop(self):
+        """Test repeated calls on a loop return the same client until closed."""
+        async def run():
+            first = get_http_client()
+            self.assertIs(get_http_client(), first)
+            await close_http_client()
+            self.assertTrue(first.is_closed)
+            second = get_http_client()
+            self.assertIsNot(second, first)
+            await close_http_client()
+            return first
+
+        first = asyncio.run(run())
+        second = asyncio.run(run())
+        self.assertIsNot(first, second)
+
+
+class TestPerHostLimitTransport(unittest.TestCase):
+    """Test the per-host concurrency limit."""
+
+    def test_limits_requests_per_host(self):
+        """Test at most max_per_host requests run at once against one host."""
+        in_flight = {"a": 0, "b": 0}
+        peak = {"a": 0, "b": 0}
+
+        async def body():
+            yield b"ok"
+
+        async def handler(request):
+            host = request.url.host
+            in_flight[host] += 1
+            peak[host] = max(peak[host], in_flight[host])
+            await asyncio.sleep(0.01)
+            in_flight[host] -= 1
+            # A streamed body, like a real transport returns
+            return httpx.Response(200, content=body())
+
+        async def run():
+            transport = PerHostLimitTransport(httpx.MockTransport(handler), 2)
+            async with httpx.AsyncClient(transport=transport) as client:
+                responses = await asyncio.gather(
+                    *[client.get(f"http://{host}/") for host in "ab" for _ in range(6)]
+                )
+            return [r.text for r in responses]
+
+        self.assertEqual(asyncio.run(run()), ["ok"] * 12)
+        self.assertEqual(peak, {"a": 2, "b": 2})
+
+    def test_unclosed_response_times_out(self):
+        """Test a response left open makes the next request time out, until it is dropped."""
+        async def body():
+            yield b"ok"
+
+        async def handler(request):
+            return httpx.Response(200, content=body())
+
+        async def run():
+            transport = PerHostLimitTransport(httpx.MockTransport(handler), 1)
+            async with httpx.AsyncClient(transport=transport, timeout=0.05) as client:
+                leaked = await client.send(client.build_request("GET", "http://a/"), stream=True)
+                with self.assertRaises(httpx.PoolTimeout):
+                    await client.get("http://a/")
+
+                del leaked
+                gc.collect()
+                response = await client.get("http://a/")
+            return response.text
+
+        self.assertEqual(asyncio.run(run()), "ok")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,7 @@ Tests for the AgentBeats logging module.
 """
 
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
 from datetime import datetime
 
 from agentbeats.logging.context import BattleContext
@@ -13,6 +13,7 @@ from agentbeats.logging.interaction_history import (
     record_battle_result, 
     record_agent_action
 )
+from agentbeats.logging.reporter import RESULT_FAILED, RESULT_SENT, RESULT_SPOOLED
 
 
 class TestBattleContext(unittest.TestCase):
@@ -49,84 +50,82 @@ class TestSystemLogging(unittest.TestCase):
         """Set up test context."""
         self.context = BattleContext("battle_123", "http://localhost:9000", "agent1")
     
-    @patch('agentbeats.logging.logging._make_api_request')
-    def test_log_ready_success(self, mock_api_request):
+    @patch('agentbeats.logging.logging.report_event')
+    def test_log_ready_success(self, mock_report_event):
         """Test successful log_ready call."""
-        mock_api_request.return_value = True
+        mock_report_event.return_value = True
         
-        result = log_ready(self.context, "agent1", {"capability": "file_access"})
+        result = log_ready(self.context, {"capability": "file_access"})
         
         self.assertEqual(result, 'readiness logged to backend')
-        mock_api_request.assert_called_once()
+        mock_report_event.assert_called_once()
         
-        # Check the data sent to API
-        call_args = mock_api_request.call_args
-        self.assertEqual(call_args[0][0], self.context)
-        self.assertEqual(call_args[0][1], "ready")
+        # Check the event queued for upload
+        call_args = mock_report_event.call_args
+        self.assertEqual(call_args[0][0], "http://localhost:9000")
+        self.assertEqual(call_args[0][1], "battle_123")
         
-        data = call_args[0][2]
-        self.assertEqual(data["event_type"], "agent_ready")
-        self.assertEqual(data["agent_name"], "agent1")
-        self.assertEqual(data["capabilities"], {"capability": "file_access"})
+        event = call_args[0][2]
+        self.assertFalse(event["is_result"])
+        self.assertEqual(event["message"], "agent_ready")
+        self.assertEqual(event["reported_by"], "agent1")
+        self.assertEqual(event["detail"]["capabilities"], {"capability": "file_access"})
     
-    @patch('agentbeats.logging.logging._make_api_request')
-    def test_log_ready_failure(self, mock_api_request):
+    @patch('agentbeats.logging.logging.report_event')
+    def test_log_ready_failure(self, mock_report_event):
         """Test failed log_ready call."""
-        mock_api_request.return_value = False
+        mock_report_event.return_value = False
         
-        result = log_ready(self.context, "agent1")
+        result = log_ready(self.context)
         
         self.assertEqual(result, 'readiness logging failed')
     
-    @patch('agentbeats.logging.logging._make_api_request')
-    def test_log_error_success(self, mock_api_request):
+    @patch('agentbeats.logging.logging.report_event')
+    def test_log_error_success(self, mock_report_event):
         """Test successful log_error call."""
-        mock_api_request.return_value = True
+        mock_report_event.return_value = True
         
-        result = log_error(self.context, "Connection timeout", "network_error", "agent1")
+        result = log_error(self.context, "Connection timeout", "network_error")
         
         self.assertEqual(result, 'error logged to backend')
         
-        # Check the data sent to API
-        call_args = mock_api_request.call_args
-        data = call_args[0][2]
-        self.assertEqual(data["event_type"], "error")
-        self.assertEqual(data["error_type"], "network_error")
-        self.assertEqual(data["error_message"], "Connection timeout")
-        self.assertEqual(data["reported_by"], "agent1")
+        # Check the event queued for upload
+        event = mock_report_event.call_args[0][2]
+        self.assertEqual(event["message"], "error")
+        self.assertEqual(event["detail"]["error_type"], "network_error")
+        self.assertEqual(event["detail"]["error_message"], "Connection timeout")
+        self.assertEqual(event["detail"]["reported_by"], "agent1")
     
-    @patch('agentbeats.logging.logging._make_api_request')
-    def test_log_startup_success(self, mock_api_request):
+    @patch('agentbeats.logging.logging.report_event')
+    def test_log_startup_success(self, mock_report_event):
         """Test successful log_startup call."""
-        mock_api_request.return_value = True
+        mock_report_event.return_value = True
         
         config = {"model": "gpt-4", "temperature": 0.7}
-        result = log_startup(self.context, "agent1", config)
+        result = log_startup(self.context, config)
         
         self.assertEqual(result, 'startup logged to backend')
         
-        # Check the data sent to API
-        call_args = mock_api_request.call_args
-        data = call_args[0][2]
-        self.assertEqual(data["event_type"], "agent_startup")
-        self.assertEqual(data["agent_name"], "agent1")
-        self.assertEqual(data["config"], config)
+        # Check the event queued for upload
+        event = mock_report_event.call_args[0][2]
+        self.assertEqual(event["message"], "agent_startup")
+        self.assertEqual(event["detail"]["agent_name"], "agent1")
+        self.assertEqual(event["detail"]["config"], config)
     
-    @patch('agentbeats.logging.logging._make_api_request')
-    def test_log_shutdown_success(self, mock_api_request):
+    @patch('agentbeats.logging.logging.report_event')
+    def test_log_shutdown_success(self, mock_report_event):
         """Test successful log_shutdown call."""
-        mock_api_request.return_value = True
+        mock_report_event.return_value = True
         
-        result = log_shutdown(self.context, "agent1", "timeout")
+        result = log_shutdown(self.context, "timeout")
         
         self.assertEqual(result, 'shutdown logged to backend')
         
-        # Check the data sent to API
-        call_args = mock_api_request.call_args
-        data = call_args[0][2]
-        self.assertEqual(data["event_type"], "agent_shutdown")
-        self.assertEqual(data["agent_name"], "agent1")
-        self.assertEqual(data["reason"], "timeout")
+        # Check the event queued for upload
+        event = mock_report_event.call_args[0][2]
+        self.assertEqual(event["message"], "agent_shutdown")
+        self.assertEqual(event["detail"]["agent_name"], "agent1")
+        self.assertEqual(event["detail"]["reason"], "timeout")
 
 
 class TestInteractionHistory(unittest.TestCase):
@@ -136,46 +135,65 @@ class TestInteractionHistory(unittest.TestCase):
         """Set up test context."""
         self.context = BattleContext("battle_123", "http://localhost:9000", "agent1")
     
-    @patch('agentbeats.logging.interaction_history._make_api_request')
-    def test_record_battle_event_success(self, mock_api_request):
+    @patch('agentbeats.logging.interaction_history.report_event')
+    def test_record_battle_event_success(self, mock_report_event):
         """Test successful record_battle_event call."""
-        mock_api_request.return_value = True
+        mock_report_event.return_value = True
         
         detail = {"severity": "high", "category": "security"}
-        result = record_battle_event(self.context, "Battle started", "system", detail)
+        result = record_battle_event(self.context, "Battle started", detail)
         
         self.assertEqual(result, 'event recorded to backend')
         
-        # Check the data sent to API
-        call_args = mock_api_request.call_args
-        data = call_args[0][2]
-        self.assertEqual(data["event_type"], "battle_event")
-        self.assertEqual(data["message"], "Battle started")
-        self.assertEqual(data["reported_by"], "system")
-        self.assertEqual(data["detail"], detail)
+        # Check the event queued for upload
+        event = mock_report_event.call_args[0][2]
+        self.assertFalse(event["is_result"])
+        self.assertEqual(event["message"], "Battle started")
+        self.assertEqual(event["reported_by"], "agent1")
+        self.assertEqual(event["detail"], detail)
     
-    @patch('agentbeats.logging.interaction_history._make_api_request')
-    def test_record_battle_result_success(self, mock_api_request):
+    @patch('agentbeats.logging.interaction_history.report_result')
+    def test_record_battle_result_success(self, mock_report_result):
         """Test successful record_battle_result call."""
-        mock_api_request.return_value = True
+        mock_report_result.return_value = RESULT_SENT
         
         detail = {"score": 95, "duration": "2h30m"}
         result = record_battle_result(self.context, "Battle completed", "red_agent", detail)
         
-        self.assertEqual(result, 'battle result recorded: winner=red_agent')
+        self.assertEqual(result, 'battle result recorded to backend: winner=red_agent')
         
-        # Check the data sent to API
-        call_args = mock_api_request.call_args
-        data = call_args[0][2]
-        self.assertEqual(data["event_type"], "battle_result")
-        self.assertEqual(data["message"], "Battle completed")
-        self.assertEqual(data["winner"], "red_agent")
-        self.assertEqual(data["detail"], detail)
+        # Check the result sent
+        call_args = mock_report_result.call_args
+        self.assertEqual(call_args[0][:2], ("http://localhost:9000", "battle_123"))
+        event = call_args[0][2]
+        self.assertTrue(event["is_result"])
+        self.assertEqual(event["message"], "Battle completed")
+        self.assertEqual(event["winner"], "red_agent")
+        self.assertEqual(event["detail"], detail)
     
-    @patch('agentbeats.logging.interaction_history._make_api_request')
-    def test_record_agent_action_success(self, mock_api_request):
+    @patch('agentbeats.logging.interaction_history.report_result')
+    def test_record_battle_result_spooled(self, mock_report_result):
+        """Test a result that only reached the spool isn't reported as recorded."""
+        mock_report_result.return_value = RESULT_SPOOLED
+        
+        result = record_battle_result(self.context, "Battle completed", "red_agent")
+        
+        self.assertTrue(result.startswith('battle result spooled'))
+        self.assertIn('winner=red_agent', result)
+    
+    @patch('agentbeats.logging.interaction_history.report_result')
+    def test_record_battle_result_failure(self, mock_report_result):
+        """Test failed record_battle_result call."""
+        mock_report_result.return_value = RESULT_FAILED
+        
+        result = record_battle_result(self.context, "Battle completed", "red_agent")
+        
+        self.assertEqual(result, 'result recording to backend failed')
+    
+    @patch('agentbeats.logging.interaction_history.report_event')
+    def test_record_agent_action_success(self, mock_report_event):
         """Test successful record_agent_action call."""
-        mock_api_request.return_value = True
+        mock_report_event.return_value = True
         
         detail = {"file_path": "/etc/passwd", "bytes_read": 1024}
         interaction_details = {
@@ -187,87 +205,28 @@ class TestInteractionHistory(unittest.TestCase):
         result = record_agent_action(
             self.context, 
             "send_message", 
-            "red_agent", 
             detail, 
             interaction_details
         )
         
         self.assertEqual(result, 'action recorded to backend')
         
-        # Check the data sent to API
-        call_args = mock_api_request.call_args
-        data = call_args[0][2]
-        self.assertEqual(data["event_type"], "agent_action")
-        self.assertEqual(data["action"], "send_message")
-        self.assertEqual(data["agent_name"], "red_agent")
-        self.assertEqual(data["detail"], detail)
-        self.assertEqual(data["interaction_details"], interaction_details)
+        # Check the event queued for upload
+        event = mock_report_event.call_args[0][2]
+        self.assertEqual(event["message"], "send_message")
+        self.assertEqual(event["reported_by"], "agent1")
+        self.assertEqual(event["detail"], detail)
+        self.assertEqual(event["interaction_details"], interaction_details)
     
-    @patch('agentbeats.logging.interaction_history._make_api_request')
-    def test_record_agent_action_failure(self, mock_api_request):
+    @patch('agentbeats.logging.interaction_history.report_event')
+    def test_record_agent_action_failure(self, mock_report_event):
         """Test failed record_agent_action call."""
-        mock_api_request.return_value = False
-        
-        result = record_agent_action(self.context, "file_read", "red_agent")
-        
-        self.assertEqual(result, 'action recording failed')
-
-
-class TestAPIMakeRequest(unittest.TestCase):
-    """Test the _make_api_request helper function."""
-    
-    def setUp(self):
-        """Set up test context."""
-        self.context = BattleContext("battle_123", "http://localhost:9000", "agent1")
-    
-    @patch('requests.post')
-    def test_make_api_request_success(self, mock_post):
-        """Test successful API request."""
-        mock_response = MagicMock()
-        mock_response.status_code = 204
-        mock_post.return_value = mock_response
-        
-        from agentbeats.logging.interaction_history import _make_api_request
-        
-        data = {"test": "data"}
-        result = _make_api_request(self.context, "test", data)
-        
-        self.assertTrue(result)
-        mock_post.assert_called_once_with(
-            "http://localhost:9000/battles/battle_123/test",
-            json=data,
-            headers={"Content-Type": "application/json"},
-            timeout=10
-        )
-    
-    @patch('requests.post')
-    def test_make_api_request_failure_status(self, mock_post):
-        """Test API request with non-204 status code."""
-        mock_response = MagicMock()
-        mock_response.status_code = 500
-        mock_post.return_value = mock_response
-        
-        from agentbeats.logging.interaction_history import _make_api_request
-        
-        data = {"test": "data"}
-        result = _make_api_request(self.context, "test", data)
-        
-        self.assertFalse(result)
-    
-    @patch('requests.post')
-    def test_make_api_request_network_error(self, mock_post):
-        """Test API request with network error."""
-        import requests
-        mock_post.side_effect = requests.exceptions.RequestException("Network error")
-        
-        from agentbeats.logging.interaction_history import _make_api_request
+        mock_report_event.return_value = False
         
-        data = {"test": "data"}
-        result = _make_api_request(self.context, "test", data)
+        result = record_agent_action(self.context, "file_read")
         
-        self.assertFalse(result)
-        mock_post.assert_called_once()
+        self.assertEqual(result, 'action recording to backend failed')
 
 
 if __name__ == '__main__':
-    unittest.main() 
\ No newline at end of file
+    unittest.main() 
@@ -0,0 +1,113 @@
+"""
+Tests for the AgentBeats background event reporter.
+"""
+
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+
+from agentbeats.logging.reporter import EventReporter, RESULT_FAILED, RESULT_SENT
+
+
+def _response(status_code=200, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.ok = 200 <= status_code < 300
+    response.headers = headers or {}
+    response.text = ""
+    return response
+
+
+class TestEventReporter(unittest.TestCase):
+    """Test EventReporter batching and delivery."""
+
+    def setUp(self):
+        """Create a reporter whose session is mocked."""
+        self.reporter = EventReporter(batch_size=10, flush_interval=60)
+        self.post = MagicMock(return_value=_response())
+        self.reporter._session.post = self.post
+
+    def tearDown(self):
+        self.reporter.close(timeout=1)
+
+    def test_flush_sends_batch_per_battle(self):
+        """Test events are grouped per battle in submission order."""
+        self.reporter.submit("http://backend", "b1", {"is_result": False, "message": "1"})
+        self.reporter.submit("http://backend", "b2", {"is_result": False, "message": "2"})
+        self.reporter.submit("http://backend", "b1", {"is_result": False, "message": "3"})
+
+        self.assertTrue(self.reporter.flush(timeout=5))
+
+        self.assertEqual(self.post.call_count, 2)
+        first, second = self.post.call_args_list
+        self.assertEqual(first[0][0], "http://backend/battles/b1/events:batch")
+        self.assertEqual([e["message"] for e in first[1]["json"]], ["1", "3"])
+        self.assertEqual(second[0][0], "http://backend/battles/b2/events:batch")
+        self.assertEqual(self.reporter.stats["sent"], 3)
+
+    def test_events_wait_for_batch(self):
+        """Test events are held back until the batch fills up."""
+        self.reporter.submit("http://backend", "b1", {"is_result": False})
+        time.sleep(0.1)
+        self.post.assert_not_called()
+
+        for _ in range(9):
+            self.reporter.submit("http://backend", "b1", {"is_result": False})
+        self.assertTrue(self.reporter.flush(timeout=5))
+        self.assertEqual(self.post.call_count, 1)
+        self.assertEqual(len(self.post.call_args[1]["json"]), 10)
+
+    def test_result_is_sent_last(self):
+        """Test a result closes its battle's batch."""
+        self.reporter.submit("http://backend", "b1", {"is_result": False})
+        self.reporter.submit("http://backend", "b1", {"is_result": True, "winner": "draw"})
+        self.reporter.submit("http://backend", "b1", {"is_result": False})
+
+        self.assertTrue(self.reporter.flush(timeout=5))
+
+        batches = [call[1]["json"] for call in self.post.call_args_list]
+        self.assertEqual([len(batch) for batch in batches], [2, 1])
+        self.assertTrue(batches[0][-1]["is_result"])
+
+    def test_send_result_reports_delivery(self):
+        """Test send_result waits for the result and says whether the backend took it."""
+        self.reporter.submit("http://backend", "b1", {"is_result": False})
+        delivery = self.reporter.send_result(
+            "http://backend", "b1", {"is_result": True, "winner": "draw"}, timeout=5
+        )
+        self.assertEqual(delivery, RESULT_SENT)
+        self.assertEqual(len(self.post.call_args[1]["json"]), 2)
+
+        self.post.return_value = _response(400)
+        delivery = self.reporter.send_result(
+            "http://backend", "b1", {"is_result": True, "winner": "draw"}, timeout=5
+        )
+        self.assertEqual(delivery, RESULT_FAILED)
+
+    def test_full_queue_drops_events(self):
+        """Test submit refuses events beyond max_queue."""
+        reporter = EventReporter(max_queue=1, flush_interval=60)
+        reporter._session.post = self.post
+        self.assertTrue(reporter.submit("http://backend", "b1", {"is_result": False}))
+        self.assertFalse(reporter.submit("http://backend", "b1", {"is_result": False}))
+        self.assertEqual(reporter.stats["dropped"], 1)
+        reporter.close(timeout=1)
+
+    @patch("agentbeats.logging.reporter.time.sleep")
+    def test_retries_after_backpressure(self, mock_sleep):
+        """Test a 429 response is retried after Retry-After."""
+        self.post.side_effect = [
+            _response(429, {"Retry-After": "2"}),
+            _response(200),
+        ]
+        self.reporter.submit("http://backend", "b1", {"is_result": False})
+
+        self.assertTrue(self.reporter.flush(timeout=5))
+
+        self.assertEqual(self.post.call_count, 2)
+        mock_sleep.assert_called_once_with(2.0)
+        self.assertEqual(self.reporter.stats["sent"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
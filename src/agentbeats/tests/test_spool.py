@@ -0,0 +1,133 @@
+"""
+Tests for the AgentBeats local event spool.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from agentbeats.logging.reporter import EventReporter, RESULT_SPOOLED
+from agentbeats.logging.spool import EventSpool, SEND_OK, SEND_RETRY, SEND_DROP
+
+
+class TestEventSpool(unittest.TestCase):
+    """Test EventSpool persistence and replay."""
+
+    def setUp(self):
+        """Create a spool in a temporary directory."""
+        self.directory = tempfile.mkdtemp()
+        self.spool = EventSpool(self.directory)
+
+    def tearDown(self):
+        self.spool.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_replay_in_order(self):
+        """Test spooled events are replayed per battle in their original order."""
+        self.spool.append("http://backend", "b1", [{"message": "1"}, {"message": "2"}])
+        self.spool.append("http://backend", "b2", [{"message": "3"}])
+        self.spool.append("http://backend", "b1", [{"message": "4"}])
+        send = MagicMock(return_value=SEND_OK)
+
+        self.assertTrue(self.spool.replay(send))
+
+        calls = [(c[0][1], [e["message"] for e in c[0][2]]) for c in send.call_args_list]
+        self.assertEqual(calls, [("b1", ["1", "2"]), ("b2", ["3"]), ("b1", ["4"])])
+        self.assertFalse(self.spool.has_pending())
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_retry_keeps_events(self):
+        """Test events are kept, and resumed after what was sent, when the backend is down."""
+        self.spool.append("http://backend", "b1", [{"message": "1"}])
+        self.spool.append("http://backend", "b2", [{"message": "2"}])
+        send = MagicMock(side_effect=[SEND_OK, SEND_RETRY])
+
+        self.assertFalse(self.spool.replay(send))
+        self.assertTrue(self.spool.has_pending())
+
+        send = MagicMock(return_value=SEND_OK)
+        self.assertTrue(self.spool.replay(send))
+        send.assert_called_once()
+        self.assertEqual(send.call_args[0][1], "b2")
+
+    def test_survives_restart(self):
+        """Test a new spool replays segments left by an earlier one."""
+        self.spool.append("http://backend", "b1", [{"message": "1"}])
+        self.spool.close()
+
+        spool = EventSpool(self.directory)
+        self.assertTrue(spool.has_pending())
+        send = MagicMock(return_value=SEND_OK)
+        self.assertTrue(spool.replay(send))
+        send.assert_called_once_with("http://backend", "b1", [{"message": "1"}])
+
+    def test_result_ends_batch(self):
+        """Test a result is always the last event of a replayed batch."""
+        self.spool.append("http://backend", "b1", [
+            {"message": "1"}, {"is_result": True}, {"message": "2"},
+        ])
+        send = MagicMock(return_value=SEND_DROP)
+
+        self.assertTrue(self.spool.replay(send))
+        self.assertEqual([len(c[0][2]) for c in send.call_args_list], [2, 1])
+
+
+class TestReporterSpooling(unittest.TestCase):
+    """Test EventReporter falls back to the spool."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.reporter = EventReporter(
+            flush_interval=60, max_retries=0, spool=EventSpool(self.directory)
+        )
+        self.post = MagicMock()
+        self.reporter._session.post = self.post
+
+    def tearDown(self):
+        self.reporter.close(timeout=1)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_server_error_spools_batch(self):
+        """Test a batch the backend failed to take is spooled with its idempotency keys."""
+        self.post.return_value = MagicMock(status_code=500, ok=False, text="")
+        self.reporter._replayer.start = MagicMock()
+        self.reporter.submit("http://backend", "b1", {"is_result": False})
+
+        self.assertTrue(self.reporter.flush(timeout=5))
+
+        self.assertEqual(self.reporter.stats["spooled"], 1)
+        sent = self.post.call_args[1]["json"]
+        send = MagicMock(return_value=SEND_OK)
+        self.assertTrue(self.reporter.spool.replay(send))
+        self.assertEqual(send.call_args[0][2], sent)
+        self.assertTrue(sent[0]["idempotency_key"])
+
+    def test_spooled_result_reported(self):
+        """Test send_result tells a spooled result apart from a sent one."""
+        self.post.return_value = MagicMock(status_code=503, ok=False, text="", headers={})
+        self.reporter._replayer.start = MagicMock()
+
+        delivery = self.reporter.send_result(
+            "http://backend", "b1", {"is_result": True, "winner": "draw"}, timeout=5
+        )
+
+        self.assertEqual(delivery, RESULT_SPOOLED)
+        self.assertTrue(self.reporter.spool.has_pending())
+
+    def test_replay_uses_own_session(self):
+        """Test spooled batches are replayed over a session the reporter thread doesn't use."""
+        replay_post = MagicMock(return_value=MagicMock(status_code=200, ok=True))
+        self.reporter._replay_session.post = replay_post
+
+        outcome = self.reporter._replay("http://backend", "b1", [{"idempotency_key": "k"}])
+
+        self.assertEqual(outcome, SEND_OK)
+        replay_post.assert_called_once()
+        self.post.assert_not_called()
+        self.assertEqual(self.reporter.stats["sent"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,6 +11,8 @@ from .a2a import (
     get_agent_card,
     create_cached_a2a_client,
 )
+from .card_cache import AgentCardCache, agent_card_cache
+from .http_client import get_http_client, close_http_client
 
 __all__ = [
     "create_a2a_client",
@@ -19,4 +21,8 @@ __all__ = [
     "send_messages_to_agents",
     "get_agent_card",
     "create_cached_a2a_client",
+    "get_http_client",
+    "close_http_client",
+    "AgentCardCache",
+    "agent_card_cache",
 ] 
\ No newline at end of file
@@ -3,12 +3,11 @@
 Agent communication utilities for easier development using the Agentbeats SDK.
 """
 
-import httpx
 import asyncio
 from typing import Optional, List, Dict, Any
 from uuid import uuid4
 
-from a2a.client import A2AClient, A2ACardResolver
+from a2a.client import A2AClient
 from a2a.types import (
     AgentCard, Message, Part, TextPart, Role, 
     SendStreamingMessageRequest,
@@ -18,63 +17,42 @@ from a2a.types import (
     TaskStatusUpdateEvent,
 )
 
-# Global cache for A2A clients
-_a2a_client_cache = {}
+from .card_cache import agent_card_cache
+from .http_client import get_http_client
 
-async def get_agent_card(target_url: str) -> Optional[Dict[str, Any]]:
-    """Get agent card/metadata from a target URL."""
-    httpx_client = None
+# Seconds to wait for an agent card when probing an agent
+AGENT_CARD_TIMEOUT = 1.0
+
+async def get_agent_card(target_url: str, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    Get agent card/metadata from a target URL, through the agent card cache.
+    Pass max_age=0 to make sure the agent answers (liveness checks).
+    """
     try:
-        httpx_client = httpx.AsyncClient(timeout=1.0)
-        resolver = A2ACardResolver(httpx_client=httpx_client, base_url=target_url)
-        
-        agent_card = await resolver.get_agent_card()
-        
-        if agent_card:
-            return agent_card.model_dump(exclude_none=True)
-        else:
-            return None
+        agent_card = await agent_card_cache.get(
+            target_url, max_age=max_age, timeout=AGENT_CARD_TIMEOUT
+        )
+        return agent_card.model_dump(exclude_none=True)
     except Exception as e:
         return None
-    finally:
-        if httpx_client:
-            await httpx_client.aclose()
 
 async def create_cached_a2a_client(target_url: str) -> Optional[A2AClient]:
-    """Create a cached A2A client for repeated communication."""
-    if target_url in _a2a_client_cache:
-        return _a2a_client_cache[target_url]
-    
+    """Create an A2A client for repeated communication, None if the agent card can't be resolved."""
     try:
-        httpx_client = httpx.AsyncClient()
-        resolver = A2ACardResolver(httpx_client=httpx_client, base_url=target_url)
-        
-        agent_card = await resolver.get_agent_card()
-        
-        if agent_card:
-            client = A2AClient(httpx_client=httpx_client, agent_card=agent_card)
-            _a2a_client_cache[target_url] = client
-            return client
-        else:
-            return None
+        agent_card = await agent_card_cache.get(target_url)
     except Exception:
         return None
+    return A2AClient(httpx_client=get_http_client(), agent_card=agent_card)
 
 
 async def create_a2a_client(target_url: str) -> A2AClient:
-    """Create an A2A client for the given agent URL."""
-    
-    httpx_client = httpx.AsyncClient()
-    resolver = A2ACardResolver(httpx_client=httpx_client, base_url=target_url)
-    
-    card: AgentCard | None = await resolver.get_agent_card(
-        relative_card_path="/.well-known/agent.json"
-    )
-
-    if card is None:
-        raise RuntimeError(f"Failed to resolve agent card from {target_url}")
-
-    return A2AClient(httpx_client=httpx_client, agent_card=card)
+    """
+    Create an A2A client for the given agent URL. The agent card comes
+    from the agent card cache, and the client uses the shared pooled HTTP
+    client, which callers must not close.
+    """
+    card: AgentCard = await agent_card_cache.get(target_url)
+    return A2AClient(httpx_client=get_http_client(), agent_card=card)
 
 
 async def send_message_to_agent(target_url: str, message: str, timeout: Optional[float] = None) -> str:
@@ -82,44 +60,37 @@ async def send_message_to_agent(target_url: str, message: str, timeout: Optional
     if timeout is not None and timeout <= 0:
         raise ValueError("Timeout must be positive")
     
-    client = None
-    try:
-        client = await create_a2a_client(target_url)
-
-        params = MessageSendParams(
-            message=Message(
-                role=Role.user,
-                parts=[Part(TextPart(text=message))],
-                messageId=uuid4().hex,
-                taskId=None,
-            )
+    client = await create_a2a_client(target_url)
+
+    params = MessageSendParams(
+        message=Message(
+            role=Role.user,
+            parts=[Part(TextPart(text=message))],
+            messageId=uuid4().hex,
+            taskId=None,
         )
-        req = SendStreamingMessageRequest(id=str(uuid4()), params=params)
-        chunks: List[str] = []
-
-        async for chunk in client.send_message_streaming(req):
-            if not isinstance(chunk.root, SendStreamingMessageSuccessResponse):
-                continue
-            event = chunk.root.result
-            if isinstance(event, TaskArtifactUpdateEvent):
-                for p in event.artifact.parts:
+    )
+    req = SendStreamingMessageRequest(id=str(uuid4()), params=params)
+    chunks: List[str] = []
+
+    async for chunk in client.send_message_streaming(req):
+        if not isinstance(chunk.root, SendStreamingMessageSuccessResponse):
+            continue
+        event = chunk.root.result
+        if isinstance(event, TaskArtifactUpdateEvent):
+            for p in event.artifact.parts:
+                if isinstance(p.root, TextPart):
+                    chunks.append(p.root.text)
+        elif isinstance(event, TaskStatusUpdateEvent):
+            msg = event.status.message
+            if msg:
+                for p in msg.parts:
                     if isinstance(p.root, TextPart):
                         chunks.append(p.root.text)
-            elif isinstance(event, TaskStatusUpdateEvent):
-                msg = event.status.message
-                if msg:
-                    for p in msg.parts:
-                        if isinstance(p.root, TextPart):
-                            chunks.append(p.root.text)
-
-        response = "".join(chunks).strip() or "No response from agent."
-        
-        return response
-        
-    finally:
-        # Clean up the httpx client to prevent resource leaks
-        if client and hasattr(client, 'httpx_client'):
-            await client.httpx_client.aclose()
+
+    response = "".join(chunks).strip() or "No response from agent."
+
+    return response
 
 
 async def send_message_to_agents(target_urls: List[str], message: str, timeout: Optional[float] = None) -> Dict[str, str]:
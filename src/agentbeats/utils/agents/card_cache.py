@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Process-wide cache of agent cards, keyed by agent base URL.
+
+A card is served from memory for AGENTBEATS_AGENT_CARD_TTL seconds. Past
+that it is revalidated with If-None-Match / If-Modified-Since when the
+agent sent an ETag or Last-Modified, so an unchanged card costs a 304
+without a body. Concurrent lookups of the same URL share one request.
+Agents that don't serve AGENT_CARD_WELL_KNOWN_PATH (older a2a-sdk
+versions) are asked at PREV_AGENT_CARD_WELL_KNOWN_PATH, and the path that
+worked is used when the card is revalidated.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import httpx
+from pydantic import ValidationError
+
+from a2a.client.errors import A2AClientHTTPError, A2AClientJSONError
+from a2a.types import AgentCard
+from a2a.utils.constants import AGENT_CARD_WELL_KNOWN_PATH, PREV_AGENT_CARD_WELL_KNOWN_PATH
+
+from .http_client import get_http_client
+
+AGENT_CARD_TTL = float(os.getenv("AGENTBEATS_AGENT_CARD_TTL", "60"))
+
+
+@dataclass
+class _CardEntry:
+    card: AgentCard
+    etag: Optional[str]
+    last_modified: Optional[str]
+    checked_at: float
+    path: str
+
+
+class AgentCardCache:
+    """
+    TTL cache of agent cards with conditional revalidation.
+
+    Entries are shared by every thread and event loop of the process; the
+    requests themselves run on the caller's loop, and only callers on the
+    same loop share an in-flight request.
+    """
+
+    def __init__(self, ttl: float = AGENT_CARD_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _CardEntry] = {}
+        self._generations: Dict[str, int] = {}
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Task] = {}
+        self.hits = 0
+        self.revalidations = 0
+        self.fetches = 0
+
+    async def get(
+        self, url: str, max_age: Optional[float] = None, timeout: Optional[float] = None
+    ) -> AgentCard:
+        """
+        Return the agent card of the agent at url.
+
+        max_age overrides the TTL for this lookup, 0 always asks the agent
+        (liveness probes). Raises A2AClientHTTPError or A2AClientJSONError
+        like A2ACardResolver when the card can't be fetched.
+        """
+        key = url.rstrip("/")
+        max_age = self.ttl if max_age is None else max_age
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.checked_at < max_age:
+                self.hits += 1
+                return entry.card
+            task = self._inflight.get((loop, key))
+            if task is None:
+                generation = self._generations.get(key, 0)
+                task = loop.create_task(self._fetch(key, entry, generation, timeout))
+                self._inflight[(loop, key)] = task
+                task.add_done_callback(lambda t: self._forget(loop, key, t))
+        # A cancelled caller must not cancel the request other callers wait on
+        return await asyncio.shield(task)
+
+    def invalidate(self, url: str):
+        """Forget the card of url, e.g. when its agent is being restarted."""
+        key = url.rstrip("/")
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+            # Requests already running may return the old card, don't join them
+            for inflight in [k for k in self._inflight if k[1] == key]:
+                del self._inflight[inflight]
+
+    def clear(self):
+        with self._lock:
+            for key in set(self._entries) | {key for _, key in self._inflight}:
+                self._generations[key] = self._generations.get(key, 0) + 1
+            self._entries.clear()
+            self._inflight.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "fetches": self.fetches,
+        }
+
+    def _forget(self, loop: asyncio.AbstractEventLoop, key: str, task: asyncio.Task):
+        with self._lock:
+            if self._inflight.get((loop, key)) is task:
+                del self._inflight[(loop, key)]
+        if not task.cancelled():
+            task.exception()  # retrieved, even if every caller was cancelled
+
+    async def _fetch(
+        self, key: str, entry: Optional[_CardEntry], generation: int, timeout: Optional[float]
+    ) -> AgentCard:
+        path = entry.path if entry is not None else AGENT_CARD_WELL_KNOWN_PATH
+        target_url = f"{key}{path}"
+        headers = {}
+        if entry is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        kwargs = {"headers": headers}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+
+        try:
+            response = await get_http_client().get(target_url, **kwargs)
+            if response.status_code == 404 and path == AGENT_CARD_WELL_KNOWN_PATH:
+                # Agents on older a2a-sdk versions only serve the previous path
+                path = PREV_AGENT_CARD_WELL_KNOWN_PATH
+                target_url = f"{key}{path}"
+                kwargs["headers"] = {}
+                response = await get_http_client().get(target_url, **kwargs)
+            if response.status_code == 304 and entry is not None:
+                card = entry.card
+                self.revalidations += 1
+            else:
+                response.raise_for_status()
+                card = AgentCard.model_validate(response.json())
+                self.fetches += 1
+        except Exception as e:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._entries.pop(key, None)
+            if isinstance(e, httpx.HTTPStatusError):
+                raise A2AClientHTTPError(
+                    e.response.status_code, f"Failed to fetch agent card from {target_url}: {e}"
+                ) from e
+            if isinstance(e, httpx.RequestError):
+                raise A2AClientHTTPError(
+                    503, f"Network communication error fetching agent card from {target_url}: {e}"
+                ) from e
+            if isinstance(e, (json.JSONDecodeError, ValidationError)):
+                raise A2AClientJSONError(
+                    f"Failed to parse agent card from {target_url}: {e}"
+                ) from e
+            raise
+
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if response.status_code == 304:
+            etag = etag or entry.etag
+            last_modified = last_modified or entry.last_modified
+        with self._lock:
+            if self._generations.get(key, 0) == generation:
+                self._entries[key] = _CardEntry(card, etag, last_modified, time.monotonic(), path)
+        return card
+
+
+agent_card_cache = AgentCardCache()
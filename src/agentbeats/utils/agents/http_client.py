@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Process-wide pooled HTTP client for traffic to agents and launchers.
+
+Connections are kept alive and reused across calls, with at most
+AGENTBEATS_HTTP_MAX_CONNECTIONS_PER_HOST requests in flight per host.
+An httpx client belongs to the event loop it is used on, so each running
+loop gets its own client; call close_http_client() before a loop ends.
+"""
+
+import asyncio
+import logging
+import os
+import weakref
+from typing import Callable, Dict, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv("AGENTBEATS_HTTP_CONNECT_TIMEOUT", "10"))
+# Also the longest gap between chunks of a streamed agent response
+HTTP_READ_TIMEOUT = float(os.getenv("AGENTBEATS_HTTP_READ_TIMEOUT", "180"))
+HTTP_WRITE_TIMEOUT = float(os.getenv("AGENTBEATS_HTTP_WRITE_TIMEOUT", "10"))
+HTTP_POOL_TIMEOUT = float(os.getenv("AGENTBEATS_HTTP_POOL_TIMEOUT", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("AGENTBEATS_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("AGENTBEATS_HTTP_MAX_CONNECTIONS_PER_HOST", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("AGENTBEATS_HTTP_KEEPALIVE_EXPIRY", "30"))
+# HTTP/2 needs the optional h2 package (pip install httpx[http2])
+HTTP2 = os.getenv("AGENTBEATS_HTTP2", "false").lower() in ("1", "true", "yes")
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """
+    Response body stream that calls release() once: when it was read to
+    the end or closed, or else when it is garbage collected.
+    """
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+        self._loop = asyncio.get_running_loop()
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+        self._release_once()
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release_once()
+
+    def _release_once(self):
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+    def __del__(self):
+        release, self._release = getattr(self, "_release", None), None
+        if release is None:
+            return
+        # The response was dropped unread and unclosed; the collector may
+        # run on any thread, the semaphore belongs to the loop
+        try:
+            self._loop.call_soon_threadsafe(release)
+        except RuntimeError:
+            pass  # loop closed, its semaphores went with it
+
+
+class PerHostLimitTransport(httpx.AsyncBaseTransport):
+    """
+    Transport allowing at most max_per_host requests in flight per host;
+    a request counts until its response body is read or closed. Waiting
+    for a slot is bounded by the request's pool timeout, like waiting for
+    a pooled connection, and raises httpx.PoolTimeout.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_per_host: int):
+        self._transport = transport
+        self._max_per_host = max_per_host
+        self._semaphores: Dict[Tuple[bytes, bytes, Optional[int]], asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = (request.url.raw_scheme, request.url.raw_host, request.url.port)
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            semaphore = self._semaphores[key] = asyncio.Semaphore(self._max_per_host)
+        timeout = request.extensions.get("timeout", {}).get("pool")
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise httpx.PoolTimeout(
+                f"Timed out waiting for one of {self._max_per_host} requests "
+                f"in flight to {request.url.host}",
+                request=request,
+            ) from None
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            semaphore.release()
+            raise
+        response.stream = _ReleasingStream(response.stream, semaphore.release)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        logger.warning("AGENTBEATS_HTTP2 is set but the h2 package is missing, using HTTP/1.1")
+        return False
+
+
+def _create_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    transport = httpx.AsyncHTTPTransport(
+        limits=limits, http2=HTTP2 and _http2_available()
+    )
+    if HTTP_MAX_CONNECTIONS_PER_HOST > 0:
+        transport = PerHostLimitTransport(transport, HTTP_MAX_CONNECTIONS_PER_HOST)
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=httpx.Timeout(
+            connect=HTTP_CONNECT_TIMEOUT,
+            read=HTTP_READ_TIMEOUT,
+            write=HTTP_WRITE_TIMEOUT,
+            pool=HTTP_POOL_TIMEOUT,
+        ),
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared client of the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = _create_client()
+    return client
+
+
+async def close_http_client():
+    """Close the shared client of the running event loop, if any."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -17,58 +17,82 @@ from a2a.types import (
     TextPart,
 )
 
-from agentbeats.utils.agents import get_agent_card, send_message_to_agent
+from agentbeats.utils.agents import (
+    agent_card_cache,
+    close_http_client,
+    get_agent_card,
+    get_http_client,
+    send_message_to_agent,
+)
+
+from .services.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+# Seconds to wait for a launcher to answer a reset or status request
+LAUNCHER_TIMEOUT = 5.0
+
 class AgentBeatsA2AClient:
     """Client for communicating with agents/launcher via A2A protocol using the official SDK."""
     
     def __init__(self):
-        pass  # No longer need client caching since SDK handles it
+        pass  # Connections are pooled by the SDK's shared HTTP client
             
     async def close(self):
-        pass  # SDK handles cleanup
+        """Close the pooled HTTP client of the running event loop."""
+        await close_http_client()
     
-    async def get_agent_card(self, endpoint: str) -> Optional[Dict[str, Any]]:
-        """Get agent card using SDK function."""
-        return await get_agent_card(endpoint)
+    async def get_agent_card(self, endpoint: str, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Get agent card using SDK function, max_age=0 skips the card cache."""
+        return await get_agent_card(endpoint, max_age=max_age)
             
     async def reset_agent_trigger(self, launcher_url: str, 
                                         agent_id: str, 
                                         backend_url: str, 
-                                        extra_args: dict = None) -> bool:
-        """Reset an agent via its launcher."""
-        httpx_client = None
+                                        extra_args: dict = None,
+                                        mode: str = "hard",
+                                        agent_url: Optional[str] = None) -> bool:
+        """
+        Reset an agent via its launcher.
+        mode is the requested reset mode: "soft" asks the launcher to clear the
+        running agent in place, launchers that can't (or predate soft resets)
+        fall back to a hard restart of the agent process.
+        The cached card of agent_url is dropped, a restarted agent may serve
+        a new one.
+        """
+        if agent_url:
+            agent_card_cache.invalidate(agent_url)
         try:
             extra_args = extra_args or {}
-            httpx_client = httpx.AsyncClient()
             
             reset_payload = {
                 "signal": "reset",
                 "agent_id": agent_id,
                 "backend_url": backend_url,
-                "extra_args": extra_args
+                "extra_args": extra_args,
+                "mode": mode,
             }
 
-            response = await httpx_client.post(
+            response = await get_http_client().post(
                 f"{launcher_url}/reset",
-                json=reset_payload
+                json=reset_payload,
+                timeout=LAUNCHER_TIMEOUT,
             )
 
             if response.status_code != 200:
                 logger.error(f"Failed to reset agent at {launcher_url}: {response.status_code}")
                 return False
             else:
-                logger.info(f"Agent reset successfully at {launcher_url}")     
+                try:
+                    applied_mode = response.json().get("mode", "hard")
+                except ValueError:
+                    applied_mode = "hard"
+                logger.info(f"Agent reset successfully at {launcher_url} (requested {mode}, applied {applied_mode})")
             
             return True
         except Exception as e:
             logger.error(f"Error resetting agent at {launcher_url}: {str(e)}")
             return False
-        finally:
-            if httpx_client:
-                await httpx_client.aclose()
         
     async def notify_green_agent(self, 
                                 endpoint: str,                                 
@@ -216,3 +240,4 @@ class AgentBeatsA2AClient:
 
 # Create a client instance
 a2a_client = AgentBeatsA2AClient()
+metrics.gauge("agent_cards", agent_card_cache.stats)
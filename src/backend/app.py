@@ -12,7 +12,10 @@ import os
 
 from .routes import agents, battles, websockets
 from .a2a_client import a2a_client
+from .services.metrics import metrics
 from .routes import matches
+from .routes import leaderboard
+from .routes import blobs
 
 # Configure logging
 logging.basicConfig(
@@ -25,11 +28,16 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up Agent Beats Backend")
-    from .routes.battles import start_battle_processor
+    from .routes.battles import start_battle_processor, load_ratings
+    from .services.leaderboard import leaderboard
+    leaderboard.load()
+    load_ratings()
     start_battle_processor()
+    broadcasts = asyncio.create_task(websockets.websocket_manager.run_broadcasts())
     yield
     # Shutdown
     logger.info("Shutting down Agent Beats Backend")
+    broadcasts.cancel()
     await a2a_client.close()
 
 # Create FastAPI app
@@ -54,6 +62,8 @@ app.include_router(agents.router)
 app.include_router(battles.router)
 app.include_router(websockets.router)
 app.include_router(matches.router)
+app.include_router(leaderboard.router)
+app.include_router(blobs.router)
 
 # Add request logging middleware
 @app.middleware("http")
@@ -68,6 +78,11 @@ async def log_requests(request: Request, call_next):
 def health_check():
     return {"status": "ok"}
 
+# Add a metrics endpoint
+@app.get("/metrics", tags=["Health"])
+def get_metrics():
+    return metrics.snapshot()
+
 # Run the application if this file is executed directly
 if __name__ == "__main__":
     uvicorn.run("app:app", host="0.0.0.0", port=9000, reload=True)
@@ -1,9 +1,11 @@
 import json
 import os
 import sqlite3
+import threading
 import uuid
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, Iterator, List, Any, Optional, Tuple
 
 class JSONStorage:
     """Simple JSON file-based storage to simulate a database."""
@@ -93,16 +95,20 @@ class JSONStorage:
 
 class SQLiteStorage:
     """SQLite-based storage with the same interface as JSONStorage."""
+
+    # Stays below SQLite's host parameter limit in batched queries
+    MAX_BATCH_PARAMS = 500
     
     def __init__(self, db_dir: str):
         self.db_dir = db_dir
         os.makedirs(self.db_dir, exist_ok=True)
         self.db_path = os.path.join(self.db_dir, 'database.db')
+        self._local = threading.local()
         self._init_db()
         
     def _init_db(self):
         """Initialize the database with required tables."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS collections (
                     id TEXT PRIMARY KEY,
@@ -115,7 +121,169 @@ class SQLiteStorage:
                 CREATE INDEX IF NOT EXISTS idx_collection 
                 ON collections(collection)
             ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_collection_created_at
+                ON collections(collection, created_at)
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS agent_battle_history (
+                    agent_id TEXT NOT NULL,
+                    battle_id TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (agent_id, battle_id)
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_agent_battle_history_time
+                ON agent_battle_history(agent_id, timestamp)
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS leaderboard (
+                    agent_id TEXT PRIMARY KEY,
+                    rating REAL,
+                    win_rate REAL NOT NULL,
+                    data TEXT NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_leaderboard_rating
+                ON leaderboard(rating DESC, win_rate DESC)
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_leaderboard_win_rate
+                ON leaderboard(win_rate DESC, rating DESC)
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS battle_queue (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    battle_id TEXT NOT NULL UNIQUE,
+                    enqueued_at TEXT NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS battle_events (
+                    battle_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    data TEXT NOT NULL,
+                    idempotency_key TEXT,
+                    PRIMARY KEY (battle_id, seq)
+                )
+            ''')
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(battle_events)')}
+            if 'idempotency_key' not in columns:
+                conn.execute('ALTER TABLE battle_events ADD COLUMN idempotency_key TEXT')
+            conn.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_battle_events_idempotency_key
+                ON battle_events(battle_id, idempotency_key)
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS blobs (
+                    hash TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    content_type TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+            ''')
+            self._migrate_battle_history(conn)
+            self._migrate_battle_events(conn)
+
+    def _migrate_battle_history(self, conn: sqlite3.Connection):
+        """Move battle_history arrays embedded in agent documents to their own table."""
+        cursor = conn.execute('''
+            SELECT id, data FROM collections
+            WHERE collection = 'agents' AND data LIKE '%"battle_history"%'
+        ''')
+        for agent_id, data_str in cursor.fetchall():
+            agent = self._deserialize_data(data_str)
+            history = agent.get('elo', {}).pop('battle_history', None)
+            if history is None:
+                continue
+            conn.executemany('''
+                INSERT OR REPLACE INTO agent_battle_history (agent_id, battle_id, timestamp, data)
+                VALUES (?, ?, ?, ?)
+            ''', [
+                (agent_id, entry.get('battle_id', ''), entry.get('timestamp', ''), self._serialize_data(entry))
+                for entry in history
+            ])
+            conn.execute('''
+                UPDATE collections SET data = ?
+                WHERE collection = 'agents' AND id = ?
+            ''', (self._serialize_data(agent), agent_id))
+
+    def _migrate_battle_events(self, conn: sqlite3.Connection):
+        """Move interact_history arrays embedded in battle documents to the battle_events table."""
+        cursor = conn.execute('''
+            SELECT id, data FROM collections
+            WHERE collection = 'battles' AND data LIKE '%"interact_history"%'
+        ''')
+        for battle_id, data_str in cursor.fetchall():
+            battle = self._deserialize_data(data_str)
+            history = battle.pop('interact_history', None)
+            if history is None:
+                continue
+            for seq, event in enumerate(history, start=1):
+                event['seq'] = seq
+            conn.executemany('''
+                INSERT OR REPLACE INTO battle_events (battle_id, seq, data)
+                VALUES (?, ?, ?)
+            ''', [(battle_id, event['seq'], self._serialize_data(event)) for event in history])
+            conn.execute('''
+                UPDATE collections SET data = ?
+                WHERE collection = 'battles' AND id = ?
+            ''', (self._serialize_data(battle), battle_id))
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Yield the connection of the current transaction, or a new auto-committing one."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Group storage operations of the current thread into one atomic transaction.
+        Nested transactions join the outermost one.
+        """
+        if getattr(self._local, 'conn', None) is not None:
+            yield
+            return
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('BEGIN IMMEDIATE')
+        self._local.conn = conn
+        self._local.after_commit = []
+        try:
+            yield
             conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            callbacks = self._local.after_commit
+            self._local.conn = None
+            self._local.after_commit = []
+            conn.close()
+        for callback in callbacks:
+            callback()
+
+    def after_commit(self, callback: Callable[[], None]):
+        """
+        Run callback once the current transaction commits (dropped on rollback).
+        Outside a transaction it runs immediately.
+        """
+        if getattr(self._local, 'conn', None) is None:
+            callback()
+        else:
+            self._local.after_commit.append(callback)
     
     def _serialize_data(self, data: Dict[str, Any]) -> str:
         """Serialize data to JSON string."""
@@ -151,18 +319,17 @@ class SQLiteStorage:
         if 'created_at' not in data:
             data['created_at'] = datetime.utcnow().isoformat() + 'Z'
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             conn.execute('''
                 INSERT OR REPLACE INTO collections (id, collection, data, created_at)
                 VALUES (?, ?, ?, ?)
             ''', (data[id_field], collection, self._serialize_data(data), data['created_at']))
-            conn.commit()
             
         return data
         
     def read(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
         """Read a document from a collection."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.execute('''
                 SELECT data FROM collections 
                 WHERE collection = ? AND id = ?
@@ -175,7 +342,7 @@ class SQLiteStorage:
         
     def update(self, collection: str, doc_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update a document in a collection."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             # First, get the existing document
             cursor = conn.execute('''
                 SELECT data FROM collections 
@@ -196,24 +363,49 @@ class SQLiteStorage:
                 SET data = ? 
                 WHERE collection = ? AND id = ?
             ''', (self._serialize_data(existing_data), collection, doc_id))
-            conn.commit()
             
             return existing_data
         
+    def read_many(self, collection: str, doc_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Read several documents of a collection at once, keyed by id. Missing ids are left out."""
+        doc_ids = list(dict.fromkeys(doc_ids))
+        docs = {}
+        with self._connect() as conn:
+            for start in range(0, len(doc_ids), self.MAX_BATCH_PARAMS):
+                chunk = doc_ids[start:start + self.MAX_BATCH_PARAMS]
+                cursor = conn.execute(f'''
+                    SELECT id, data FROM collections
+                    WHERE collection = ? AND id IN ({", ".join("?" * len(chunk))})
+                ''', (collection, *chunk))
+                for doc_id, data_str in cursor.fetchall():
+                    docs[doc_id] = self._deserialize_data(data_str)
+        return docs
+
+    def update_many(self, collection: str, updates: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Merge partial updates into several documents at once. Missing ids are skipped."""
+        with self.transaction(), self._connect() as conn:
+            docs = self.read_many(collection, list(updates))
+            for doc_id, doc in docs.items():
+                doc.update(updates[doc_id])
+            conn.executemany('''
+                UPDATE collections
+                SET data = ?
+                WHERE collection = ? AND id = ?
+            ''', [(self._serialize_data(doc), collection, doc_id) for doc_id, doc in docs.items()])
+            return docs
+
     def delete(self, collection: str, doc_id: str) -> bool:
         """Delete a document from a collection."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.execute('''
                 DELETE FROM collections 
                 WHERE collection = ? AND id = ?
             ''', (collection, doc_id))
-            conn.commit()
-            
             return cursor.rowcount > 0
         
     def list(self, collection: str) -> List[Dict[str, Any]]:
         """List all documents in a collection."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.execute('''
                 SELECT data FROM collections 
                 WHERE collection = ?
@@ -222,9 +414,281 @@ class SQLiteStorage:
             
             return [self._deserialize_data(row[0]) for row in rows]
     
+    def add_battle_history(self, agent_id: str, entry: Dict[str, Any]):
+        """Record an agent's result in a battle."""
+        self.add_battle_history_many([(agent_id, entry)])
+
+    def add_battle_history_many(self, entries: List[Tuple[str, Dict[str, Any]]]):
+        """Record several (agent_id, entry) battle results at once."""
+        with self._connect() as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO agent_battle_history (agent_id, battle_id, timestamp, data)
+                VALUES (?, ?, ?, ?)
+            ''', [
+                (agent_id, entry['battle_id'], entry['timestamp'], self._serialize_data(entry))
+                for agent_id, entry in entries
+            ])
+
+    def list_battle_history(self, agent_id: str, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        """List an agent's battle results, most recent first."""
+        with self._connect() as conn:
+            cursor = conn.execute('''
+                SELECT data FROM agent_battle_history
+                WHERE agent_id = ?
+                ORDER BY timestamp DESC
+                LIMIT ? OFFSET ?
+            ''', (agent_id, limit, offset))
+            return [self._deserialize_data(row[0]) for row in cursor.fetchall()]
+
+    def count_battle_history(self, agent_id: str) -> int:
+        """Count the battles recorded for an agent."""
+        with self._connect() as conn:
+            cursor = conn.execute('''
+                SELECT COUNT(*) FROM agent_battle_history WHERE agent_id = ?
+            ''', (agent_id,))
+            return cursor.fetchone()[0]
+
+    def delete_battle_history(self, agent_id: str) -> int:
+        """Delete every battle result recorded for an agent."""
+        with self._connect() as conn:
+            cursor = conn.execute('''
+                DELETE FROM agent_battle_history WHERE agent_id = ?
+            ''', (agent_id,))
+            return cursor.rowcount
+
+    def upsert_leaderboard_entry(self, entry: Dict[str, Any]):
+        """Write an agent's leaderboard entry."""
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO leaderboard (agent_id, rating, win_rate, data)
+                VALUES (?, ?, ?, ?)
+            ''', (entry['agent_id'], entry.get('rating'), entry['win_rate'], self._serialize_data(entry)))
+
+    def read_leaderboard_entry(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        """Read an agent's leaderboard entry."""
+        with self._connect() as conn:
+            cursor = conn.execute('''
+                SELECT data FROM leaderboard WHERE agent_id = ?
+            ''', (agent_id,))
+            row = cursor.fetchone()
+            return self._deserialize_data(row[0]) if row else None
+
+    def delete_leaderboard_entry(self, agent_id: str) -> bool:
+        """Delete an agent's leaderboard entry."""
+        with self._connect() as conn:
+            cursor = conn.execute('''
+                DELETE FROM leaderboard WHERE agent_id = ?
+            ''', (agent_id,))
+            return cursor.rowcount > 0
+
+    def list_leaderboard_entries(self) -> List[Dict[str, Any]]:
+        """List every leaderboard entry."""
+        with self._connect() as conn:
+            cursor = conn.execute('''
+                SELECT data FROM leaderboard
+            ''')
+            return [self._deserialize_data(row[0]) for row in cursor.fetchall()]
+
+    def append_battle_events(self, battle_id: str, events: List[Dict[str, Any]],
+                             prepare: Optional[Callable[[Dict[str, Any]], Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Append events to a battle's history, setting their consecutive seq numbers.
+        Events whose idempotency_key was already stored are skipped; returns
+        the events actually appended. prepare is called, in the same
+        transaction, on each event about to be appended (e.g. to offload
+        large payloads to blobs), never on a skipped duplicate.
+        """
+        with self.transaction(), self._connect() as conn:
+            events = self._new_battle_events(conn, battle_id, events)
+            if prepare is not None:
+                for event in events:
+                    prepare(event)
+            cursor = conn.execute('''
+                SELECT COALESCE(MAX(seq), 0) FROM battle_events WHERE battle_id = ?
+            ''', (battle_id,))
+            seq = cursor.fetchone()[0]
+            for event in events:
+                seq += 1
+                event['seq'] = seq
+            conn.executemany('''
+                INSERT INTO battle_events (battle_id, seq, data, idempotency_key)
+                VALUES (?, ?, ?, ?)
+            ''', [
+                (battle_id, event['seq'], self._serialize_data(event), event.get('idempotency_key'))
+                for event in events
+            ])
+        return events
+
+    def new_battle_events(self, battle_id: str, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Filter out events whose idempotency_key was already stored for the battle."""
+        with self._connect() as conn:
+            return self._new_battle_events(conn, battle_id, events)
+
+    def _new_battle_events(self, conn: sqlite3.Connection, battle_id: str,
+                           events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        keys = [event['idempotency_key'] for event in events if event.get('idempotency_key')]
+        seen = set()
+        for start in range(0, len(keys), self.MAX_BATCH_PARAMS):
+            chunk = keys[start:start + self.MAX_BATCH_PARAMS]
+            cursor = conn.execute(f'''
+                SELECT idempotency_key FROM battle_events
+                WHERE battle_id = ? AND idempotency_key IN ({", ".join("?" * len(chunk))})
+            ''', [battle_id, *chunk])
+            seen.update(row[0] for row in cursor.fetchall())
+        new_events = []
+        for event in events:
+            key = event.get('idempotency_key')
+            if key:
+                if key in seen:
+                    continue
+                seen.add(key)
+            new_events.append(event)
+        return new_events
+
+    def list_battle_events(self, battle_id: str, after_seq: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """List a battle's events with seq greater than after_seq, in order."""
+        with self._connect() as conn:
+            cursor = conn.execute('''
+                SELECT data FROM battle_events
+                WHERE battle_id = ? AND seq > ?
+                ORDER BY seq
+                LIMIT ?
+            ''', (battle_id, after_seq, -1 if limit is None else limit))
+            return [self._deserialize_data(row[0]) for row in cursor.fetchall()]
+
+    def battle_event_seq(self, battle_id: str) -> int:
+        """Seq of a battle's last event, 0 without events."""
+        with self._connect() as conn:
+            cursor = conn.execute('''
+                SELECT COALESCE(MAX(seq), 0) FROM battle_events WHERE battle_id = ?
+            ''', (battle_id,))
+            return cursor.fetchone()[0]
+
+    def attach_battle_events(self, battles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Set interact_history on battle documents from their stored events, in one query per batch."""
+        by_id = {battle['battle_id']: battle for battle in battles}
+        for battle in battles:
+            battle['interact_history'] = []
+        battle_ids = list(by_id)
+        with self._connect() as conn:
+            for start in range(0, len(battle_ids), self.MAX_BATCH_PARAMS):
+                chunk = battle_ids[start:start + self.MAX_BATCH_PARAMS]
+                cursor = conn.execute(f'''
+                    SELECT battle_id, data FROM battle_events
+                    WHERE battle_id IN ({", ".join("?" * len(chunk))})
+                    ORDER BY battle_id, seq
+                ''', chunk)
+                for battle_id, data_str in cursor.fetchall():
+                    by_id[battle_id]['interact_history'].append(self._deserialize_data(data_str))
+        return battles
+
+    def list_battle_summaries(self, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        List battle summaries, most recent first: the fields list views
+        show and the number of events, without loading full battles.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute('''
+                SELECT json_extract(c.data, '$.battle_id'),
+                       json_extract(c.data, '$.state'),
+                       json_extract(c.data, '$.green_agent_id'),
+                       json_extract(c.data, '$.opponents'),
+                       json_extract(c.data, '$.result.winner'),
+                       json_extract(c.data, '$.result.winner_agent_id'),
+                       c.created_at,
+                       COALESCE(json_extract(c.data, '$.result.finish_time'),
+                                json_extract(c.data, '$.result.reported_at')),
+                       (SELECT COUNT(*) FROM battle_events e WHERE e.battle_id = c.id)
+                FROM (
+                    SELECT id, data, created_at FROM collections
+                    WHERE collection = 'battles'
+                    ORDER BY created_at DESC
+                    LIMIT ? OFFSET ?
+                ) c
+                ORDER BY c.created_at DESC
+            ''', (-1 if limit is None else limit, offset))
+            return [
+                {
+                    'battle_id': battle_id,
+                    'state': state,
+                    'green_agent_id': green_agent_id,
+                    'opponents': json.loads(opponents) if opponents else [],
+                    'winner': winner,
+                    'winner_agent_id': winner_agent_id,
+                    'created_at': created_at,
+                    'finish_time': finish_time,
+                    'event_count': event_count,
+                }
+                for (battle_id, state, green_agent_id, opponents, winner,
+                     winner_agent_id, created_at, finish_time, event_count) in cursor.fetchall()
+            ]
+
+    def count(self, collection: str) -> int:
+        """Count the documents in a collection."""
+        with self._connect() as conn:
+            cursor = conn.execute('''
+                SELECT COUNT(*) FROM collections WHERE collection = ?
+            ''', (collection,))
+            return cursor.fetchone()[0]
+
+    def put_blob(self, blob_hash: str, data: bytes, content_type: str):
+        """Store a blob under its content hash; storing it again is a no-op."""
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT OR IGNORE INTO blobs (hash, size, content_type, data, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (blob_hash, len(data), content_type, data, datetime.utcnow().isoformat() + 'Z'))
+
+    def get_blob_info(self, blob_hash: str) -> Optional[Dict[str, Any]]:
+        """Get the size and content type of a blob."""
+        with self._connect() as conn:
+            cursor = conn.execute('''
+                SELECT size, content_type FROM blobs WHERE hash = ?
+            ''', (blob_hash,))
+            row = cursor.fetchone()
+            return {'size': row[0], 'content_type': row[1]} if row else None
+
+    def read_blob(self, blob_hash: str, start: int = 0, length: Optional[int] = None) -> Optional[bytes]:
+        """Read length bytes of a blob from offset start, or up to its end."""
+        with self._connect() as conn:
+            if length is None:
+                cursor = conn.execute('''
+                    SELECT substr(data, ?) FROM blobs WHERE hash = ?
+                ''', (start + 1, blob_hash))
+            else:
+                cursor = conn.execute('''
+                    SELECT substr(data, ?, ?) FROM blobs WHERE hash = ?
+                ''', (start + 1, length, blob_hash))
+            row = cursor.fetchone()
+            return bytes(row[0]) if row else None
+
+    def enqueue_battle(self, battle_id: str):
+        """Append a battle to the persisted battle queue."""
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT OR IGNORE INTO battle_queue (battle_id, enqueued_at)
+                VALUES (?, ?)
+            ''', (battle_id, datetime.utcnow().isoformat() + 'Z'))
+
+    def dequeue_battle(self, battle_id: str) -> bool:
+        """Remove a battle from the persisted battle queue."""
+        with self._connect() as conn:
+            cursor = conn.execute('''
+                DELETE FROM battle_queue WHERE battle_id = ?
+            ''', (battle_id,))
+            return cursor.rowcount > 0
+
+    def list_battle_queue(self) -> List[str]:
+        """List queued battle ids in queue order."""
+        with self._connect() as conn:
+            cursor = conn.execute('''
+                SELECT battle_id FROM battle_queue ORDER BY seq
+            ''')
+            return [row[0] for row in cursor.fetchall()]
+
     def list_collections(self) -> List[str]:
         """List all collection names in the database."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.execute('''
                 SELECT DISTINCT collection FROM collections
                 ORDER BY collection
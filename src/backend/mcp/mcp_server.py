@@ -1,16 +1,15 @@
 # -*- coding: utf-8 -*-
 
-import httpx
 import logging
 import argparse
 import requests
+import threading
 
 from uuid import uuid4
-from typing import List
+from typing import Any, Dict, List, Optional
 from fastmcp import FastMCP
 from datetime import datetime
 from a2a.types import Part, TextPart, AgentCard
-from a2a.client import A2AClient, A2ACardResolver
 from a2a.types import (
     AgentCard, Message, Part, TextPart, Role, 
     SendStreamingMessageRequest,
@@ -19,6 +18,10 @@ from a2a.types import (
     TaskArtifactUpdateEvent,
     TaskStatusUpdateEvent,
 )
+from agentbeats.utils.agents import create_a2a_client
+from agentbeats.logging.spool import (
+    EventSpool, SpoolReplayer, SEND_OK, SEND_RETRY, SEND_DROP,
+)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -29,6 +32,56 @@ logger = logging.getLogger(__name__)
 server = FastMCP("Open MCP for AgentBeast Battle Arena")
 BACKEND_URL = "" # will be set from command line argument
 
+_session = requests.Session()
+_replayer: Optional[SpoolReplayer] = None
+_spool_lock = threading.Lock()
+
+
+def _send_events(backend_url: str, battle_id: str, events: List[Dict[str, Any]]) -> str:
+    """Post a batch of battle events once, returning SEND_OK, SEND_RETRY or SEND_DROP."""
+    try:
+        response = _session.post(
+            f"{backend_url}/battles/{battle_id}/events:batch",
+            json=events,
+            timeout=10
+        )
+    except requests.exceptions.RequestException as e:
+        logger.error("Network error when logging to backend for battle %s: %s", battle_id, str(e))
+        return SEND_RETRY
+    if response.ok:
+        return SEND_OK
+    logger.error("Failed to log to backend for battle %s: %s", battle_id, response.text)
+    if response.status_code == 429 or response.status_code >= 500:
+        return SEND_RETRY
+    return SEND_DROP
+
+
+def _get_replayer() -> SpoolReplayer:
+    """Return the spool replayer, opening the spool on first use."""
+    global _replayer
+    with _spool_lock:
+        if _replayer is None:
+            _replayer = SpoolReplayer(EventSpool(), _send_events)
+            _replayer.start()
+        return _replayer
+
+
+def _record_event(battle_id: str, event: Dict[str, Any]) -> str:
+    """
+    Upload one battle event, spooling it for replay if the backend is
+    unavailable. Returns SEND_OK, SEND_RETRY (spooled) or SEND_DROP.
+    """
+    event["idempotency_key"] = uuid4().hex
+    replayer = _get_replayer()
+    # Events spooled earlier go first, so queue behind them
+    if not replayer.spool.has_pending():
+        outcome = _send_events(BACKEND_URL, battle_id, [event])
+        if outcome != SEND_RETRY:
+            return outcome
+    replayer.spool.append(BACKEND_URL, battle_id, [event])
+    replayer.wake()
+    return SEND_RETRY
+
 
 @server.tool()
 def echo(message: str) -> str:
@@ -45,20 +98,9 @@ async def talk_to_agent(query: str, target_url: str) -> str:
     Forward *query* to another A2A agent at *target_url* and stream back
     the plain-text response.
     """
-    httpx_client = httpx.AsyncClient(timeout=httpx.Timeout(connect=10.0,
-                                                           read=180.0,
-                                                            write=10.0,
-                                                             pool=10.0 
-                                                             )
-                                                         )
-    resolver = A2ACardResolver(httpx_client=httpx_client, base_url=target_url)
-    card: AgentCard | None = await resolver.get_agent_card(
-        relative_card_path="/.well-known/agent.json"
-    )
-    if card is None:
-        raise RuntimeError(f"Failed to resolve agent card from {target_url}")
-
-    client = A2AClient(httpx_client=httpx_client, agent_card=card)
+    # Card from the shared cache, pooled client whose default read timeout
+    # allows long agent replies
+    client = await create_a2a_client(target_url)
 
     params = MessageSendParams(
         message=Message(
@@ -130,35 +172,14 @@ def update_battle_process(battle_id: str, message: str, reported_by: str, detail
 
     if markdown_content:
         event_data["markdown_content"] = markdown_content
-    try:
-        # Call backend API
-        response = requests.post(
-            f"{BACKEND_URL}/battles/{battle_id}",
-            json=event_data,
-            headers={"Content-Type": "application/json"},
-            timeout=10
-        )
-        
-        if response.status_code == 204:
-            logger.info("Successfully logged to backend for battle %s", battle_id)
-            return 'logged to backend'
-        else:
-            logger.error("Failed to log to backend for battle %s: %s", battle_id, response.text)
-            # Fallback to local file logging
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            line = f"[INFO] [{timestamp}] {message}\n"
-            with open(f"{battle_id}.log", "a", encoding="utf-8") as f:
-                f.write(line)
-            return 'logged locally (backend failed)'
-            
-    except requests.exceptions.RequestException as e:
-        logger.error("Network error when logging to backend for battle %s: %s", battle_id, str(e))
-        # Fallback to local file logging
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        line = f"[INFO] [{timestamp}] {message}\n"
-        with open(f"{battle_id}.log", "a", encoding="utf-8") as f:
-            f.write(line)
-        return 'logged locally (network error)'
+
+    outcome = _record_event(battle_id, event_data)
+    if outcome == SEND_OK:
+        logger.info("Successfully logged to backend for battle %s", battle_id)
+        return 'logged to backend'
+    if outcome == SEND_RETRY:
+        return 'spooled locally, will be uploaded when the backend is back'
+    return 'rejected by backend'
 
 
 @server.tool()
@@ -190,36 +211,14 @@ def report_on_battle_end(battle_id: str, message:str, winner: str, reported_by:
 
     if markdown_content:
         result_data["markdown_content"] = markdown_content
-    
-    try:
-        # Call backend API
-        response = requests.post(
-            f"{BACKEND_URL}/battles/{battle_id}",
-            json=result_data,
-            headers={"Content-Type": "application/json"},
-            timeout=10
-        )
-        
-        if response.status_code == 204:
-            logger.info("Successfully reported battle result to backend for battle %s", battle_id)
-            return f'battle result reported: winner={winner}'
-        else:
-            logger.error("Failed to report battle result to backend for battle %s: %s", battle_id, response.text)
-            # Fallback to local file logging
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            line = f"[RESULT] [{timestamp}] Winner: {winner}\n"
-            with open(f"{battle_id}.log", "a", encoding="utf-8") as f:
-                f.write(line)
-            return 'result logged locally (backend failed)'
-            
-    except requests.exceptions.RequestException as e:
-        logger.error("Network error when reporting battle result for battle %s: %s", battle_id, str(e))
-        # Fallback to local file logging
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        line = f"[RESULT] [{timestamp}] Winner: {winner}\n"
-        with open(f"{battle_id}.log", "a", encoding="utf-8") as f:
-            f.write(line)
-        return 'result logged locally (network error)'
+
+    outcome = _record_event(battle_id, result_data)
+    if outcome == SEND_OK:
+        logger.info("Successfully reported battle result to backend for battle %s", battle_id)
+        return f'battle result reported: winner={winner}'
+    if outcome == SEND_RETRY:
+        return 'result spooled locally, will be uploaded when the backend is back'
+    return 'result rejected by backend'
 
 
 if __name__ == "__main__":
@@ -1,17 +1,20 @@
 import asyncio
 import logging
 from typing import Dict, Any, List
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, Query, status, Depends
 from pydantic import BaseModel, Field
 from typing import Literal
 from agents import Agent, Runner
 import httpx
+from agentbeats.utils.agents import get_http_client
 
 from ..db.storage import db
 from ..a2a_client import a2a_client
 from ..auth.middleware import get_current_user, get_optional_user
+from ..services.leaderboard import leaderboard
 from ..services.match_storage import MatchStorage
 from ..services.role_matcher import RoleMatcher
+from .websockets import websocket_manager
 
 # =============================================================================
 # AGENT REGISTRATION LOGGING CONFIGURATION
@@ -281,7 +284,6 @@ async def register_agent(
             ),  # Use display name or email
             "elo": {
                 "rating": elo_rating,
-                "battle_history": [],
                 "stats": {
                     "wins": 0,
                     "losses": 0,
@@ -298,7 +300,10 @@ async def register_agent(
 
         # Save to database
         agent_registration_logger.info(f"💾 Saving agent to database...")
-        created_agent = db.create("agents", agent_record)
+        with db.transaction():
+            created_agent = db.create("agents", agent_record)
+            leaderboard.update(created_agent)
+        websocket_manager.publish_agent_status(created_agent["agent_id"], created_agent)
         agent_registration_logger.info(
             f"✅ Agent saved with ID: {created_agent['agent_id']}"
         )
@@ -346,9 +351,10 @@ async def check_agents_liveness(
             if not agent_url:
                 return False
             try:
-                # Use asyncio.wait_for to add additional timeout layer
+                # Use asyncio.wait_for to add additional timeout layer;
+                # max_age=0 asks the agent, a conditional request if it can
                 agent_card = await asyncio.wait_for(
-                    a2a_client.get_agent_card(agent_url), timeout=1.5
+                    a2a_client.get_agent_card(agent_url, max_age=0), timeout=1.5
                 )
                 return bool(agent_card)
             except (asyncio.TimeoutError, Exception):
@@ -376,6 +382,8 @@ async def check_agents_liveness(
             agent["live"] = agent_card_accessible and launcher_alive
         except Exception:
             agent["live"] = False
+        # Only transitions reach agents topic subscribers
+        websocket_manager.publish_agent_status(agent["agent_id"], {"live": agent["live"]})
         return agent
 
     # Use semaphore to limit concurrent checks
@@ -488,6 +496,34 @@ def get_agent(
         )
 
 
+@router.get("/agents/{agent_id}/battles")
+def get_agent_battles(
+    agent_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+) -> Dict[str, Any]:
+    """Get a page of an agent's battle history, most recent first."""
+    try:
+        if not db.read("agents", agent_id):
+            raise HTTPException(
+                status_code=404, detail=f"Agent with ID {agent_id} not found"
+            )
+
+        return {
+            "agent_id": agent_id,
+            "total": db.count_battle_history(agent_id),
+            "limit": limit,
+            "offset": offset,
+            "battles": db.list_battle_history(agent_id, limit, offset),
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error retrieving agent battles: {str(e)}"
+        )
+
+
 @router.delete("/agents/{agent_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_agent(
     agent_id: str, current_user: Dict[str, Any] = Depends(get_current_user)
@@ -521,8 +557,12 @@ def delete_agent(
             )
             # Continue with agent deletion even if match cleanup fails
 
-        # Delete the agent
-        db.delete("agents", agent_id)
+        # Delete the agent along with its battle history
+        with db.transaction():
+            db.delete_battle_history(agent_id)
+            db.delete("agents", agent_id)
+            leaderboard.remove(agent_id)
+        websocket_manager.publish_agent_status(agent_id, {"deleted": True})
         return None
     except HTTPException:
         raise
@@ -553,6 +593,7 @@ def update_agent(
         if "ready" in update and len(update) == 1:
             agent["ready"] = bool(update["ready"])
             db.update("agents", agent_id, agent)
+            websocket_manager.publish_agent_status(agent_id, agent)
             return None
 
         # For other updates, require authentication and ownership check
@@ -576,6 +617,7 @@ def update_agent(
         # You can add more fields to update here as needed
 
         db.update("agents", agent_id, agent)
+        websocket_manager.publish_agent_status(agent_id, agent)
         return None
     except HTTPException:
         raise
@@ -597,7 +639,9 @@ def update_agent_card(agent_id: str, card: Dict[str, Any]):
 
         # Update the agent card
         agent["agent_card"] = card
-        db.update("agents", agent_id, agent)
+        with db.transaction():
+            db.update("agents", agent_id, agent)
+            leaderboard.update(agent)
         return None
     except HTTPException:
         raise
@@ -741,19 +785,20 @@ async def check_launcher_status(request: Dict[str, Any]):
 
         launcher_url_clean = launcher_url.rstrip("/")
 
-        async with httpx.AsyncClient(timeout=1.0) as client:
-            response = await client.get(f"{launcher_url_clean}/status")
+        response = await get_http_client().get(
+            f"{launcher_url_clean}/status", timeout=1.0
+        )
 
-            if response.status_code == 200:
-                try:
-                    data = response.json()
-                    is_online = (
-                        data.get("status") == "server up, with agent running"
-                    )
-                except:
-                    is_online = False
-            else:
+        if response.status_code == 200:
+            try:
+                data = response.json()
+                is_online = (
+                    data.get("status") == "server up, with agent running"
+                )
+            except:
                 is_online = False
+        else:
+            is_online = False
 
         return {
             "online": is_online,
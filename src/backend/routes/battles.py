@@ -4,8 +4,9 @@ Battle management for AgentBeats backend.
 """
 
 import asyncio
-from typing import Dict, Any, List, Optional
-from fastapi import APIRouter, HTTPException, status
+from typing import Dict, Any, List, Optional, Set, Tuple
+from fastapi import APIRouter, HTTPException, Query, status
+from starlette.concurrency import run_in_threadpool
 import time
 import threading
 from datetime import datetime
@@ -13,9 +14,22 @@ import os
 import logging
 import re
 import subprocess
+import uuid
 
 from ..db.storage import db
 from ..a2a_client import a2a_client
+from ..services.admission import admission
+from ..services.blob_store import blob_store
+from ..services.event_feed import event_feed
+from ..services.leaderboard import leaderboard
+from ..services.metrics import metrics
+from ..services.rating import (
+    DEFAULT_RATING,
+    RATING_SYSTEMS,
+    Game,
+    RatingEngine,
+    battle_games,
+)
 from .websockets import websocket_manager
 
 router = APIRouter()
@@ -23,12 +37,29 @@ router = APIRouter()
 # Configuration constants
 default_ready_timeout = 120
 default_battle_timeout = 300
+# Queued battles pre-warmed ahead; battles run one at a time, so the
+# head is the next to start and later ones are warmed once they reach it
+default_prewarm_lookahead = 1
+default_prewarm_lease = 60
+default_prewarm_interval = 5
 
 # Global state management
+rating_engine = RatingEngine(os.getenv("AGENTBEATS_RATING_SYSTEM", "elo"))
+# Guards rating_engine; held from rating a result until it is recorded
+rating_lock = threading.RLock()
 battle_queue = []
 queue_lock = threading.Lock()
 processor_running = False
 
+metrics.gauge("battles.queue_depth", lambda: len(battle_queue))
+
+# Agents reset ahead of time for an upcoming queued battle.
+# agent_id -> {"battle_id": str, "expires_at": float, "reset": bool},
+# guarded by queue_lock; "reset" is set once the launcher accepted the reset.
+agent_leases: Dict[str, Dict[str, Any]] = {}
+# Look-ahead tasks of active battles, on the battle processor's event loop
+prewarm_tasks: Set[asyncio.Task] = set()
+
 logger = logging.getLogger("battles")
 logger.setLevel(logging.INFO)
 if not logger.hasHandlers():
@@ -49,9 +80,6 @@ def add_system_log(
         if not battle:
             return False
 
-        if "interact_history" not in battle:
-            battle["interact_history"] = []
-
         log_entry = {
             "is_result": False,
             "message": message,
@@ -60,15 +88,11 @@ def add_system_log(
         }
         if detail is not None:
             log_entry["detail"] = detail
-        battle["interact_history"].append(log_entry)
-        db.update("battles", battle_id, battle)
+        db.append_battle_events(battle_id, [log_entry])
+        event_feed.notify(battle_id)
 
         # Broadcast the updated battle to all subscribers
-        try:  
-            asyncio.run(websocket_manager.broadcast_battle_update(battle))  
-        except RuntimeError:  
-            # Event loop already running or not available, skip broadcast  
-            pass
+        websocket_manager.publish_battle(battle)
 
         return True
     except Exception as e:
@@ -99,6 +123,44 @@ def cleanup_stuck_agents():
         print(f"Error cleaning up stuck agents: {str(e)}")
 
 
+def restore_battle_queue():
+    """Reload the battles still queued by previous runs, in queue order."""
+    try:
+        queued_ids = db.list_battle_queue()
+        battles = db.read_many("battles", queued_ids)
+        restored = [
+            battle_id
+            for battle_id in queued_ids
+            if battles.get(battle_id, {}).get("state") == "queued"
+        ]
+        with db.transaction():
+            for battle_id in set(queued_ids) - set(restored):
+                db.dequeue_battle(battle_id)
+        with queue_lock:
+            battle_queue.extend(
+                battle_id for battle_id in restored
+                if battle_id not in battle_queue
+            )
+
+        if restored:
+            print(f"Restored {len(restored)} queued battles on startup")
+    except Exception as e:
+        print(f"Error restoring battle queue: {str(e)}")
+
+
+def queue_battle(battle_id: str):
+    """Append a battle, already persisted in the queue table, to the in-memory queue."""
+    with queue_lock:
+        battle_queue.append(battle_id)
+
+
+def unqueue_battle(battle_id: str):
+    """Drop a battle from the in-memory queue, e.g. one finished before its turn."""
+    with queue_lock:
+        if battle_id in battle_queue:
+            battle_queue.remove(battle_id)
+
+
 def start_battle_processor():
     """Start the background battle queue processor if not already running."""
     global processor_running
@@ -107,52 +169,224 @@ def start_battle_processor():
 
     # Clean up any stuck agents on startup
     cleanup_stuck_agents()
+    restore_battle_queue()
 
     processor_running = True
 
+    async def run_battle_queue():
+        while processor_running:
+            # Get the next battle from the queue
+            battle_id = None
+            with queue_lock:
+                if battle_queue:
+                    battle_id = battle_queue.pop(0)
+
+            if battle_id:
+                db.dequeue_battle(battle_id)
+                # Process the battle
+                await process_battle(battle_id)
+
+            # Sleep to avoid busy waiting
+            await asyncio.sleep(1)
+
     # Start the battle queue processing in a background thread
     def process_battle_queue():
         """Background thread that continuously processes battles from the queue."""
         global processor_running
+        # One loop for all battles, so pooled agent connections are reused
+        # and look-ahead tasks keep running after process_battle returns
+        loop = asyncio.new_event_loop()
         try:
-            while processor_running:
-                # Get the next battle from the queue
-                battle_id = None
-                with queue_lock:
-                    if battle_queue:
-                        battle_id = battle_queue.pop(0)
-
-                if battle_id:
-                    # Process the battle
-                    asyncio.run(process_battle(battle_id))
-
-                # Sleep to avoid busy waiting
-                time.sleep(1)
+            loop.run_until_complete(run_battle_queue())
         except Exception as e:
             print(f"Error in battle queue processor: {str(e)}")
         finally:
             processor_running = False
+            for task in list(prewarm_tasks):
+                task.cancel()
+            loop.run_until_complete(
+                asyncio.gather(*prewarm_tasks, return_exceptions=True)
+            )
+            loop.run_until_complete(a2a_client.close())
+            loop.close()
 
     threading.Thread(target=process_battle_queue, daemon=True).start()
 
 
 # Agent management utilities
-def unlock_agent(agent_id: str):
-    """Unlock a single agent and set it to not ready."""
+def unlock_agent(agent_id: str, clean: bool = False):
+    """
+    Unlock a single agent and set it to not ready.
+    clean tells whether the agent's battle finished normally, only then may
+    its next reset reuse the running process (soft reset).
+    """
     agent = db.read("agents", agent_id)
     if agent:
         agent["status"] = "unlocked"
         agent["ready"] = False
+        agent["soft_reset_ok"] = clean
         db.update("agents", agent_id, agent)
+        websocket_manager.publish_agent_status(agent_id, agent)
         return True
     return False
 
 
-def unlock_and_unready_agents(battle: Dict[str, Any]):
-    """Unlock all agents in a battle and set them to not ready."""
-    opponent_ids = [op["agent_id"] for op in battle["opponents"]]
-    for agent_id in [battle["green_agent_id"]] + opponent_ids:
-        unlock_agent(agent_id)
+def reset_mode(agent: Dict[str, Any]) -> str:
+    """Reset mode to request from an agent's launcher."""
+    return "soft" if agent.get("soft_reset_ok") else "hard"
+
+
+def battle_agent_ids(battle: Dict[str, Any]) -> List[str]:
+    """Return the green agent id followed by every opponent id of a battle."""
+    return [battle["green_agent_id"]] + [
+        op["agent_id"] for op in battle.get("opponents", [])
+    ]
+
+
+# Agent pre-warming
+def claim_prewarmed_agents(battle_id: str, agent_ids: List[str]) -> List[str]:
+    """
+    Release the leases held on agent_ids and return the agents whose lease
+    was still valid for battle_id, i.e. agents already reset for this battle.
+    Agents whose pre-warming reset was not sent yet are reset normally.
+    """
+    now = time.time()
+    claimed = []
+    with queue_lock:
+        for agent_id in agent_ids:
+            lease = agent_leases.pop(agent_id, None)
+            if (
+                lease
+                and lease["battle_id"] == battle_id
+                and lease["expires_at"] > now
+                and lease["reset"]
+            ):
+                claimed.append(agent_id)
+    return claimed
+
+
+async def prewarm_queued_battles(active_battle_id: Optional[str] = None):
+    """
+    Look ahead in the queue and trigger launcher resets for the upcoming
+    battle(s) whose agents are all free, so that they are ready when dequeued.
+    Each reset agent is reserved for its battle with a short lease, renewed
+    on every look-ahead while the battle is still queued; an expired lease
+    simply makes process_battle fall back to a regular reset.
+    """
+    try:
+        now = time.time()
+        with queue_lock:
+            upcoming = list(battle_queue[:default_prewarm_lookahead])
+            for agent_id, lease in list(agent_leases.items()):
+                if lease["expires_at"] <= now:
+                    del agent_leases[agent_id]
+
+        battles = db.read_many(
+            "battles", upcoming + ([active_battle_id] if active_battle_id else [])
+        )
+
+        # Agents needed by the active battle or an earlier queued battle
+        # are not free, even if they happen to be unlocked right now.
+        busy = set()
+        active_battle = battles.get(active_battle_id) if active_battle_id else None
+        if active_battle:
+            busy.update(battle_agent_ids(active_battle))
+
+        for battle_id in upcoming:
+            battle = battles.get(battle_id)
+            if not battle or battle.get("state") != "queued":
+                continue
+            agent_ids = battle_agent_ids(battle)
+            if busy.intersection(agent_ids):
+                busy.update(agent_ids)
+                continue
+            busy.update(agent_ids)
+
+            with queue_lock:
+                leases = [agent_leases.get(agent_id) for agent_id in agent_ids]
+                if all(lease and lease["battle_id"] == battle_id for lease in leases):
+                    # Already warming up, still queued: renew the lease
+                    for lease in leases:
+                        lease["expires_at"] = time.time() + default_prewarm_lease
+                    continue
+            if any(lease and lease["battle_id"] != battle_id for lease in leases):
+                continue
+
+            found = db.read_many("agents", agent_ids)
+            agents = [found.get(agent_id) for agent_id in agent_ids]
+            if any(
+                not agent or agent.get("status") != "unlocked"
+                for agent in agents
+            ):
+                continue
+
+            expires_at = time.time() + default_prewarm_lease
+            with queue_lock:
+                for agent_id in agent_ids:
+                    agent_leases[agent_id] = {
+                        "battle_id": battle_id,
+                        "expires_at": expires_at,
+                        "reset": False,
+                    }
+            updated = db.update_many(
+                "agents", {agent_id: {"ready": False} for agent_id in agent_ids}
+            )
+            for agent_id in updated:
+                websocket_manager.publish_agent_status(agent_id, {"ready": False})
+            add_system_log(
+                battle_id,
+                "Pre-warming agents",
+                {"agent_ids": agent_ids, "lease_expires_at": expires_at},
+            )
+
+            for agent in agents:
+                with queue_lock:
+                    lease = agent_leases.get(agent["agent_id"])
+                    if not lease or lease["battle_id"] != battle_id:
+                        break  # dequeued meanwhile, process_battle resets the rest
+                reset = await a2a_client.reset_agent_trigger(
+                    agent["register_info"].get("launcher_url"),
+                    agent_id=agent["agent_id"],
+                    backend_url=os.getenv("PUBLIC_BACKEND_URL"),
+                    extra_args={},
+                    mode=reset_mode(agent),
+                    agent_url=agent["register_info"].get("agent_url"),
+                )
+                if not reset:
+                    # Give up on this battle, it will reset normally when dequeued
+                    with queue_lock:
+                        for agent_id in agent_ids:
+                            lease = agent_leases.get(agent_id)
+                            if lease and lease["battle_id"] == battle_id:
+                                del agent_leases[agent_id]
+                    add_system_log(
+                        battle_id,
+                        "Pre-warming failed",
+                        {"agent_id": agent["agent_id"]},
+                    )
+                    break
+                with queue_lock:
+                    lease = agent_leases.get(agent["agent_id"])
+                    if lease and lease["battle_id"] == battle_id:
+                        lease["reset"] = True
+    except Exception as e:
+        logger.error(f"Error pre-warming queued battles: {e}")
+
+
+async def prewarm_while_active(battle_id: str):
+    """Run the queue look-ahead for as long as battle_id is being set up or played."""
+    while processor_running:
+        battle = db.read("battles", battle_id)
+        if not battle or battle.get("state") not in ("queued", "running"):
+            return
+        await prewarm_queued_battles(active_battle_id=battle_id)
+        await asyncio.sleep(default_prewarm_interval)
+
+
+def start_prewarming(battle_id: str):
+    task = asyncio.create_task(prewarm_while_active(battle_id))
+    prewarm_tasks.add(task)
+    task.add_done_callback(prewarm_tasks.discard)
 
 
 # Battle orchestration
@@ -165,6 +399,10 @@ async def process_battle(battle_id: str):
         if not battle:
             print(f"Battle {battle_id} not found")
             return
+        if battle.get("state") != "queued":
+            # Finished, e.g. by an early result, before its turn came
+            print(f"Battle {battle_id} is {battle.get('state')}, skipping it")
+            return
 
         battle["state"] = "running"
         db.update("battles", battle_id, battle)
@@ -173,16 +411,11 @@ async def process_battle(battle_id: str):
         # Agent validation
         green_agent = db.read("agents", battle["green_agent_id"])
         if not green_agent:
-            battle = db.read("battles", battle_id)
+            battle = finalize_battle(
+                battle_id, {"state": "error", "error": "Green agent not found"}
+            )
             if battle:
-                battle["state"] = "error"
-                battle["error"] = "Green agent not found"
-                db.update("battles", battle_id, battle)
-                update_agent_error_stats(battle)
-                unlock_and_unready_agents(battle)
-                asyncio.create_task(
-                    websocket_manager.broadcast_battle_update(battle)
-                )
+                websocket_manager.publish_battle(battle)
             return
 
         opponent_ids = []
@@ -190,47 +423,60 @@ async def process_battle(battle_id: str):
             opponent_id = opponent_info["agent_id"]
             opponent = db.read("agents", opponent_id)
             if not opponent:
-                battle = db.read("battles", battle_id)
+                battle = finalize_battle(
+                    battle_id,
+                    {
+                        "state": "error",
+                        "error": f"Opponent agent {opponent_id} not found",
+                    },
+                )
                 if battle:
-                    battle["state"] = "error"
-                    battle["error"] = f"Opponent agent {opponent_id} not found"
-                    db.update("battles", battle_id, battle)
-                    update_agent_error_stats(battle)
-                    unlock_and_unready_agents(battle)
-                    asyncio.create_task(
-                        websocket_manager.broadcast_battle_update(battle)
-                    )
+                    websocket_manager.publish_battle(battle)
                 return
             opponent_ids.append(opponent_id)
 
         # Agent locking
-        for agent_id in [battle["green_agent_id"]] + opponent_ids:
-            agent = db.read("agents", agent_id)
-            if agent:
-                agent["status"] = "locked"
-                db.update("agents", agent_id, agent)
+        agent_ids = [battle["green_agent_id"]] + opponent_ids
+        prewarmed = claim_prewarmed_agents(battle_id, agent_ids)
+        for agent_id in agent_ids:
+            # Partial update, so a ready notification from a pre-warmed
+            # agent arriving concurrently is kept
+            update = {"status": "locked"}
+            if agent_id not in prewarmed:
+                update["ready"] = False
+            db.update("agents", agent_id, update)
+            websocket_manager.publish_agent_status(agent_id, update)
         add_system_log(battle_id, "Agents locked")
+        # Warm up the next queued battles while this one sets up and plays
+        start_prewarming(battle_id)
+        if prewarmed:
+            add_system_log(
+                battle_id, "Using pre-warmed agents", {"agent_ids": prewarmed}
+            )
 
         # Agent reset
         green_launcher = green_agent["register_info"]["launcher_url"]
-        green_reset = await a2a_client.reset_agent_trigger(
-            green_launcher,
-            agent_id=battle["green_agent_id"],
-            backend_url=os.getenv("PUBLIC_BACKEND_URL"),
-            extra_args={},
+        green_reset = battle["green_agent_id"] in prewarmed or (
+            await a2a_client.reset_agent_trigger(
+                green_launcher,
+                agent_id=battle["green_agent_id"],
+                backend_url=os.getenv("PUBLIC_BACKEND_URL"),
+                extra_args={},
+                mode=reset_mode(green_agent),
+                agent_url=green_agent["register_info"].get("agent_url"),
+            )
         )
         if not green_reset:
-            battle = db.read("battles", battle_id)
+            battle = finalize_battle(
+                battle_id,
+                {
+                    "state": "error",
+                    "error": "Failed to reset green agent",
+                },
+            )
             if battle:
-                battle["state"] = "error"
-                battle["error"] = "Failed to reset green agent"
-                db.update("battles", battle_id, battle)
                 add_system_log(battle_id, "Green agent reset failed")
-                update_agent_error_stats(battle)
-                unlock_and_unready_agents(battle)
-                asyncio.create_task(
-                    websocket_manager.broadcast_battle_update(battle)
-                )
+                websocket_manager.publish_battle(battle)
             return
 
         opponent_info_send_to_green = []
@@ -239,20 +485,25 @@ async def process_battle(battle_id: str):
             if not op:
                 continue
             op_launcher = op["register_info"].get("launcher_url")
-            op_reset = await a2a_client.reset_agent_trigger(
-                op_launcher,
-                agent_id=op_id,
-                backend_url=os.getenv("PUBLIC_BACKEND_URL"),
-                extra_args={},
+            op_reset = op_id in prewarmed or (
+                await a2a_client.reset_agent_trigger(
+                    op_launcher,
+                    agent_id=op_id,
+                    backend_url=os.getenv("PUBLIC_BACKEND_URL"),
+                    extra_args={},
+                    mode=reset_mode(op),
+                    agent_url=op["register_info"].get("agent_url"),
+                )
             )
             if not op_reset:
-                battle = db.read("battles", battle_id)
+                battle = finalize_battle(
+                    battle_id,
+                    {
+                        "state": "error",
+                        "error": f"Failed to reset {battle['opponents'][idx].get('name')}: {op_id}",
+                    },
+                )
                 if battle:
-                    battle["state"] = "error"
-                    battle["error"] = (
-                        f"Failed to reset {battle['opponents'][idx].get('name')}: {op_id}"
-                    )
-                    db.update("battles", battle_id, battle)
                     add_system_log(
                         battle_id,
                         f"{battle['opponents'][idx].get('name')} reset failed",
@@ -263,11 +514,7 @@ async def process_battle(battle_id: str):
                             ),
                         },
                     )
-                    update_agent_error_stats(battle)
-                    unlock_and_unready_agents(battle)
-                    asyncio.create_task(
-                        websocket_manager.broadcast_battle_update(battle)
-                    )
+                    websocket_manager.publish_battle(battle)
                 return
 
             # Get the actual agent name from the database, fallback to original name from battle
@@ -283,7 +530,6 @@ async def process_battle(battle_id: str):
 
         # Agent readiness check
         ready_timeout = default_ready_timeout
-        agent_ids = [battle["green_agent_id"]] + opponent_ids
         add_system_log(
             battle_id,
             "Waiting for agents to be ready",
@@ -303,40 +549,36 @@ async def process_battle(battle_id: str):
             await asyncio.sleep(5)
 
         if not all_ready:
-            battle = db.read("battles", battle_id)
+            battle = finalize_battle(
+                battle_id,
+                {
+                    "state": "error",
+                    "error": f"Not all agents ready after {ready_timeout} seconds",
+                },
+            )
             if battle:
-                battle["state"] = "error"
-                battle["error"] = (
-                    f"Not all agents ready after {ready_timeout} seconds"
-                )
-                db.update("battles", battle_id, battle)
                 add_system_log(
                     battle_id,
                     "Agents not ready timeout",
                     {"ready_timeout": ready_timeout},
                 )
-                update_agent_error_stats(battle)
-                unlock_and_unready_agents(battle)
-                asyncio.create_task(
-                    websocket_manager.broadcast_battle_update(battle)
-                )
+                websocket_manager.publish_battle(battle)
             return
         add_system_log(battle_id, "All agents ready", {"agent_ids": agent_ids})
 
         # Battle execution
         green_agent_url = green_agent["register_info"]["agent_url"]
         if not green_agent_url:
-            battle = db.read("battles", battle_id)
+            battle = finalize_battle(
+                battle_id,
+                {
+                    "state": "error",
+                    "error": "Green agent url not found",
+                },
+            )
             if battle:
-                battle["state"] = "error"
-                battle["error"] = "Green agent url not found"
-                db.update("battles", battle_id, battle)
                 add_system_log(battle_id, "Green agent url not found")
-                update_agent_error_stats(battle)
-                unlock_and_unready_agents(battle)
-                asyncio.create_task(
-                    websocket_manager.broadcast_battle_update(battle)
-                )
+                websocket_manager.publish_battle(battle)
             return
 
         agents_info = {}
@@ -364,11 +606,14 @@ async def process_battle(battle_id: str):
                 backend_url=os.getenv("PUBLIC_BACKEND_URL"),
             )
             if not success:
-                battle = db.read("battles", battle_id)
+                battle = finalize_battle(
+                    battle_id,
+                    {
+                        "state": "error",
+                        "error": f"Agent {name} failed to respond",
+                    },
+                )
                 if battle:
-                    battle["state"] = "error"
-                    battle["error"] = f"Agent {name} failed to respond"
-                    db.update("battles", battle_id, battle)
                     add_system_log(
                         battle_id,
                         f"Failed to notify {name} agent",
@@ -377,11 +622,7 @@ async def process_battle(battle_id: str):
                             "agent_id": agent_info["agent_id"],
                         },
                     )
-                    update_agent_error_stats(battle)
-                    unlock_and_unready_agents(battle)
-                    asyncio.create_task(
-                        websocket_manager.broadcast_battle_update(battle)
-                    )
+                    websocket_manager.publish_battle(battle)
                 return
 
         # Timeout setup
@@ -434,35 +675,33 @@ async def process_battle(battle_id: str):
         )
 
         if not notify_success:
-            battle = db.read("battles", battle_id)
+            battle = finalize_battle(
+                battle_id,
+                {
+                    "state": "error",
+                    "error": "Failed to notify green agent",
+                },
+            )
             if battle:
-                battle["state"] = "error"
-                battle["error"] = "Failed to notify green agent"
-                db.update("battles", battle_id, battle)
                 add_system_log(
                     battle_id,
                     "Failed to notify green agent",
                     {"green_agent_url": green_agent_url},
                 )
-                update_agent_error_stats(battle)
-                unlock_and_unready_agents(battle)
-                asyncio.create_task(
-                    websocket_manager.broadcast_battle_update(battle)
-                )
+                websocket_manager.publish_battle(battle)
             return
 
     except Exception as e:
         print(f"Error processing battle {battle_id}: {str(e)}")
-        battle = db.read("battles", battle_id)
-        if battle:
-            battle["state"] = "error"
-            battle["error"] = str(e)
-            db.update("battles", battle_id, battle)
-            update_agent_error_stats(battle)
-            unlock_and_unready_agents(battle)
-            asyncio.create_task(
-                websocket_manager.broadcast_battle_update(battle)
+        try:
+            battle = finalize_battle(
+                battle_id, {"state": "error", "error": str(e)}
             )
+        except Exception as finalize_error:
+            print(f"Error finalizing battle {battle_id}: {str(finalize_error)}")
+            return
+        if battle:
+            websocket_manager.publish_battle(battle)
 
 
 def check_battle_timeout(battle_id: str, timeout: int):
@@ -474,211 +713,349 @@ def check_battle_timeout(battle_id: str, timeout: int):
         add_system_log(
             battle_id, "Battle timed out", {"battle_timeout": timeout}
         )
-        battle = db.read("battles", battle_id)
+        battle = finalize_battle(
+            battle_id,
+            {
+                "state": "finished",
+                "result": {
+                    "is_result": True,
+                    "winner": "draw",
+                    "score": {"reason": "timeout"},
+                    "detail": {"message": "Battle timed out"},
+                    "reported_at": datetime.utcnow().isoformat() + "Z",
+                },
+            },
+            winner="draw",
+        )
         if battle:
-            battle["state"] = "finished"
-            battle["result"] = {
-                "is_result": True,
-                "winner": "draw",
-                "score": {"reason": "timeout"},
-                "detail": {"message": "Battle timed out"},
-                "reported_at": datetime.utcnow().isoformat() + "Z",
-            }
-            db.update("battles", battle_id, battle)
+            websocket_manager.publish_battle(battle)
 
-            update_agent_elos(battle, "draw")
 
-            unlock_and_unready_agents(battle)
-            try:  
-                asyncio.run(websocket_manager.broadcast_battle_update(battle))  
-            except RuntimeError:  
-                # Event loop already running or not available in thread, skip broadcast  
-                pass
+# Statistics and ELO management
+def ensure_elo(agent: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the agent's elo record, creating missing rating and stats."""
+    is_green = agent.get("register_info", {}).get("is_green", False)
+    elo = agent.setdefault(
+        "elo", {"rating": None if is_green else DEFAULT_RATING}
+    )
+    elo.setdefault(
+        "stats",
+        {
+            "wins": 0,
+            "losses": 0,
+            "draws": 0,
+            "errors": 0,
+            "total_battles": 0,
+            "win_rate": 0.0,
+            "loss_rate": 0.0,
+            "draw_rate": 0.0,
+            "error_rate": 0.0,
+        },
+    )
+    return elo
+
+
+def battle_history_entry(
+    battle: Dict[str, Any],
+    timestamp: str,
+    result: str,
+    elo_change: float,
+    final_rating: Optional[float],
+) -> Dict[str, Any]:
+    """Battle history entry of one participant."""
+    return {
+        "battle_id": battle["battle_id"],
+        "timestamp": timestamp,
+        "result": result,
+        "elo_change": elo_change,
+        "final_rating": final_rating,
+        "opponents": [op["agent_id"] for op in battle["opponents"]],
+        "green_agent_id": battle["green_agent_id"],
+    }
+
+
+def record_error_outcome(
+    battle: Dict[str, Any], agents: Dict[str, Dict[str, Any]]
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Count a battle that ended in error for all loaded participants.
+    Returns the (agent_id, entry) battle history entries to store.
+    """
+    timestamp = datetime.utcnow().isoformat() + "Z"
+    history = []
+    for agent_id in battle_agent_ids(battle):
+        agent = agents.get(agent_id)
+        if not agent:
+            continue
+        elo = ensure_elo(agent)
+        elo["stats"]["total_battles"] += 1
+        elo["stats"]["errors"] += 1
+        history.append(
+            (
+                agent_id,
+                battle_history_entry(
+                    battle, timestamp, "error", 0, elo.get("rating")
+                ),
+            )
+        )
+    return history
 
 
-# Statistics and ELO management
-def update_agent_error_stats(battle: Dict[str, Any]):
+def resolve_winner_agent_id(
+    battle: Dict[str, Any],
+    winner: str,
+    agents: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Optional[str]:
     """
-    Update error statistics for all agents in a battle that ended in error.
-    Increments the error count for all participating agents.
+    Resolve a reported winner to an agent id.
+    Winner can be "draw" (returned as is), "green_agent", an agent_id, an
+    opponent name or role, or an agent alias/card name. agents optionally maps
+    agent ids to already loaded agent documents.
     """
+    if winner == "draw":
+        return "draw"
+    if winner == "green_agent":
+        return battle.get("green_agent_id")
+    for op in battle.get("opponents", []):
+        if op.get("name") == winner or op.get("role") == winner:
+            return op.get("agent_id")
+    agent_ids = battle_agent_ids(battle)
+    if winner in agent_ids:
+        return winner
+    for agent_id in agent_ids:
+        agent = (
+            agents.get(agent_id) if agents is not None
+            else db.read("agents", agent_id)
+        )
+        if not agent:
+            continue
+        alias = agent.get("register_info", {}).get("alias")
+        card_name = agent.get("agent_card", {}).get("name")
+        if winner == alias or winner == card_name:
+            return agent_id
+    return None
+
+
+def battle_finish_time(battle: Dict[str, Any]) -> float:
+    """Epoch time at which a finished battle got its result."""
+    result = battle.get("result") or {}
+    finished = result.get("finish_time") or result.get("reported_at")
     try:
-        agent_ids = [battle["green_agent_id"]] + [
-            op["agent_id"] for op in battle["opponents"]
+        return datetime.fromisoformat(finished).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+
+def battle_rated_at(battle: Dict[str, Any]) -> float:
+    """
+    Server time at which a battle result was rated. Ratings are recorded,
+    and replayed, in this order; older results fall back to their finish time.
+    """
+    rated_at = (battle.get("result") or {}).get("rated_at")
+    return rated_at if rated_at is not None else battle_finish_time(battle)
+
+
+def battle_rating_games(
+    battle: Dict[str, Any], winner_agent_id: Optional[str]
+) -> List[Game]:
+    """Pairwise rating games of a battle with a resolved winner."""
+    return battle_games(
+        battle["green_agent_id"],
+        [op["agent_id"] for op in battle.get("opponents", [])],
+        winner_agent_id,
+    )
+
+
+def load_ratings(system: Optional[str] = None) -> int:
+    """
+    Rebuild the rating engine from every finished battle and write the
+    recomputed ratings back to the agent documents. Switches the rating
+    system when one is given. Returns the number of battles replayed.
+    """
+    global rating_engine
+    # Held throughout, so no result is recorded in the engine being replaced
+    with rating_lock:
+        engine = RatingEngine(system or rating_engine.system)
+
+        agents = {agent["agent_id"]: agent for agent in db.list("agents")}
+        battles = [
+            battle
+            for battle in db.list("battles")
+            if battle.get("state") == "finished" and battle.get("result")
         ]
-        for agent_id in agent_ids:
-            agent = db.read("agents", agent_id)
-            if not agent:
-                continue
+        battles.sort(key=battle_rated_at)
+
+        results = []
+        for battle in battles:
+            winner_agent_id = battle["result"].get("winner_agent_id")
+            if winner_agent_id is None:
+                winner_agent_id = resolve_winner_agent_id(
+                    battle, battle["result"].get("winner", "draw"), agents
+                )
+            results.append(
+                (battle_rated_at(battle), battle_rating_games(battle, winner_agent_id))
+            )
+        engine.load(results)
+        rating_engine = engine
 
-            if "elo" not in agent:
-                agent["elo"] = {
-                    "rating": (
-                        None
-                        if agent.get("register_info", {}).get(
-                            "is_green", False
-                        )
-                        else 1000
-                    ),
-                    "battle_history": [],
-                    "stats": {
-                        "wins": 0,
-                        "losses": 0,
-                        "draws": 0,
-                        "errors": 0,
-                        "total_battles": 0,
-                        "win_rate": 0.0,
-                        "loss_rate": 0.0,
-                        "draw_rate": 0.0,
-                        "error_rate": 0.0,
-                    },
-                }
+        for agent_id, agent in agents.items():
+            if "elo" not in agent or agent.get("register_info", {}).get("is_green", False):
+                continue
+            elo = dict(agent["elo"])
+            elo.update(current_rating(agent_id))
+            if elo != agent["elo"]:
+                agent["elo"] = elo
+                with db.transaction():
+                    db.update("agents", agent_id, {"elo": elo})
+                    leaderboard.update(agent)
+    return len(battles)
+
+
+def current_rating(
+    agent_id: str, preview: Optional[Dict[str, Dict[str, float]]] = None
+) -> Dict[str, Any]:
+    """
+    Rating fields to store in an agent's elo record, from the engine or
+    from a RatingEngine.preview of a result not recorded yet.
+    """
+    if preview is not None and agent_id in preview:
+        values = preview[agent_id]
+    else:
+        values = {"rating": rating_engine.rating(agent_id)}
+        deviation = rating_engine.deviation(agent_id)
+        if deviation is not None:
+            values["rating_deviation"] = deviation
+    return {name: round(value, 1) for name, value in values.items()}
 
-            if "stats" not in agent["elo"]:
-                agent["elo"]["stats"] = {
-                    "wins": 0,
-                    "losses": 0,
-                    "draws": 0,
-                    "errors": 0,
-                    "total_battles": 0,
-                    "win_rate": 0.0,
-                    "loss_rate": 0.0,
-                    "draw_rate": 0.0,
-                    "error_rate": 0.0,
-                }
 
-            stats = agent["elo"]["stats"]
-            stats["total_battles"] += 1
-            stats["errors"] += 1
-
-            battle_result = {
-                "battle_id": battle["battle_id"],
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-                "result": "error",
-                "elo_change": 0,
-                "final_rating": agent["elo"].get("rating"),
-                "opponents": [op["agent_id"] for op in battle["opponents"]],
-                "green_agent_id": battle["green_agent_id"],
-            }
-            agent["elo"]["battle_history"].append(battle_result)
-            db.update("agents", agent_id, agent)
-    except Exception as e:
-        logging.error(f"Error updating agent error stats: {e}")
+def record_rating(timestamp: float, games: List[Game]):
+    with rating_lock:
+        rating_engine.record(timestamp, games)
 
 
-def update_agent_elos(battle: Dict[str, Any], winner: str):
+def record_battle_outcome(
+    battle: Dict[str, Any], agents: Dict[str, Dict[str, Any]], winner: str
+) -> Tuple[Optional[str], List[Tuple[str, Dict[str, Any]]]]:
     """
-    Update ELO ratings and statistics for all agents in a battle.
-    Winner gains 15 ELO, others lose 15 ELO.
+    Apply a battle result to the loaded participants.
+    The battle outcome is recorded in the rating engine (expected-score Elo
+    or Glicko-2) once the transaction commits, and each agent's rating and
+    stats move accordingly. Call with rating_lock held until then.
     Winner can be an agent_id, a role, or an agent alias/name.
     Green agents never have a rating (set to None or 'N/A'), but keep battle history and stats.
+    Returns the resolved winner agent id ("draw" for a draw) and the
+    (agent_id, entry) battle history entries to store.
     """
-    try:
-        winner_agent_id = None
+    winner_agent_id = resolve_winner_agent_id(battle, winner, agents)
+    rated_at = time.time()
+    battle["result"]["rated_at"] = rated_at
+    games = battle_rating_games(battle, winner_agent_id)
+    ratings = rating_engine.preview(rated_at, games)
+    db.after_commit(lambda: record_rating(rated_at, games))
+    timestamp = datetime.utcnow().isoformat() + "Z"
+    history = []
+    for agent_id in battle_agent_ids(battle):
+        agent = agents.get(agent_id)
+        if not agent:
+            continue
+        is_green = agent.get("register_info", {}).get("is_green", False)
+        elo = ensure_elo(agent)
+
         if winner == "draw":
-            winner_agent_id = None
-        elif winner == "green_agent":
-            winner_agent_id = battle.get("green_agent_id")
+            result = "draw"
+        elif agent_id == winner_agent_id:
+            result = "win"
         else:
-            for op in battle.get("opponents", []):
-                if op.get("name") == winner or op.get("role") == winner:
-                    winner_agent_id = op.get("agent_id")
-                    break
-            if not winner_agent_id:
-                all_ids = [battle.get("green_agent_id")] + [
-                    op.get("agent_id") for op in battle.get("opponents", [])
-                ]
-                if winner in all_ids:
-                    winner_agent_id = winner
-        if not winner_agent_id:
-            agent_ids = [battle["green_agent_id"]] + [
-                op["agent_id"] for op in battle["opponents"]
-            ]
-            for agent_id in agent_ids:
-                agent = db.read("agents", agent_id)
-                if not agent:
-                    continue
-                alias = agent.get("register_info", {}).get("alias")
-                card_name = agent.get("agent_card", {}).get("name")
-                if winner == alias or winner == card_name:
-                    winner_agent_id = agent_id
-                    break
-        agent_ids = [battle["green_agent_id"]] + [
-            op["agent_id"] for op in battle["opponents"]
-        ]
-        for agent_id in agent_ids:
-            agent = db.read("agents", agent_id)
-            if not agent:
-                continue
-            is_green = agent.get("register_info", {}).get("is_green", False)
-            if "elo" not in agent:
-                agent["elo"] = {
-                    "rating": None if is_green else 1000,
-                    "battle_history": [],
-                    "stats": {
-                        "wins": 0,
-                        "losses": 0,
-                        "draws": 0,
-                        "errors": 0,
-                        "total_battles": 0,
-                        "win_rate": 0.0,
-                        "loss_rate": 0.0,
-                        "draw_rate": 0.0,
-                        "error_rate": 0.0,
-                    },
-                }
+            result = "loss"
+
+        stats = elo["stats"]
+        stats["total_battles"] += 1
+        if result == "win":
+            stats["wins"] += 1
+        elif result == "loss":
+            stats["losses"] += 1
+        elif result == "draw":
+            stats["draws"] += 1
+
+        if not is_green and elo["rating"] is not None:
+            previous_rating = elo["rating"]
+            elo.update(current_rating(agent_id, ratings))
+            final_rating = elo["rating"]
+            elo_change = round(final_rating - previous_rating, 1)
+        else:
+            elo_change = 0
+            final_rating = None
+        history.append(
+            (
+                agent_id,
+                battle_history_entry(
+                    battle, timestamp, result, elo_change, final_rating
+                ),
+            )
+        )
+    return winner_agent_id, history
 
-            if "stats" not in agent["elo"]:
-                agent["elo"]["stats"] = {
-                    "wins": 0,
-                    "losses": 0,
-                    "draws": 0,
-                    "errors": 0,
-                    "total_battles": 0,
-                    "win_rate": 0.0,
-                    "loss_rate": 0.0,
-                    "draw_rate": 0.0,
-                    "error_rate": 0.0,
-                }
 
-            if winner == "draw":
-                elo_change = 0
-                result = "draw"
-            elif agent_id == winner_agent_id:
-                elo_change = 15
-                result = "win"
-            else:
-                elo_change = -15
-                result = "loss"
-
-            stats = agent["elo"]["stats"]
-            stats["total_battles"] += 1
-
-            if result == "win":
-                stats["wins"] += 1
-            elif result == "loss":
-                stats["losses"] += 1
-            elif result == "draw":
-                stats["draws"] += 1
-
-            if not is_green and agent["elo"]["rating"] is not None:
-                agent["elo"]["rating"] += elo_change
-                final_rating = agent["elo"]["rating"]
-            else:
-                final_rating = None
-            battle_result = {
-                "battle_id": battle["battle_id"],
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-                "result": result,
-                "elo_change": elo_change,
-                "final_rating": final_rating,
-                "opponents": [op["agent_id"] for op in battle["opponents"]],
-                "green_agent_id": battle["green_agent_id"],
-            }
-            agent["elo"]["battle_history"].append(battle_result)
-            db.update("agents", agent_id, agent)
-    except Exception as e:
-        logging.error(f"Error updating ELO ratings: {e}")
+def finalize_battle(
+    battle_id: str,
+    updates: Dict[str, Any],
+    winner: Optional[str] = None,
+    clean: bool = False,
+    events: Optional[List[Dict[str, Any]]] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Finish a battle in a single transaction.
+    updates (state, result or error) are applied to the battle and events,
+    if any, are appended to its history. With a winner the result is rated,
+    otherwise it counts as an error. All participants are read and written
+    in one batch, with their stats, history and unlocking, so a failure
+    leaves no partial state behind. A battle still queued leaves the queue.
+    Returns the finished battle, or None if it is missing or already over.
+    """
+    # The rating lock spans the commit and the engine update that follows it
+    with rating_lock, db.transaction():
+        battle = db.read("battles", battle_id)
+        if not battle or battle.get("state") in ("finished", "error"):
+            return None
+        battle.update(updates)
+        if events:
+            db.append_battle_events(battle_id, events, prepare=blob_store.offload)
+
+        agents = db.read_many("agents", battle_agent_ids(battle))
+        if winner is None:
+            history = record_error_outcome(battle, agents)
+        else:
+            winner_agent_id, history = record_battle_outcome(
+                battle, agents, winner
+            )
+            battle["result"]["winner_agent_id"] = winner_agent_id
+
+        db.update_many(
+            "agents",
+            {
+                agent_id: {
+                    "elo": agent["elo"],
+                    "status": "unlocked",
+                    "ready": False,
+                    "soft_reset_ok": clean,
+                }
+                for agent_id, agent in agents.items()
+            },
+        )
+        db.add_battle_history_many(history)
+        for agent in agents.values():
+            leaderboard.update(agent)
+        db.update("battles", battle_id, battle)
+        # A battle finished while queued must not be run when its turn comes
+        if db.dequeue_battle(battle_id):
+            db.after_commit(lambda: unqueue_battle(battle_id))
+    admission.forget(battle_id)
+    event_feed.notify(battle_id)
+    for agent_id in agents:
+        websocket_manager.publish_agent_status(
+            agent_id, {"status": "unlocked", "ready": False}
+        )
+    return battle
 
 
 # FastAPI route handlers
@@ -686,7 +1063,7 @@ def update_agent_elos(battle: Dict[str, Any], winner: str):
 def list_battles() -> List[Dict[str, Any]]:
     """List all battles."""
     try:
-        battles = db.list("battles")
+        battles = db.attach_battle_events(db.list("battles"))
 
         with queue_lock:
             for i, battle_id in enumerate(battle_queue):
@@ -702,14 +1079,22 @@ def list_battles() -> List[Dict[str, Any]]:
 
 
 @router.get("/battles/{battle_id}")
-def get_battle(battle_id: str) -> Dict[str, Any]:
-    """Get a single battle by ID."""
+def get_battle(battle_id: str, inline_blobs: bool = True) -> Dict[str, Any]:
+    """
+    Get a single battle by ID. Large event payloads are inlined unless
+    inline_blobs is false, in which case events keep their blob references.
+    """
     try:
         battle = db.read("battles", battle_id)
         if not battle:
             raise HTTPException(
                 status_code=404, detail=f"Battle with ID {battle_id} not found"
             )
+        db.attach_battle_events([battle])
+        if inline_blobs:
+            battle["interact_history"] = blob_store.inline_events(
+                battle["interact_history"]
+            )
 
         if battle["state"] == "queued":
             with queue_lock:
@@ -727,6 +1112,50 @@ def get_battle(battle_id: str) -> Dict[str, Any]:
         )
 
 
+@router.get("/battles/{battle_id}/events")
+async def get_battle_events(
+    battle_id: str,
+    after: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    wait: float = Query(0, ge=0, le=60),
+    inline_blobs: bool = False,
+) -> Dict[str, Any]:
+    """
+    Get a battle's events with seq greater than after, in order. Pass the
+    returned next cursor as after to continue. With wait, blocks up to that
+    many seconds until new events arrive or the battle is over.
+    """
+    with event_feed.subscribe(battle_id) as news:
+        battle = await run_in_threadpool(db.read, "battles", battle_id)
+        if not battle:
+            raise HTTPException(
+                status_code=404, detail=f"Battle with ID {battle_id} not found"
+            )
+        events = await run_in_threadpool(
+            db.list_battle_events, battle_id, after, limit
+        )
+        if not events and wait and battle.get("state") not in ("finished", "error"):
+            try:
+                await asyncio.wait_for(news, wait)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                battle = await run_in_threadpool(db.read, "battles", battle_id)
+                events = await run_in_threadpool(
+                    db.list_battle_events, battle_id, after, limit
+                )
+
+    if inline_blobs:
+        events = await run_in_threadpool(blob_store.inline_events, events)
+    return {
+        "battle_id": battle_id,
+        "state": battle.get("state"),
+        "events": events,
+        "next": events[-1]["seq"] if events else after,
+        "has_more": len(events) == limit,
+    }
+
+
 @router.post("/battles", status_code=status.HTTP_201_CREATED)
 def create_battle(battle_request: Dict[str, Any]) -> Dict[str, Any]:
     """Create a new battle."""
@@ -741,7 +1170,33 @@ def create_battle(battle_request: Dict[str, Any]) -> Dict[str, Any]:
                 detail="Missing required fields: green_agent_id and opponents",
             )
 
-        green_agent = db.read("agents", battle_request["green_agent_id"])
+        # Admission control
+        with queue_lock:
+            queue_depth = len(battle_queue)
+        retry_after = admission.admit_battle(queue_depth)
+        if retry_after is not None:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Battle queue is full ({queue_depth} battles queued), retry later",
+                headers={"Retry-After": str(retry_after)},
+            )
+
+        # Read all participants at once
+        participants = battle_request.get("opponents", [])
+        opponent_ids = (
+            [
+                p["agent_id"]
+                for p in participants
+                if isinstance(p, dict) and "agent_id" in p
+            ]
+            if isinstance(participants, list)
+            else []
+        )
+        agents = db.read_many(
+            "agents", [battle_request["green_agent_id"]] + opponent_ids
+        )
+
+        green_agent = agents.get(battle_request["green_agent_id"])
         if not green_agent:
             raise HTTPException(
                 status_code=404,
@@ -759,7 +1214,6 @@ def create_battle(battle_request: Dict[str, Any]) -> Dict[str, Any]:
         participant_requirements_names = [
             p["name"] for p in participant_requirements
         ]
-        participants = battle_request.get("opponents", [])
         if not isinstance(participants, list):
             raise HTTPException(
                 status_code=400, detail="Opponents must be a list"
@@ -767,7 +1221,7 @@ def create_battle(battle_request: Dict[str, Any]) -> Dict[str, Any]:
         for p in participants:
             if (
                 not isinstance(p, dict)
-                and "name" not in p
+                or "name" not in p
                 or "agent_id" not in p
             ):
                 raise HTTPException(
@@ -780,7 +1234,7 @@ def create_battle(battle_request: Dict[str, Any]) -> Dict[str, Any]:
                     detail=f"Opponent agent {p['name']}:{p['agent_id']} does not in participant requirements",
                 )
 
-            opponent_agent = db.read("agents", p["agent_id"])
+            opponent_agent = agents.get(p["agent_id"])
             if not opponent_agent:
                 raise HTTPException(
                     status_code=404,
@@ -802,41 +1256,43 @@ def create_battle(battle_request: Dict[str, Any]) -> Dict[str, Any]:
                     detail=f"Required participant {p_req['name']} not found in opponents",
                 )
 
-        # Battle creation
+        # Battle creation: the battle, its system log and its queue entry
+        # are written together, with ids generated up front
+        battle_id = str(uuid.uuid4())
+        system_log_id = str(uuid.uuid4())
         battle_record = {
+            "battle_id": battle_id,
             "green_agent_id": battle_request["green_agent_id"],
             "opponents": battle_request["opponents"],
             "config": battle_request.get("config", {}),
-            "state": "pending",
+            "state": "queued",
             "created_at": datetime.utcnow().isoformat() + "Z",
             "created_by": battle_request.get("created_by", "N/A"),
-            "interact_history": [],
+            "system_log_id": system_log_id,
         }
 
-        created_system_log = db.create(
-            "system", {"logs": [], "battle_id": None}
-        )
-
-        battle_record["system_log_id"] = created_system_log["system_log_id"]
-        created_battle = db.create("battles", battle_record)
-
-        created_system_log["battle_id"] = created_battle["battle_id"]
-        db.update(
-            "system", created_system_log["system_log_id"], created_system_log
-        )
-
-        # Queue management
-        with queue_lock:
-            battle_queue.append(created_battle["battle_id"])
-            created_battle["state"] = "queued"
-            db.update("battles", created_battle["battle_id"], created_battle)
+        with db.transaction():
+            db.create(
+                "system",
+                {
+                    "system_log_id": system_log_id,
+                    "logs": [],
+                    "battle_id": battle_id,
+                },
+            )
+            created_battle = db.create("battles", battle_record)
+            db.enqueue_battle(battle_id)
+            # Queue management
+            db.after_commit(lambda: queue_battle(battle_id))
+        created_battle["interact_history"] = []
 
         start_battle_processor()
-        try:
-            asyncio.run(websocket_manager.broadcast_battles_update())
-        except RuntimeError:
-            # Event loop already running, skip broadcast
-            pass
+        with queue_lock:
+            if battle_id in battle_queue:
+                created_battle["queue_position"] = battle_queue.index(battle_id) + 1
+        websocket_manager.publish_battle_created(
+            created_battle, created_battle.get("queue_position")
+        )
 
         return created_battle
     except HTTPException:
@@ -847,56 +1303,134 @@ def create_battle(battle_request: Dict[str, Any]) -> Dict[str, Any]:
         )
 
 
-@router.post("/battles/{battle_id}", status_code=status.HTTP_204_NO_CONTENT)
-def update_battle_event(battle_id: str, event: Dict[str, Any]):
-    """Handle battle result or log entry."""
+@router.post("/ratings/recompute")
+def recompute_ratings(request: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Recompute every agent rating from the full battle history.
+    Body may set "system" ("elo" or "glicko2") to switch rating systems.
+    """
     try:
-        battle = db.read("battles", battle_id)
-        if not battle:
+        system = (request or {}).get("system")
+        if system is not None and system not in RATING_SYSTEMS:
             raise HTTPException(
-                status_code=404, detail=f"Battle with ID {battle_id} not found"
+                status_code=400,
+                detail=f"Unknown rating system {system}, expected one of {list(RATING_SYSTEMS)}",
+            )
+        start_time = time.time()
+        battle_count = load_ratings(system)
+        return {
+            "system": rating_engine.system,
+            "battles": battle_count,
+            "elapsed_seconds": round(time.time() - start_time, 3),
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error recomputing ratings: {str(e)}"
+        )
+
+
+def ingest_battle_events(
+    battle_id: str, events: List[Dict[str, Any]]
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Store a battle's incoming events, in order and in one transaction.
+    Each event needs is_result; only the last one may be a result, which
+    finishes the battle. Events carrying an idempotency_key that was
+    already stored are ignored, so retried uploads are harmless.
+    Returns the updated battle and the events actually stored.
+    """
+    results = [event for event in events if event["is_result"]]
+    if results and (len(results) > 1 or not events[-1]["is_result"]):
+        raise HTTPException(
+            status_code=400, detail="A result must be the last event"
+        )
+
+    battle = db.read("battles", battle_id)
+    if not battle:
+        raise HTTPException(
+            status_code=404, detail=f"Battle with ID {battle_id} not found"
+        )
+
+    events = db.new_battle_events(battle_id, events)
+    if not events:
+        # Everything was stored before, e.g. a replayed upload
+        return battle, []
+    results = [event for event in events if event["is_result"]]
+
+    battle_state = battle.get("state", "finished")
+    if battle_state == "finished":
+        raise HTTPException(
+            status_code=400,
+            detail=f"Battle {battle_id} is not in a valid state for updates: {battle_state}",
+        )
+
+    # Log entries are rate limited per battle, results always get through;
+    # only events the battle can accept take tokens
+    log_count = len(events) - len(results)
+    if log_count:
+        retry_after = admission.admit_events(battle_id, log_count)
+        if retry_after is not None:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Too many events for battle {battle_id}, retry later",
+                headers={"Retry-After": str(retry_after)},
             )
 
-        battle_state = battle.get("state", "finished")
-        if battle_state == "finished":
+    for event in events:
+        if not event["is_result"] and "timestamp" not in event:
+            event["timestamp"] = datetime.utcnow().isoformat() + "Z"
+
+    if results:
+        winner = results[0].get("winner", "draw")
+        result = {
+            "winner": winner,
+            "detail": results[0].get("detail", {}),
+            "finish_time": results[0].get(
+                "timestamp", datetime.utcnow().isoformat() + "Z"
+            ),
+        }
+        finished = finalize_battle(
+            battle_id,
+            {"state": "finished", "result": result},
+            winner=winner,
+            clean=True,
+            events=events,
+        )
+        if not finished:
+            if not db.new_battle_events(battle_id, results):
+                # A concurrent upload of the same result got there first
+                return db.read("battles", battle_id), []
             raise HTTPException(
                 status_code=400,
-                detail=f"Battle {battle_id} is not in a valid state for updates: {battle_state}",
+                detail=f"Battle {battle_id} is not in a valid state for updates: finished",
             )
+        battle = finished
+    else:
+        # Offloaded once stored duplicates are filtered out, in the same
+        # transaction, so a retried upload writes no blob
+        events = db.append_battle_events(
+            battle_id, events, prepare=blob_store.offload
+        )
+        event_feed.notify(battle_id)
+    return battle, events
+
 
-        is_result = event.get("is_result", None)
-        if is_result is None:
+@router.post("/battles/{battle_id}", status_code=status.HTTP_204_NO_CONTENT)
+def update_battle_event(battle_id: str, event: Dict[str, Any]):
+    """Handle battle result or log entry."""
+    try:
+        if event.get("is_result", None) is None:
             raise HTTPException(
                 status_code=400, detail="Missing is_result field"
             )
-
-        if is_result:
-            battle["interact_history"].append(event)
-
-            winner = event.get("winner", "draw")
-            update_agent_elos(battle, winner)
-
-            battle["result"] = {
-                "winner": winner,
-                "detail": event.get("detail", {}),
-                "finish_time": event.get(
-                    "timestamp", datetime.utcnow().isoformat() + "Z"
-                ),
-            }
-            battle["state"] = "finished"
-            unlock_and_unready_agents(battle)
-        else:
-            if "timestamp" not in event:
-                event["timestamp"] = datetime.utcnow().isoformat() + "Z"
+        if not event["is_result"]:
             logger.info(f"Event: {event}")
-            battle["interact_history"].append(event)
 
-        db.update("battles", battle_id, battle)
-        try:
-            asyncio.run(websocket_manager.broadcast_battle_update(battle))
-        except RuntimeError:
-            # Event loop already running, skip broadcast
-            pass
+        battle, stored = ingest_battle_events(battle_id, [event])
+        if stored:
+            websocket_manager.publish_battle(battle)
         return None
 
     except HTTPException:
@@ -905,3 +1439,41 @@ def update_battle_event(battle_id: str, event: Dict[str, Any]):
         raise HTTPException(
             status_code=500, detail=f"Error updating battle event: {str(e)}"
         )
+
+
+@router.post("/battles/{battle_id}/events:batch")
+def update_battle_events_batch(
+    battle_id: str, events: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Handle an ordered batch of battle log entries, optionally ending with
+    the result. The batch is stored in one transaction and broadcast once;
+    events whose idempotency_key was stored before count as duplicates.
+    """
+    try:
+        if not events:
+            raise HTTPException(status_code=400, detail="Empty event batch")
+        for i, event in enumerate(events):
+            if event.get("is_result", None) is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Missing is_result field in event {i}",
+                )
+        logger.info(f"Event batch: {len(events)} events for battle {battle_id}")
+
+        battle, stored = ingest_battle_events(battle_id, events)
+        if stored:
+            websocket_manager.publish_battle(battle)
+        return {
+            "battle_id": battle_id,
+            "accepted": len(stored),
+            "duplicates": len(events) - len(stored),
+            "first_seq": stored[0]["seq"] if stored else None,
+            "last_seq": stored[-1]["seq"] if stored else None,
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error updating battle events: {str(e)}"
+        )
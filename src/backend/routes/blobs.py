@@ -0,0 +1,70 @@
+import re
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, Header, HTTPException, Response
+
+from ..services.blob_store import blob_store
+
+router = APIRouter()
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range Range header into inclusive (start, end) offsets.
+    Returns None for a header this endpoint does not understand, so the
+    whole blob is served; raises 416 for an unsatisfiable range.
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(0, size - int(last))
+        end = size - 1
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+@router.get("/blobs/{blob_hash}")
+def get_blob(
+    blob_hash: str, range_header: Optional[str] = Header(None, alias="Range")
+) -> Response:
+    """
+    Get the content of an event payload blob. Supports single byte ranges;
+    blobs never change, so responses may be cached indefinitely.
+    """
+    info = blob_store.info(blob_hash)
+    if info is None:
+        raise HTTPException(status_code=404, detail=f"Blob {blob_hash} not found")
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{blob_hash}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    size = info["size"]
+    byte_range = parse_range(range_header, size) if range_header else None
+    if byte_range is None:
+        return Response(
+            blob_store.read(blob_hash), media_type=info["content_type"], headers=headers
+        )
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(
+        blob_store.read(blob_hash, start, end - start + 1),
+        status_code=206,
+        media_type=info["content_type"],
+        headers=headers,
+    )
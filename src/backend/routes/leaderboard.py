@@ -0,0 +1,28 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Header, Query, Response
+from fastapi.responses import JSONResponse
+
+from ..services.leaderboard import leaderboard
+
+router = APIRouter()
+
+
+@router.get("/leaderboard")
+async def get_leaderboard(
+    sort: Literal["rating", "win_rate"] = "rating",
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    if_none_match: Optional[str] = Header(None),
+) -> Response:
+    """
+    Get a ranked page of the leaderboard, served from memory.
+    Responds 304 when If-None-Match carries the current ETag.
+    """
+    headers = {"ETag": leaderboard.etag, "Cache-Control": "no-cache"}
+    if if_none_match == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+
+    etag, page = leaderboard.page(sort, limit, offset)
+    headers["ETag"] = etag
+    return JSONResponse(page, headers=headers)
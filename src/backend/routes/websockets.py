@@ -6,10 +6,16 @@ WebSocket management for AgentBeats backend.
 import asyncio
 import json
 import logging
-from typing import Dict, Any, Optional, Set
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, Iterable, List, Optional, Set, Tuple
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
 
 from ..db.storage import db
+from ..services.metrics import metrics
 
 router = APIRouter()
 
@@ -24,98 +30,757 @@ if not logger.hasHandlers():
 
 # Global state for WebSocket clients
 battles_ws_clients: Set[WebSocket] = set()
-log_subscribers: Dict[str, list] = {}
+log_subscribers: Dict[str, Set[WebSocket]] = {}
 
-# Threadsafe broadcast fix
-MAIN_EVENT_LOOP = asyncio.get_event_loop()
+# Topics /ws/battles clients subscribe to
+SUMMARY_TOPIC = "summary"
+AGENTS_TOPIC = "agents"
 
-class WebSocketManager:
-    """Manages WebSocket connections and broadcasting."""
-    
-    @staticmethod
-    async def broadcast_battles_update():
-        """Send the full battles list to all connected /ws/battles clients."""
+# Agent fields whose changes are sent as agent_delta messages
+AGENT_STATUS_FIELDS = ("status", "ready", "live")
+
+# Battle updates published within this many seconds go out as one frame
+BROADCAST_WINDOW = float(os.getenv("AGENTBEATS_WS_BROADCAST_WINDOW", "0.1"))
+# Frames per second sent at most for one battle, 0 for no limit
+BATTLE_FRAME_RATE = float(os.getenv("AGENTBEATS_WS_BATTLE_FRAME_RATE", "4"))
+
+# A heartbeat is sent after this many seconds without client frames, and
+# clients silent for IDLE_TIMEOUT seconds are disconnected
+HEARTBEAT_INTERVAL = float(os.getenv("AGENTBEATS_WS_HEARTBEAT_INTERVAL", "20"))
+IDLE_TIMEOUT = float(os.getenv("AGENTBEATS_WS_IDLE_TIMEOUT", "60"))
+IDLE_CLOSE_CODE = 4408
+
+# Battle summaries sent per battle_summaries page
+SUMMARY_PAGE_SIZE = int(os.getenv("AGENTBEATS_WS_SUMMARY_PAGE_SIZE", "50"))
+MAX_SUMMARY_PAGE_SIZE = 500
+
+# Frames queued at most for one client. A client whose queue overflows
+# either gets fresh snapshots instead of the queued frames ("snapshot")
+# or is disconnected ("disconnect").
+SEND_QUEUE_SIZE = int(os.getenv("AGENTBEATS_WS_SEND_QUEUE_SIZE", "256"))
+SLOW_CLIENT_POLICY = os.getenv("AGENTBEATS_WS_SLOW_CLIENT_POLICY", "snapshot")
+SLOW_CLIENT_CLOSE_CODE = 4429
+
+# A client resuming further behind than this many events gets a snapshot
+MAX_REPLAY_EVENTS = int(os.getenv("AGENTBEATS_WS_MAX_REPLAY_EVENTS", "1000"))
+
+# Finished battles whose last broadcast state is kept, so late publishes
+# of them don't resend their whole history
+FINISHED_SENT_SIZE = int(os.getenv("AGENTBEATS_WS_FINISHED_SENT_SIZE", "1024"))
+
+
+def battle_topic(battle_id: str) -> str:
+    return f"battle:{battle_id}"
+
+# The app's event loop, captured by run_broadcasts() at startup
+MAIN_EVENT_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+
+class ClientChannel:
+    """
+    Outbound frames of one WebSocket, sent in order by a writer task.
+
+    send() only queues, so a slow client never holds up broadcasts. When
+    the queue is full the queued frames are dropped: with the "snapshot"
+    policy the writer then calls resync() to send the client's current
+    state, with the "disconnect" policy (or without resync) the socket is
+    closed with SLOW_CLIENT_CLOSE_CODE. Between hold() and release()
+    frames are kept aside, so frames built off the loop in the meantime
+    can go before them. Must be used from the event loop.
+    """
+
+    def __init__(
+        self,
+        ws: WebSocket,
+        resync: Optional[Callable[["ClientChannel"], Awaitable[None]]] = None,
+        max_size: int = SEND_QUEUE_SIZE,
+        policy: str = SLOW_CLIENT_POLICY,
+    ):
+        self.ws = ws
+        self.max_size = max_size
+        self.policy = policy
+        self._resync = resync
+        self._queue: deque = deque()
+        self._ready = asyncio.Event()
+        self._needs_resync = False
+        self._held: Optional[List[str]] = None
+        self.closed = False
+        self.stats = {"sent": 0, "dropped": 0, "resyncs": 0, "max_queued": 0}
+        self._writer = asyncio.create_task(self._run())
+
+    def send(self, msg: str) -> bool:
+        """Queue an encoded frame; returns False if the client is gone."""
+        if self.closed:
+            return False
+        if self._held is not None:
+            self._held.append(msg)
+            return True
+        if len(self._queue) >= self.max_size:
+            dropped = len(self._queue) + 1
+            self._queue.clear()
+            self.stats["dropped"] += dropped
+            metrics.incr("ws.frames_dropped", dropped)
+            if self.policy != "snapshot" or self._resync is None:
+                logger.warning("[ws] Send queue of a slow client is full, disconnecting it")
+                metrics.incr("ws.slow_client_disconnects")
+                self.close(SLOW_CLIENT_CLOSE_CODE, "send queue full")
+                return False
+            self._needs_resync = True
+        else:
+            self._queue.append(msg)
+            self.stats["max_queued"] = max(self.stats["max_queued"], len(self._queue))
+        self._ready.set()
+        return True
+
+    def hold(self):
+        """Keep frames sent from now on aside until release()."""
+        if self._held is None:
+            self._held = []
+
+    def release(self, first: Iterable[str] = ()):
+        """Queue first, then the frames held since hold()."""
+        held, self._held = self._held or [], None
+        for msg in [*first, *held]:
+            if not self.send(msg):
+                return
+
+    def queued(self) -> int:
+        return len(self._queue) + len(self._held or ())
+
+    def close(self, code: Optional[int] = None, reason: str = ""):
+        """Stop the writer, and close the socket if a code is given."""
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        self._writer.cancel()
+        if code is not None:
+            asyncio.create_task(self._close_socket(code, reason))
+
+    async def _close_socket(self, code: int, reason: str):
         try:
-            battles = db.list("battles")
-            msg = json.dumps({"type": "battles_update", "battles": battles})
-            logger.info(f"[battles_ws] Broadcasting battles update to {len(battles_ws_clients)} clients")
-            for ws in list(battles_ws_clients):
-                try:
-                    asyncio.run_coroutine_threadsafe(ws.send_text(msg), MAIN_EVENT_LOOP)
-                except Exception as e:
-                    logger.warning(f"[battles_ws] Failed to send to client: {e}")
-                    try:
-                        battles_ws_clients.remove(ws)
-                    except Exception:
-                        pass
+            await self.ws.close(code=code, reason=reason)
+        except Exception:
+            pass  # already closed
+
+    async def _run(self):
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+                if self._needs_resync:
+                    # Frames queued before the resync are older than it
+                    self._needs_resync = False
+                    self.stats["dropped"] += len(self._queue)
+                    metrics.incr("ws.frames_dropped", len(self._queue))
+                    self._queue.clear()
+                    self.stats["resyncs"] += 1
+                    metrics.incr("ws.slow_client_resyncs")
+                    await self._resync(self)
+                while self._queue:
+                    await self.ws.send_text(self._queue.popleft())
+                    self.stats["sent"] += 1
+                    metrics.incr("ws.frames_sent")
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            logger.error(f"[battles_ws] Error in broadcast_battles_update: {e}")
+            logger.warning(f"[ws] Failed to send to client, dropping it: {e}")
+            metrics.incr("ws.send_failures")
+            self.closed = True
+            self._queue.clear()
+            # The handler's receive loop sees the close and cleans up
+            await self._close_socket(1011, "send failed")
+
+class WebSocketManager:
+    """
+    Manages WebSocket connections and broadcasting.
+
+    Battle updates are sent as battle_delta messages: the events appended
+    since the previous delta of that battle and the top-level fields that
+    changed, tagged with the seq of the battle's last event. Clients that
+    notice a gap in the event seqs ask for a battle_snapshot.
+
+    /ws/battles clients only get the topics they subscribed to: a battle's
+    topic carries its full deltas, the summary topic a battle_created
+    message per new battle and the deltas of every battle without their
+    events, for list views. The agents topic carries agent_delta
+    messages: the status, ready and live transitions of agents.
+
+    Broadcasts are only published here, from any thread and without an
+    event loop of its own: publishing marks the battle as changed and, if
+    the broadcast task is idle, wakes it through call_soon_threadsafe.
+    That task, run_broadcasts() on the app's event loop, sends what was
+    published BROADCAST_WINDOW seconds after the wake-up. Updates of a
+    battle published in between merge into one frame, built from the
+    battle as stored at that time (publishers may hold stale copies) and
+    encoded once for all its recipients, and a battle gets at most
+    BATTLE_FRAME_RATE frames per second.
+
+    Frames are queued on each client's ClientChannel, whose writer task
+    sends them, so a slow client only delays itself.
+    """
+
+    def __init__(
+        self,
+        window: float = BROADCAST_WINDOW,
+        battle_frame_rate: float = BATTLE_FRAME_RATE,
+    ):
+        self.window = window
+        self.battle_frame_rate = battle_frame_rate
+        self._lock = threading.Lock()
+        # battle_id -> (last event seq, top-level fields) as last broadcast
+        self._sent: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        # The same for the most recently finished battles, oldest first
+        self._finished_sent: OrderedDict[str, Tuple[int, Dict[str, Any]]] = OrderedDict()
+        self._topics_lock = threading.Lock()
+        self._subscribers: Dict[str, Set[WebSocket]] = {}
+        self._client_topics: Dict[WebSocket, Set[str]] = {}
+        self._pending_lock = threading.Lock()
+        # Battles published since their last broadcast
+        self._pending: Set[str] = set()
+        # battle_created messages, not broadcast yet
+        self._created: List[Dict[str, Any]] = []
+        # agent_id -> status fields published, not broadcast yet
+        self._agents_pending: Dict[str, Dict[str, Any]] = {}
+        # agent_id -> status fields as last broadcast
+        self._agents_sent: Dict[str, Dict[str, Any]] = {}
+        self._last_frame: Dict[str, float] = {}
+        self._channels: Dict[WebSocket, ClientChannel] = {}
+        # Set on the event loop when there is something to send
+        self._wakeup: Optional[asyncio.Event] = None
+        self._wakeup_scheduled = False
+
+    def subscribe(self, ws: WebSocket, topics: List[str]) -> Set[str]:
+        """Subscribe a client to topics; returns all its topics."""
+        with self._topics_lock:
+            client_topics = self._client_topics.setdefault(ws, set())
+            for topic in topics:
+                client_topics.add(topic)
+                self._subscribers.setdefault(topic, set()).add(ws)
+            return set(client_topics)
+
+    def unsubscribe(self, ws: WebSocket, topics: Optional[List[str]] = None) -> Set[str]:
+        """Unsubscribe a client from topics, or from all of them; returns its remaining topics."""
+        with self._topics_lock:
+            client_topics = self._client_topics.get(ws, set())
+            for topic in list(client_topics) if topics is None else topics:
+                client_topics.discard(topic)
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(ws)
+                    if not subscribers:
+                        del self._subscribers[topic]
+            if not client_topics:
+                self._client_topics.pop(ws, None)
+            return set(client_topics)
+
+    def subscribers(self, topic: str) -> Set[WebSocket]:
+        with self._topics_lock:
+            return set(self._subscribers.get(topic, ()))
+
+    def open_channel(
+        self,
+        ws: WebSocket,
+        resync: Optional[Callable[[ClientChannel], Awaitable[None]]] = None,
+    ) -> ClientChannel:
+        """Start the outbound channel of an accepted socket; call from the event loop."""
+        channel = ClientChannel(ws, resync)
+        self._channels[ws] = channel
+        return channel
+
+    def close_channel(self, ws: WebSocket):
+        channel = self._channels.pop(ws, None)
+        if channel is not None:
+            channel.close()
+
+    def remove_client(self, ws: WebSocket):
+        """Forget a /ws/battles client, its subscriptions and its channel."""
+        battles_ws_clients.discard(ws)
+        self.unsubscribe(ws)
+        self.close_channel(ws)
+
+    async def resync_client(self, channel: ClientChannel):
+        """Send a /ws/battles client the current state of what it subscribed to."""
+        with self._topics_lock:
+            topics = set(self._client_topics.get(channel.ws, ()))
+        for topic in sorted(topics):
+            if topic == SUMMARY_TOPIC:
+                msg = await run_in_threadpool(self.battle_summaries)
+            else:
+                msg = await run_in_threadpool(self.battle_snapshot, topic[len("battle:"):])
+            if msg is not None:
+                await channel.ws.send_text(json.dumps(msg))
+                channel.stats["sent"] += 1
+                metrics.incr("ws.frames_sent")
+
+    def client_stats(self) -> List[Dict[str, Any]]:
+        """Queue statistics of every connected client, for /metrics."""
+        stats = []
+        for ws, channel in list(self._channels.items()):
+            client = getattr(ws, "client", None)
+            stats.append({
+                "client": f"{client.host}:{client.port}" if client else None,
+                "path": ws.url.path,
+                "queued": channel.queued(),
+                **channel.stats,
+            })
+        return stats
+
+    def publish_battle_created(self, battle: Dict[str, Any], queue_position: Optional[int] = None):
+        """
+        Queue a battle_created message, the new battle's summary, for
+        summary subscribers; safe from any thread. Later deltas of the
+        battle only carry what changed since.
+        """
+        fields = {k: v for k, v in battle.items() if k != "interact_history"}
+        with self._lock:
+            self._sent.setdefault(battle["battle_id"], (0, fields))
+        summary = self.battle_summary(battle)
+        summary["queue_position"] = queue_position
+        with self._pending_lock:
+            self._created.append({"type": "battle_created", "battle": summary})
+            self._schedule_wakeup()
+
+    def publish_agent_status(self, agent_id: str, fields: Dict[str, Any]):
+        """
+        Queue an agent's status fields for the next broadcast; safe from
+        any thread. Only fields that differ from the last broadcast ones
+        are sent; {"deleted": True} announces a removed agent.
+        """
+        fields = {
+            k: v for k, v in fields.items() if k in AGENT_STATUS_FIELDS or k == "deleted"
+        }
+        if not fields:
+            return
+        with self._pending_lock:
+            self._agents_pending.setdefault(agent_id, {}).update(fields)
+            self._schedule_wakeup()
+
+    def _agent_deltas(self, published: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        deltas = []
+        for agent_id, fields in published.items():
+            if fields.get("deleted"):
+                self._agents_sent.pop(agent_id, None)
+                deltas.append({"type": "agent_delta", "agent_id": agent_id, "changes": {"deleted": True}})
+                continue
+            previous = self._agents_sent.setdefault(agent_id, {})
+            changes = {k: v for k, v in fields.items() if k not in previous or previous[k] != v}
+            if changes:
+                previous.update(changes)
+                deltas.append({"type": "agent_delta", "agent_id": agent_id, "changes": changes})
+        return deltas
+
+    def battle_delta(self, battle: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Build the battle_delta message of a battle since its previous one,
+        or None if nothing changed. Without a previous one (after a restart,
+        or once forgotten among finished battles) the delta carries all the
+        fields and at most the last MAX_REPLAY_EVENTS events; clients that
+        miss earlier events ask for a snapshot. Called by the broadcast task,
+        one battle at a time.
+        """
+        battle_id = battle["battle_id"]
+        fields = {k: v for k, v in battle.items() if k != "interact_history"}
+        with self._lock:
+            sent = self._sent.get(battle_id) or self._finished_sent.get(battle_id)
+        # Read outside the lock, publish_battle_created doesn't wait for it
+        if sent is None:
+            metrics.incr("ws.deltas_without_baseline")
+            seq = max(0, db.battle_event_seq(battle_id) - MAX_REPLAY_EVENTS)
+            previous = {}
+        else:
+            seq, previous = sent
+        events = db.list_battle_events(battle_id, after_seq=seq)
+        changes = {k: v for k, v in fields.items() if previous.get(k) != v}
+        if events:
+            seq = events[-1]["seq"]
+        with self._lock:
+            if fields.get("state") in ("finished", "error"):
+                # Few updates expected, only remember it among the last finished
+                self._sent.pop(battle_id, None)
+                self._finished_sent[battle_id] = (seq, fields)
+                self._finished_sent.move_to_end(battle_id)
+                while len(self._finished_sent) > FINISHED_SENT_SIZE:
+                    self._finished_sent.popitem(last=False)
+            else:
+                self._finished_sent.pop(battle_id, None)
+                self._sent[battle_id] = (seq, fields)
+        if not events and not changes:
+            return None
+        return {
+            "type": "battle_delta",
+            "battle_id": battle_id,
+            "seq": seq,
+            "events": events,
+            "changes": changes,
+        }
 
     @staticmethod
-    async def broadcast_battle_update(battle: Optional[Dict[str, Any]]):
-        """Send a single battle update to all connected /ws/battles clients."""
+    def battle_summary(battle: Dict[str, Any]) -> Dict[str, Any]:
+        """Summary of a battle, as listed by battle_summaries."""
+        result = battle.get("result") or {}
+        return {
+            "battle_id": battle["battle_id"],
+            "state": battle.get("state"),
+            "green_agent_id": battle.get("green_agent_id"),
+            "opponents": battle.get("opponents") or [],
+            "winner": result.get("winner"),
+            "winner_agent_id": result.get("winner_agent_id"),
+            "created_at": battle.get("created_at"),
+            "finish_time": result.get("finish_time") or result.get("reported_at"),
+            "event_count": len(battle.get("interact_history") or ()),
+        }
+
+    @staticmethod
+    def battle_summaries(offset: int = 0, limit: int = SUMMARY_PAGE_SIZE) -> Dict[str, Any]:
+        """
+        Build a battle_summaries message: a page of battle summaries, most
+        recent first, with the offset of the next page (None on the last).
+        """
+        offset = max(0, offset)
+        limit = min(max(1, limit), MAX_SUMMARY_PAGE_SIZE)
+        summaries = db.list_battle_summaries(limit=limit, offset=offset)
+        total = db.count("battles")
+        return {
+            "type": "battle_summaries",
+            "battles": summaries,
+            "offset": offset,
+            "total": total,
+            "next_offset": offset + len(summaries) if offset + len(summaries) < total else None,
+        }
+
+    @staticmethod
+    def battle_snapshot(battle_id: str) -> Optional[Dict[str, Any]]:
+        """Build the battle_snapshot message of a battle, with its full history."""
+        battle = db.read("battles", battle_id)
+        if not battle:
+            return None
+        db.attach_battle_events([battle])
+        history = battle["interact_history"]
+        return {
+            "type": "battle_snapshot",
+            "battle_id": battle_id,
+            "seq": history[-1]["seq"] if history else 0,
+            "battle": battle,
+        }
+
+    @classmethod
+    def battle_replay(cls, battle_id: str, after_seq: int) -> Optional[Dict[str, Any]]:
+        """
+        Build the battle_delta that brings a client resuming at after_seq up
+        to date: the events it missed and the battle's current fields. Falls
+        back to a battle_snapshot when it missed more than MAX_REPLAY_EVENTS.
+        """
+        battle = db.read("battles", battle_id)
+        if not battle:
+            return None
+        events = db.list_battle_events(battle_id, after_seq=after_seq, limit=MAX_REPLAY_EVENTS + 1)
+        if len(events) > MAX_REPLAY_EVENTS:
+            metrics.incr("ws.replay_snapshots")
+            return cls.battle_snapshot(battle_id)
+        metrics.incr("ws.replayed_events", len(events))
+        battle.pop("interact_history", None)
+        return {
+            "type": "battle_delta",
+            "battle_id": battle_id,
+            "seq": events[-1]["seq"] if events else after_seq,
+            "events": events,
+            "changes": battle,
+        }
+
+    @classmethod
+    def battle_replays(cls, points: Dict[str, int]) -> List[Dict[str, Any]]:
+        """The battle_replay messages of {battle_id: after_seq}, for battles that exist."""
+        replays = [cls.battle_replay(battle_id, seq) for battle_id, seq in points.items()]
+        return [replay for replay in replays if replay is not None]
+
+    def publish_battle(self, battle: Optional[Dict[str, Any]]):
+        """
+        Queue a battle update for the next broadcast; safe from any thread.
+        Only the battle's id is used, the broadcast reads the stored battle.
+        """
+        if battle is None:
+            return
+        with self._pending_lock:
+            if battle["battle_id"] in self._pending:
+                metrics.incr("ws.battle_updates_merged")
+            self._pending.add(battle["battle_id"])
+            self._schedule_wakeup()
+
+    def _schedule_wakeup(self):
+        """Wake the broadcast task unless already done; call with _pending_lock held."""
+        if self._wakeup_scheduled or self._wakeup is None or MAIN_EVENT_LOOP is None:
+            return  # run_broadcasts() picks up what is pending when it starts
         try:
-            if battle is None:
-                return
-            msg = json.dumps({"type": "battle_update", "battle": battle})
-            logger.info(f"[battles_ws] Broadcasting single battle update to {len(battles_ws_clients)} clients")
-            for ws in list(battles_ws_clients):
+            MAIN_EVENT_LOOP.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            return  # loop closed, the app is shutting down
+        self._wakeup_scheduled = True
+
+    async def run_broadcasts(self):
+        """Send published updates until cancelled; runs on the app's event loop."""
+        global MAIN_EVENT_LOOP
+        MAIN_EVENT_LOOP = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+        with self._pending_lock:
+            self._wakeup = wakeup
+            self._wakeup_scheduled = False
+            if self._pending or self._created or self._agents_pending:
+                wakeup.set()
+        try:
+            while True:
+                await wakeup.wait()
+                # Let updates published right after this one join the frame
+                await asyncio.sleep(self.window)
+                with self._pending_lock:
+                    wakeup.clear()
+                    self._wakeup_scheduled = False
                 try:
-                    asyncio.run_coroutine_threadsafe(ws.send_text(msg), MAIN_EVENT_LOOP)
+                    await self.flush()
                 except Exception as e:
-                    logger.warning(f"[battles_ws] Failed to send to client: {e}")
-                    try:
-                        battles_ws_clients.remove(ws)
-                    except Exception:
-                        pass
-        except Exception as e:
-            logger.error(f"[battles_ws] Error in broadcast_battle_update: {e}")
+                    logger.error(f"[battles_ws] Error broadcasting updates: {e}")
+                with self._pending_lock:
+                    if self._pending:
+                        # Rate-limited updates, retry after another window
+                        wakeup.set()
+        finally:
+            with self._pending_lock:
+                self._wakeup = None
+                self._wakeup_scheduled = False
+
+    async def flush(self):
+        """Send the published updates that are due."""
+        now = time.monotonic()
+        min_interval = 1 / self.battle_frame_rate if self.battle_frame_rate > 0 else 0
+        with self._pending_lock:
+            due = []
+            for battle_id in list(self._pending):
+                if now - self._last_frame.get(battle_id, 0) < min_interval:
+                    continue  # stays pending, later updates merge into it
+                self._pending.discard(battle_id)
+                due.append(battle_id)
+            created, self._created = self._created, []
+            agents, self._agents_pending = self._agents_pending, {}
+
+        agent_deltas = self._agent_deltas(agents)
+        clients = self.subscribers(AGENTS_TOPIC) if agent_deltas else set()
+        for msg in agent_deltas if clients else ():
+            self._send_to(clients, json.dumps(msg))
+
+        # New battles first, their first deltas may be due as well
+        clients = self.subscribers(SUMMARY_TOPIC) if created else set()
+        for msg in created if clients else ():
+            self._send_to(clients, json.dumps(msg))
+
+        for battle_id in due:
+            battle, delta = await run_in_threadpool(self._stored_battle_delta, battle_id)
+            if battle is None or battle.get("state") in ("finished", "error"):
+                self._last_frame.pop(battle_id, None)
+            else:
+                self._last_frame[battle_id] = now
+            if delta is not None:
+                self._send_battle_delta(delta)
+
+    def _stored_battle_delta(
+        self, battle_id: str
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Read a battle and build its battle_delta; (None, None) if it is gone."""
+        battle = db.read("battles", battle_id)
+        if battle is None:
+            return None, None
+        return battle, self.battle_delta(battle)
+
+    def _send_battle_delta(self, delta: Dict[str, Any]):
+        battle_id = delta["battle_id"]
+        watchers = self.subscribers(battle_topic(battle_id))
+        summary_watchers = self.subscribers(SUMMARY_TOPIC) - watchers
+        if watchers:
+            self._send_to(watchers, json.dumps(delta))
+        if summary_watchers and (delta["changes"] or delta["events"]):
+            # Summaries only count the events
+            changes = dict(delta["changes"])
+            if delta["events"]:
+                changes["event_count"] = delta["seq"]
+            self._send_to(
+                summary_watchers, json.dumps({**delta, "events": [], "changes": changes})
+            )
+
+        # /ws/battles/{battle_id}/logs clients get each new event
+        log_watchers = set(log_subscribers.get(battle_id, ()))
+        for event in delta["events"] if log_watchers else ():
+            self._send_to(log_watchers, json.dumps(event))
+
+    def _send_to(self, clients: Set[WebSocket], msg: str):
+        """Queue an encoded message on the channels of clients."""
+        metrics.incr("ws.messages_encoded")
+        for ws in clients:
+            channel = self._channels.get(ws)
+            if channel is not None:
+                channel.send(msg)
+
+    def pending(self) -> int:
+        with self._pending_lock:
+            return len(self._pending)
 
 # Create global instance
 websocket_manager = WebSocketManager()
+metrics.gauge("ws.clients", lambda: len(battles_ws_clients))
+metrics.gauge("ws.pending_battle_updates", websocket_manager.pending)
+metrics.gauge("ws.client_queues", websocket_manager.client_stats)
+
+async def client_frames(channel: ClientChannel) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield the JSON object frames a client sends. Pings are answered here
+    and acks only count as signs of life. While the client is quiet a
+    heartbeat is sent every HEARTBEAT_INTERVAL seconds, which it should
+    ack; after IDLE_TIMEOUT seconds of silence the socket is closed.
+    """
+    last_seen = time.monotonic()
+    while True:
+        try:
+            text = await asyncio.wait_for(channel.ws.receive_text(), HEARTBEAT_INTERVAL)
+        except asyncio.TimeoutError:
+            if time.monotonic() - last_seen >= IDLE_TIMEOUT:
+                metrics.incr("ws.idle_disconnects")
+                channel.close(IDLE_CLOSE_CODE, "idle timeout")
+                return
+            channel.send(json.dumps({"type": "heartbeat"}))
+            continue
+        last_seen = time.monotonic()
+        try:
+            frame = json.loads(text)
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(frame, dict):
+            continue
+        kind = frame.get("type")
+        if kind == "ping":
+            channel.send(json.dumps({"type": "pong"}))
+        elif kind != "ack":
+            yield frame
+
+
+def resume_points(request: Dict[str, Any]) -> Dict[str, int]:
+    """The {battle_id: last_seq} a subscribe frame resumes from."""
+    points = {}
+    last_seq = request.get("last_seq")
+    if not isinstance(last_seq, dict):
+        return points
+    for battle_id, seq in last_seq.items():
+        try:
+            points[str(battle_id)] = max(0, int(seq))
+        except (TypeError, ValueError):
+            continue
+    return points
+
+
+def requested_topics(request: Dict[str, Any]) -> List[str]:
+    """Topics named by a subscribe or unsubscribe frame."""
+    topics = [battle_topic(str(battle_id)) for battle_id in request.get("battle_ids") or []]
+    if request.get("summary"):
+        topics.append(SUMMARY_TOPIC)
+    if request.get("agents"):
+        topics.append(AGENTS_TOPIC)
+    return topics
+
 
 @router.websocket("/ws/battles")
 async def battles_ws(websocket: WebSocket):
-    """WebSocket endpoint for real-time battle updates."""
+    """
+    WebSocket endpoint for real-time battle updates. A client first gets
+    the first page of battle summaries; full battles come as snapshots.
+    A reconnecting client passes the last seq it has of each battle it
+    subscribes to and gets a battle_delta of the events it missed.
+    Client frames:
+      {"type": "subscribe", "battle_ids": [...], "summary": true,
+       "agents": true, "last_seq": {battle_id: seq, ...}}
+      {"type": "unsubscribe", "battle_ids": [...], "summary": true, "agents": true}
+      {"type": "snapshot", "battle_id": ...}
+      {"type": "summaries", "offset": ..., "limit": ...}
+      {"type": "ping"}, {"type": "ack"} (see client_frames)
+    """
     logger.info("[battles_ws] Client connecting")
     await websocket.accept()
     battles_ws_clients.add(websocket)
+    channel = websocket_manager.open_channel(websocket, websocket_manager.resync_client)
     try:
-        battles = db.list("battles")
-        await websocket.send_text(json.dumps({"type": "battles_update", "battles": battles}))
+        summaries = await run_in_threadpool(websocket_manager.battle_summaries)
+        channel.send(json.dumps(summaries))
         logger.info(f"[battles_ws] Client connected. Total clients: {len(battles_ws_clients)}")
-        while True:
-            await asyncio.sleep(1)
+        async for request in client_frames(channel):
+            kind = request.get("type")
+            if kind == "subscribe":
+                topics = websocket_manager.subscribe(websocket, requested_topics(request))
+                # Replay what a reconnecting client missed. Live deltas of
+                # the new topics are held until the replays are queued.
+                channel.hold()
+                frames = [json.dumps({"type": "subscribed", "topics": sorted(topics)})]
+                try:
+                    points = {
+                        battle_id: seq for battle_id, seq in resume_points(request).items()
+                        if battle_topic(battle_id) in topics
+                    }
+                    if points:
+                        replays = await run_in_threadpool(websocket_manager.battle_replays, points)
+                        frames.extend(json.dumps(replay) for replay in replays)
+                finally:
+                    channel.release(frames)
+            elif kind == "unsubscribe":
+                topics = websocket_manager.unsubscribe(websocket, requested_topics(request))
+                channel.send(json.dumps({"type": "subscribed", "topics": sorted(topics)}))
+            elif kind == "snapshot":
+                snapshot = await run_in_threadpool(
+                    websocket_manager.battle_snapshot, str(request.get("battle_id"))
+                )
+                if snapshot is not None:
+                    channel.send(json.dumps(snapshot))
+            elif kind == "summaries":
+                try:
+                    offset = int(request.get("offset") or 0)
+                    limit = int(request.get("limit") or SUMMARY_PAGE_SIZE)
+                except (TypeError, ValueError):
+                    continue
+                summaries = await run_in_threadpool(websocket_manager.battle_summaries, offset, limit)
+                channel.send(json.dumps(summaries))
     except WebSocketDisconnect:
         logger.info("[battles_ws] Client disconnected")
-        battles_ws_clients.remove(websocket)
     except Exception as e:
         logger.warning(f"[battles_ws] Exception: {e}")
-        battles_ws_clients.remove(websocket)
+    finally:
+        websocket_manager.remove_client(websocket)
+
+def battle_system_logs(battle_id: str) -> List[Dict[str, Any]]:
+    """The existing system logs of a battle, sent to new log clients first."""
+    battle = db.read("battles", battle_id)
+    if not battle or not battle.get("system_log_id"):
+        return []
+    system_log = db.read("system", battle["system_log_id"])
+    return (system_log or {}).get("logs", [])
 
 @router.websocket("/ws/battles/{battle_id}/logs")
 async def battle_logs_ws(websocket: WebSocket, battle_id: str):
     """WebSocket endpoint for real-time battle log updates."""
     logger.info(f"[logs_ws] Client connecting for battle {battle_id}")
     await websocket.accept()
-    if battle_id not in log_subscribers:
-        log_subscribers[battle_id] = []
-    log_subscribers[battle_id].append(websocket)
+    # Without a resync, a client that falls behind is disconnected
+    channel = websocket_manager.open_channel(websocket)
+    # New events are held until the existing logs are queued before them
+    channel.hold()
+    log_subscribers.setdefault(battle_id, set()).add(websocket)
     try:
-        # Get the battle to find the system_log_id
-        battle = db.read("battles", battle_id)
-        if battle and battle.get("system_log_id"):
-            system_log = db.read("system", battle["system_log_id"])
-            if system_log and "logs" in system_log:
-                # Send existing logs to the client
-                for log in system_log["logs"]:
-                    await websocket.send_json(log)
+        logs = await run_in_threadpool(battle_system_logs, battle_id)
+        channel.release(json.dumps(log) for log in logs)
         logger.info(f"[logs_ws] Client connected for battle {battle_id}")
-        while True:
-            await asyncio.sleep(1)
+        async for _ in client_frames(channel):
+            pass  # nothing to ask for besides liveness
     except WebSocketDisconnect:
         logger.info(f"[logs_ws] Client disconnected for battle {battle_id}")
-        log_subscribers[battle_id].remove(websocket)
     except Exception as e:
         logger.warning(f"[logs_ws] Exception for battle {battle_id}: {e}")
-        log_subscribers[battle_id].remove(websocket) 
\ No newline at end of file
+    finally:
+        websocket_manager.close_channel(websocket)
+        subscribers = log_subscribers.get(battle_id)
+        if subscribers is not None:
+            subscribers.discard(websocket)
+            if not subscribers:
+                del log_subscribers[battle_id]
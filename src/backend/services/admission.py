@@ -0,0 +1,101 @@
+import math
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from .metrics import metrics
+
+# Limits, overridable through the environment
+MAX_QUEUE_DEPTH = int(os.getenv("AGENTBEATS_MAX_QUEUE_DEPTH", "1000"))
+QUEUE_FULL_RETRY_AFTER = int(os.getenv("AGENTBEATS_QUEUE_FULL_RETRY_AFTER", "30"))
+BATTLE_EVENT_RATE = float(os.getenv("AGENTBEATS_BATTLE_EVENT_RATE", "20"))
+BATTLE_EVENT_BURST = float(os.getenv("AGENTBEATS_BATTLE_EVENT_BURST", "100"))
+
+
+class TokenBucket:
+    """Token bucket refilled at rate tokens per second up to burst tokens."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, count: float = 1) -> float:
+        """
+        Take count tokens if available and return 0, otherwise take nothing
+        and return the seconds until they will be.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= count:
+            self.tokens -= count
+            return 0.0
+        if self.rate <= 0:
+            return math.inf
+        return (count - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """
+    Decides whether new work is accepted: battle submissions are bounded by
+    the queue depth, and the events of each battle by a token bucket.
+    Limits of 0 or less disable the corresponding check.
+    """
+
+    def __init__(
+        self,
+        max_queue_depth: int = MAX_QUEUE_DEPTH,
+        event_rate: float = BATTLE_EVENT_RATE,
+        event_burst: float = BATTLE_EVENT_BURST,
+    ):
+        self.max_queue_depth = max_queue_depth
+        self.event_rate = event_rate
+        self.event_burst = event_burst
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def admit_battle(self, queue_depth: int) -> Optional[int]:
+        """Return None to accept a battle, or the seconds to retry after."""
+        if self.max_queue_depth <= 0 or queue_depth < self.max_queue_depth:
+            metrics.incr("admission.battles_accepted")
+            return None
+        metrics.incr("admission.battles_rejected")
+        return QUEUE_FULL_RETRY_AFTER
+
+    def admit_events(self, battle_id: str, count: int = 1) -> Optional[int]:
+        """Return None to accept count events of a battle, or the seconds to retry after."""
+        if self.event_rate <= 0:
+            return None
+        with self._lock:
+            bucket = self._buckets.get(battle_id)
+            if bucket is None:
+                bucket = self._buckets[battle_id] = TokenBucket(
+                    self.event_rate, self.event_burst
+                )
+            # A batch larger than the burst can never fit, charge the burst
+            wait = bucket.take(min(count, self.event_burst))
+        if wait == 0:
+            metrics.incr("admission.events_accepted", count)
+            return None
+        metrics.incr("admission.events_rejected", count)
+        return max(1, math.ceil(wait))
+
+    def forget(self, battle_id: str):
+        """Drop the rate limiter state of a finished battle."""
+        with self._lock:
+            self._buckets.pop(battle_id, None)
+
+    def limits(self) -> Dict[str, float]:
+        return {
+            "max_queue_depth": self.max_queue_depth,
+            "battle_event_rate": self.event_rate,
+            "battle_event_burst": self.event_burst,
+            "rate_limited_battles": len(self._buckets),
+        }
+
+
+admission = AdmissionController()
+metrics.gauge("admission.limits", admission.limits)
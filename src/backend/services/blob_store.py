@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from ..db.storage import db
+from .metrics import metrics
+
+# Event fields larger than this many bytes are stored as blobs
+BLOB_THRESHOLD = int(os.getenv("AGENTBEATS_BLOB_THRESHOLD", "4096"))
+
+# Event fields that may carry large payloads, with the content type of
+# their text form; non-string values are stored as JSON
+OFFLOAD_FIELDS = {
+    "terminal_output": "text/plain; charset=utf-8",
+    "markdown_content": "text/markdown; charset=utf-8",
+    "asciinema_url": "text/plain; charset=utf-8",
+    "detail": "application/json",
+}
+
+
+class BlobStore:
+    """
+    Content-addressed store for large event payloads.
+
+    Blobs are keyed by the SHA-256 of their content, so a payload is
+    stored once however many events carry it. An offloaded event keeps a
+    reference instead of the field: event["blobs"][field] is
+    {"hash", "size", "content_type"}, served by GET /blobs/{hash}.
+    """
+
+    def __init__(self, threshold: int = BLOB_THRESHOLD):
+        self.threshold = threshold
+
+    def put(self, data: bytes, content_type: str) -> Dict[str, Any]:
+        """Store data and return its reference."""
+        blob_hash = hashlib.sha256(data).hexdigest()
+        db.put_blob(blob_hash, data, content_type)
+        return {"hash": blob_hash, "size": len(data), "content_type": content_type}
+
+    def offload(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Move the large payload fields of an event to blobs, in place."""
+        if self.threshold <= 0:
+            return event
+        for field, content_type in OFFLOAD_FIELDS.items():
+            value = event.get(field)
+            if value is None:
+                continue
+            if isinstance(value, str):
+                data = value.encode("utf-8")
+                if content_type == "application/json":
+                    content_type = "text/plain; charset=utf-8"
+            else:
+                data = json.dumps(value).encode("utf-8")
+                content_type = "application/json"
+            if len(data) <= self.threshold:
+                continue
+            event.setdefault("blobs", {})[field] = self.put(data, content_type)
+            del event[field]
+            metrics.incr("blobs.offloaded_bytes", len(data))
+        return event
+
+    def inline(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Return a copy of an event with its blob references resolved."""
+        refs = event.get("blobs")
+        if not refs:
+            return event
+        event = dict(event)
+        missing = {}
+        for field, ref in refs.items():
+            data = db.read_blob(ref["hash"])
+            if data is None:
+                missing[field] = ref
+                continue
+            text = data.decode("utf-8")
+            event[field] = json.loads(text) if ref["content_type"] == "application/json" else text
+        if missing:
+            event["blobs"] = missing
+        else:
+            del event["blobs"]
+        return event
+
+    def inline_events(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [self.inline(event) for event in events]
+
+    def info(self, blob_hash: str) -> Optional[Dict[str, Any]]:
+        return db.get_blob_info(blob_hash)
+
+    def read(self, blob_hash: str, start: int = 0, length: Optional[int] = None) -> Optional[bytes]:
+        return db.read_blob(blob_hash, start, length)
+
+
+blob_store = BlobStore()
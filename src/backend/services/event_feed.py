@@ -0,0 +1,66 @@
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Set, Tuple
+
+from .metrics import metrics
+
+_Waiter = Tuple[asyncio.AbstractEventLoop, asyncio.Future]
+
+
+class EventFeed:
+    """
+    Wakes async handlers waiting for news of a battle.
+
+    Request handlers wait on a future of their own event loop; the threads
+    that store battle events call notify(), which resolves the futures
+    through call_soon_threadsafe. A notification only says that something
+    changed, waiters re-read the events they are interested in.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters: Dict[str, Set[_Waiter]] = {}
+
+    @contextmanager
+    def subscribe(self, battle_id: str) -> Iterator[asyncio.Future]:
+        """
+        Yield a future resolved on the next notify(battle_id). Subscribe
+        before reading, so that no notification falls in between.
+        """
+        loop = asyncio.get_running_loop()
+        waiter = (loop, loop.create_future())
+        with self._lock:
+            self._waiters.setdefault(battle_id, set()).add(waiter)
+        try:
+            yield waiter[1]
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(battle_id)
+                if waiters is not None:
+                    waiters.discard(waiter)
+                    if not waiters:
+                        del self._waiters[battle_id]
+
+    def notify(self, battle_id: str):
+        """Wake everything waiting on a battle; safe to call from any thread."""
+        with self._lock:
+            waiters = self._waiters.pop(battle_id, ())
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def waiting(self) -> int:
+        with self._lock:
+            return sum(len(waiters) for waiters in self._waiters.values())
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+event_feed = EventFeed()
+metrics.gauge("event_feed.waiters", event_feed.waiting)
@@ -0,0 +1,167 @@
+import bisect
+import logging
+import threading
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..db.storage import db
+
+# =============================================================================
+# LEADERBOARD LOGGING CONFIGURATION
+# =============================================================================
+# Configure dedicated logger for leaderboard operations
+leaderboard_logger = logging.getLogger('leaderboard')
+leaderboard_logger.setLevel(logging.ERROR)  # Only log errors
+
+# Create console handler if it doesn't exist
+if not leaderboard_logger.handlers:
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.ERROR)
+    formatter = logging.Formatter(
+        '%(asctime)s - [LEADERBOARD] - %(levelname)s - %(message)s',
+        datefmt='%H:%M:%S'
+    )
+    console_handler.setFormatter(formatter)
+    leaderboard_logger.addHandler(console_handler)
+    leaderboard_logger.propagate = False  # Prevent duplicate logs
+
+SORT_KEYS = ("rating", "win_rate")
+
+
+def leaderboard_entry(agent: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the leaderboard entry of an agent document."""
+    register_info = agent.get("register_info", {})
+    elo = agent.get("elo") or {}
+    stats = elo.get("stats") or {}
+    total_battles = stats.get("total_battles", 0)
+    wins = stats.get("wins", 0)
+    return {
+        "agent_id": agent["agent_id"],
+        "alias": register_info.get("alias"),
+        "name": (agent.get("agent_card") or {}).get("name"),
+        "is_green": register_info.get("is_green", False),
+        "user_id": agent.get("user_id"),
+        "rating": elo.get("rating"),
+        "rating_deviation": elo.get("rating_deviation"),
+        "wins": wins,
+        "losses": stats.get("losses", 0),
+        "draws": stats.get("draws", 0),
+        "errors": stats.get("errors", 0),
+        "total_battles": total_battles,
+        # Percentage, like the rates shown by the frontend
+        "win_rate": round(wins / total_battles * 100, 2) if total_battles else 0.0,
+    }
+
+
+def _sort_key(sort: str, entry: Dict[str, Any]) -> Tuple:
+    """Ascending key ranking entries best first; unrated agents go last."""
+    rating = entry.get("rating")
+    rating_key = (rating is None, -(rating or 0))
+    if sort == "rating":
+        return rating_key + (-entry["win_rate"], entry["agent_id"])
+    return (-entry["win_rate"],) + rating_key + (entry["agent_id"],)
+
+
+class Leaderboard:
+    """
+    In-memory leaderboard kept sorted by rating and by win rate.
+    Entries are persisted in the leaderboard table in the same transaction
+    as the agent update, and the committed row is applied to memory once it
+    commits. The version changes on every applied update and backs the ETag
+    of GET /leaderboard.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Serializes reading committed rows and applying them
+        self._apply_lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._order: Dict[str, List[Tuple]] = {sort: [] for sort in SORT_KEYS}
+        # Distinguishes versions across restarts
+        self._epoch = uuid.uuid4().hex[:8]
+        self.version = 0
+
+    @property
+    def etag(self) -> str:
+        return f'"{self._epoch}-{self.version}"'
+
+    def load(self):
+        """Load entries from storage, building them from agents on first run."""
+        entries = db.list_leaderboard_entries()
+        if not entries:
+            agents = db.list("agents")
+            entries = [leaderboard_entry(agent) for agent in agents]
+            with db.transaction():
+                for entry in entries:
+                    db.upsert_leaderboard_entry(entry)
+        with self._lock:
+            self._entries = {entry["agent_id"]: entry for entry in entries}
+            self._order = {
+                sort: sorted(_sort_key(sort, entry) for entry in entries)
+                for sort in SORT_KEYS
+            }
+            self.version += 1
+        leaderboard_logger.info(f"Loaded {len(entries)} leaderboard entries")
+
+    def update(self, agent: Dict[str, Any]):
+        """Persist the agent's entry, applying it to memory on commit."""
+        entry = leaderboard_entry(agent)
+        db.upsert_leaderboard_entry(entry)
+        db.after_commit(lambda: self._apply(entry["agent_id"]))
+
+    def remove(self, agent_id: str):
+        """Drop the agent's entry, applying it to memory on commit."""
+        db.delete_leaderboard_entry(agent_id)
+        db.after_commit(lambda: self._apply(agent_id))
+
+    def _apply(self, agent_id: str):
+        """
+        Apply the agent's committed entry to memory. Callbacks of concurrent
+        transactions may run in any order, so each one reads the row rather
+        than applying the entry it wrote; the last applied is the latest.
+        """
+        with self._apply_lock:
+            entry = db.read_leaderboard_entry(agent_id)
+            self._apply_entry(agent_id, entry)
+
+    def _apply_entry(self, agent_id: str, entry: Optional[Dict[str, Any]]):
+        with self._lock:
+            previous = self._entries.pop(agent_id, None)
+            if previous == entry:
+                if previous is not None:
+                    self._entries[agent_id] = previous
+                return
+            for sort, order in self._order.items():
+                if previous is not None:
+                    key = _sort_key(sort, previous)
+                    index = bisect.bisect_left(order, key)
+                    if index < len(order) and order[index] == key:
+                        del order[index]
+                if entry is not None:
+                    bisect.insort(order, _sort_key(sort, entry))
+            if entry is not None:
+                self._entries[agent_id] = entry
+            self.version += 1
+
+    def page(
+        self, sort: str = "rating", limit: int = 50, offset: int = 0
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Return the ETag and a ranked page of entries."""
+        with self._lock:
+            order = self._order[sort]
+            keys = order[offset:offset + limit]
+            entries = [
+                dict(self._entries[key[-1]], rank=offset + i + 1)
+                for i, key in enumerate(keys)
+            ]
+            return self.etag, {
+                "version": self.version,
+                "sort": sort,
+                "total": len(order),
+                "limit": limit,
+                "offset": offset,
+                "entries": entries,
+            }
+
+
+leaderboard = Leaderboard()
@@ -0,0 +1,41 @@
+import threading
+from typing import Any, Callable, Dict
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and gauges, served as JSON by GET /metrics.
+    Counters are incremented by the code paths they count; gauges are
+    callables evaluated when a snapshot is taken.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, Callable[[], Any]] = {}
+
+    def incr(self, name: str, value: float = 1):
+        """Add value to a counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def gauge(self, name: str, read: Callable[[], Any]):
+        """Register a gauge, replacing any gauge of the same name."""
+        with self._lock:
+            self._gauges[name] = read
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current value of every counter and gauge."""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        values = {}
+        for name, read in gauges.items():
+            try:
+                values[name] = read()
+            except Exception as e:
+                values[name] = f"error: {e}"
+        return {"counters": counters, "gauges": values}
+
+
+metrics = MetricsRegistry()
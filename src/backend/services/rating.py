@@ -0,0 +1,494 @@
+# -*- coding: utf-8 -*-
+"""
+Rating engine for AgentBeats battles.
+
+Battle results are decomposed into pairwise games and kept in compact NumPy
+arrays, so ratings can be recomputed over the full battle history in one
+pass whenever the formula changes, and updated incrementally as each new
+result arrives. Two rating systems are supported:
+
+- "elo": expected-score Elo, games applied in history order.
+- "glicko2": Glicko-2 with fixed-length rating periods.
+
+Both paths share the same update code, so an incremental update always
+matches what a full recompute of the same history would produce.
+"""
+
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_RATING = 1000.0
+ELO_K_FACTOR = 32.0
+ELO_MIN_BATCH_WIDTH = 16
+GLICKO2_SCALE = 173.7178
+GLICKO2_DEFAULT_RD = 350.0
+GLICKO2_DEFAULT_VOLATILITY = 0.06
+GLICKO2_TAU = 0.5
+GLICKO2_PERIOD_SECONDS = 24 * 60 * 60
+GLICKO2_EPSILON = 1e-6
+
+RATING_SYSTEMS = ("elo", "glicko2")
+
+# (agent_a, agent_b, score of agent_a)
+Game = Tuple[str, str, float]
+
+
+def battle_games(
+    green_agent_id: str, opponent_ids: List[str], winner_agent_id: Optional[str]
+) -> List[Game]:
+    """
+    Decompose a battle outcome into pairwise games between its participants.
+    The green agent takes part as the environment: it wins when no opponent
+    manages to, and loses to the opponent that does.
+    winner_agent_id is "draw" for a draw and None when the winner is unknown,
+    in which case the battle carries no rating information.
+    """
+    participants = [green_agent_id] + [
+        op for op in opponent_ids if op != green_agent_id
+    ]
+    if winner_agent_id == "draw":
+        return [
+            (a, b, 0.5)
+            for i, a in enumerate(participants)
+            for b in participants[i + 1:]
+        ]
+    if winner_agent_id not in participants:
+        return []
+    return [
+        (winner_agent_id, other, 1.0)
+        for other in participants
+        if other != winner_agent_id
+    ]
+
+
+class RatingHistory:
+    """Append-only log of pairwise games stored in compact NumPy arrays."""
+
+    def __init__(self, capacity: int = 1024):
+        self.agent_ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.size = 0
+        self._a = np.empty(capacity, dtype=np.int32)
+        self._b = np.empty(capacity, dtype=np.int32)
+        self._score = np.empty(capacity, dtype=np.float32)
+        self._time = np.empty(capacity, dtype=np.float64)
+
+    def agent_index(self, agent_id: str) -> int:
+        """Return the dense index of agent_id, registering it if needed."""
+        idx = self.index.get(agent_id)
+        if idx is None:
+            idx = len(self.agent_ids)
+            self.index[agent_id] = idx
+            self.agent_ids.append(agent_id)
+        return idx
+
+    def append(self, timestamp: float, games: List[Game]) -> slice:
+        """Append the games of one battle and return their position."""
+        return self.extend([(timestamp, games)])
+
+    def extend(self, results: Iterable[Tuple[float, List[Game]]]) -> slice:
+        """Append the games of many (timestamp, games) battles at once."""
+        a, b, score, times = [], [], [], []
+        agent_index = self.agent_index
+        for timestamp, games in results:
+            for x, y, s in games:
+                a.append(agent_index(x))
+                b.append(agent_index(y))
+                score.append(s)
+                times.append(timestamp)
+
+        start, needed = self.size, self.size + len(a)
+        if needed > len(self._a):
+            capacity = max(needed, 2 * len(self._a))
+            for name in ("_a", "_b", "_score", "_time"):
+                old = getattr(self, name)
+                new = np.empty(capacity, dtype=old.dtype)
+                new[:start] = old[:start]
+                setattr(self, name, new)
+
+        self._a[start:needed] = a
+        self._b[start:needed] = b
+        self._score[start:needed] = score
+        self._time[start:needed] = times
+        self.size = needed
+        return slice(start, needed)
+
+    @property
+    def a(self) -> np.ndarray:
+        return self._a[: self.size]
+
+    @property
+    def b(self) -> np.ndarray:
+        return self._b[: self.size]
+
+    @property
+    def score(self) -> np.ndarray:
+        return self._score[: self.size]
+
+    @property
+    def time(self) -> np.ndarray:
+        return self._time[: self.size]
+
+
+def _elo_apply(ratings: np.ndarray, a: np.ndarray, b: np.ndarray,
+               score: np.ndarray, k_factor: float) -> None:
+    """Apply one batch of Elo games; no agent may appear twice in a batch."""
+    expected = 1.0 / (1.0 + 10.0 ** ((ratings[b] - ratings[a]) / 400.0))
+    delta = k_factor * (score - expected)
+    ratings[a] += delta
+    ratings[b] -= delta
+
+
+def _elo_levels(a: np.ndarray, b: np.ndarray, n_agents: int) -> np.ndarray:
+    """
+    Assign every game to the earliest batch that comes after the previous
+    games of both its players. Games of one batch share no player, so
+    applying the batches in order is exactly the sequential Elo update.
+    """
+    last = [0] * n_agents
+    levels = []
+    for x, y in zip(a.tolist(), b.tolist()):
+        level = max(last[x], last[y])
+        levels.append(level)
+        last[x] = last[y] = level + 1
+    return np.asarray(levels, dtype=np.int64)
+
+
+def _elo_sequential(ratings: np.ndarray, a: np.ndarray, b: np.ndarray,
+                    score: np.ndarray, k_factor: float) -> None:
+    """Apply Elo games one by one, cheaper than tiny batches."""
+    values = ratings.tolist()
+    for x, y, s in zip(a.tolist(), b.tolist(), score.tolist()):
+        expected = 1.0 / (1.0 + 10.0 ** ((values[y] - values[x]) / 400.0))
+        delta = k_factor * (s - expected)
+        values[x] += delta
+        values[y] -= delta
+    ratings[:] = values
+
+
+def elo_ratings(history: RatingHistory, k_factor: float = ELO_K_FACTOR,
+                ratings: Optional[np.ndarray] = None,
+                games: slice = slice(None)) -> np.ndarray:
+    """Run expected-score Elo over history[games], starting from ratings."""
+    n_agents = len(history.agent_ids)
+    result = np.full(n_agents, DEFAULT_RATING, dtype=np.float64)
+    if ratings is not None:
+        result[: len(ratings)] = ratings
+
+    a, b = history.a[games], history.b[games]
+    score = history.score[games].astype(np.float64)
+    if len(a) == 0:
+        return result
+
+    levels = _elo_levels(a, b, n_agents)
+    if len(a) < ELO_MIN_BATCH_WIDTH * (int(levels.max()) + 1):
+        # Histories dominated by a few agents (e.g. one green agent judging
+        # every battle) give narrow batches, where NumPy overhead dominates.
+        _elo_sequential(result, a, b, score, k_factor)
+        return result
+
+    order = np.argsort(levels, kind="stable")
+    bounds = np.flatnonzero(np.diff(levels[order])) + 1
+    for batch in np.split(order, bounds):
+        _elo_apply(result, a[batch], b[batch], score[batch], k_factor)
+    return result
+
+
+class Glicko2State:
+    """Glicko-2 parameters of every agent, on the internal Glicko-2 scale."""
+
+    def __init__(self, n_agents: int = 0):
+        self.mu = np.zeros(n_agents, dtype=np.float64)
+        self.phi = np.full(n_agents, GLICKO2_DEFAULT_RD / GLICKO2_SCALE)
+        self.sigma = np.full(n_agents, GLICKO2_DEFAULT_VOLATILITY)
+
+    def copy(self) -> "Glicko2State":
+        state = Glicko2State()
+        state.mu, state.phi, state.sigma = (
+            self.mu.copy(), self.phi.copy(), self.sigma.copy()
+        )
+        return state
+
+    def grow(self, n_agents: int) -> None:
+        """Add default parameters for newly seen agents."""
+        missing = n_agents - len(self.mu)
+        if missing > 0:
+            fresh = Glicko2State(missing)
+            self.mu = np.concatenate([self.mu, fresh.mu])
+            self.phi = np.concatenate([self.phi, fresh.phi])
+            self.sigma = np.concatenate([self.sigma, fresh.sigma])
+
+    def idle(self, periods: int) -> None:
+        """Let rating deviations grow over periods without any game."""
+        if periods > 0:
+            self.phi = np.minimum(
+                np.sqrt(self.phi ** 2 + periods * self.sigma ** 2),
+                GLICKO2_DEFAULT_RD / GLICKO2_SCALE,
+            )
+
+    def ratings(self) -> np.ndarray:
+        return GLICKO2_SCALE * self.mu + DEFAULT_RATING
+
+    def deviations(self) -> np.ndarray:
+        return GLICKO2_SCALE * self.phi
+
+
+def _glicko2_volatility(delta2, phi2, v, sigma, tau):
+    """Solve for the new volatility of each player (Illinois algorithm)."""
+    a = np.log(sigma ** 2)
+
+    def f(x):
+        ex = np.exp(x)
+        return (ex * (delta2 - phi2 - v - ex)) / (2.0 * (phi2 + v + ex) ** 2) - (x - a) / tau ** 2
+
+    big_a = a.copy()
+    big_b = np.where(delta2 > phi2 + v, np.log(np.maximum(delta2 - phi2 - v, 1e-300)), 0.0)
+    pending = ~(delta2 > phi2 + v)
+    k = np.ones_like(a)
+    while pending.any():
+        candidate = a - k * tau
+        found = pending & (f(candidate) >= 0)
+        big_b = np.where(found, candidate, big_b)
+        pending &= ~found
+        k += pending
+
+    f_a, f_b = f(big_a), f(big_b)
+    active = np.abs(big_b - big_a) > GLICKO2_EPSILON
+    for _ in range(100):
+        if not active.any():
+            break
+        with np.errstate(divide="ignore", invalid="ignore"):
+            c = big_a + (big_a - big_b) * f_a / (f_b - f_a)
+        c = np.where(active, c, big_b)
+        f_c = f(c)
+        swap = f_c * f_b <= 0
+        big_a = np.where(active & swap, big_b, big_a)
+        f_a = np.where(active & swap, f_b, np.where(active, f_a / 2.0, f_a))
+        big_b = np.where(active, c, big_b)
+        f_b = np.where(active, f_c, f_b)
+        active &= np.abs(big_b - big_a) > GLICKO2_EPSILON
+    return np.exp(big_a / 2.0)
+
+
+def glicko2_period(state: Glicko2State, a: np.ndarray, b: np.ndarray,
+                   score: np.ndarray, tau: float = GLICKO2_TAU) -> Glicko2State:
+    """Return the state after one Glicko-2 rating period with these games."""
+    n_agents = len(state.mu)
+    players = np.concatenate([a, b])
+    opponents = np.concatenate([b, a])
+    scores = np.concatenate([score, 1.0 - score])
+
+    g = 1.0 / np.sqrt(1.0 + 3.0 * state.phi[opponents] ** 2 / math.pi ** 2)
+    expected = 1.0 / (1.0 + np.exp(-g * (state.mu[players] - state.mu[opponents])))
+    v_inv = np.bincount(players, g ** 2 * expected * (1.0 - expected), minlength=n_agents)
+    improvement = np.bincount(players, g * (scores - expected), minlength=n_agents)
+
+    result = state.copy()
+    result.idle(1)  # players without games only see their deviation grow
+    played = np.flatnonzero(v_inv > 0)
+    if len(played) == 0:
+        return result
+
+    v = 1.0 / v_inv[played]
+    delta = v * improvement[played]
+    phi = state.phi[played]
+    sigma = _glicko2_volatility(delta ** 2, phi ** 2, v, state.sigma[played], tau)
+    phi_star = np.sqrt(phi ** 2 + sigma ** 2)
+    new_phi = 1.0 / np.sqrt(1.0 / phi_star ** 2 + 1.0 / v)
+
+    result.mu[played] = state.mu[played] + new_phi ** 2 * improvement[played]
+    result.phi[played] = new_phi
+    result.sigma[played] = sigma
+    return result
+
+
+class RatingEngine:
+    """
+    Keeps the battle history in a RatingHistory and the current ratings of
+    every agent, for one rating system.
+    """
+
+    def __init__(self, system: str = "elo", k_factor: float = ELO_K_FACTOR,
+                 period_seconds: float = GLICKO2_PERIOD_SECONDS):
+        if system not in RATING_SYSTEMS:
+            raise ValueError(f"Unknown rating system: {system}")
+        self.system = system
+        self.k_factor = k_factor
+        self.period_seconds = period_seconds
+        self.history = RatingHistory()
+        self._elo = np.zeros(0, dtype=np.float64)
+        # Glicko-2: state when the open period started, and its games so far
+        self._period_start = Glicko2State()
+        self._open_period: Optional[int] = None
+        self._open_games = slice(0, 0)
+        self._glicko = Glicko2State()
+
+    def _period(self, timestamp: float) -> int:
+        period = int(timestamp // self.period_seconds)
+        if self._open_period is not None:
+            period = max(period, self._open_period)  # keep periods monotonic
+        return period
+
+    def load(self, results: Iterable[Tuple[float, List[Game]]]) -> None:
+        """Replace the history with (timestamp, games) results and recompute."""
+        self.history = RatingHistory()
+        self.history.extend(results)
+        self.recompute()
+
+    def recompute(self) -> None:
+        """Recompute every rating from the full history in one pass."""
+        history = self.history
+        if self.system == "elo":
+            self._elo = elo_ratings(history, self.k_factor)
+            return
+
+        n_agents = len(history.agent_ids)
+        state = Glicko2State(n_agents)
+        self._open_period, self._open_games = None, slice(0, 0)
+        if history.size:
+            periods = np.maximum.accumulate(
+                (history.time // self.period_seconds).astype(np.int64)
+            )
+            bounds = np.flatnonzero(np.diff(periods)) + 1
+            starts = np.concatenate([[0], bounds])
+            ends = np.concatenate([bounds, [history.size]])
+            previous = None
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                period = int(periods[start])
+                if previous is not None:
+                    state.idle(period - previous - 1)
+                if end < history.size:
+                    state = glicko2_period(
+                        state, history.a[start:end], history.b[start:end],
+                        history.score[start:end].astype(np.float64),
+                    )
+                else:
+                    # Keep the last period open for incremental updates
+                    self._period_start = state
+                    self._open_period = period
+                    self._open_games = slice(start, end)
+                previous = period
+        else:
+            self._period_start = state
+        self._refresh_open_period()
+
+    def _refresh_open_period(self) -> None:
+        start = self._period_start
+        start.grow(len(self.history.agent_ids))
+        games = self._open_games
+        self._glicko = glicko2_period(
+            start, self.history.a[games], self.history.b[games],
+            self.history.score[games].astype(np.float64),
+        ) if games.stop > games.start else start.copy()
+
+    def record(self, timestamp: float, games: List[Game]) -> Dict[str, float]:
+        """
+        Add the games of one new battle and update ratings incrementally.
+        Returns the new rating of every agent involved in the games.
+        """
+        if self.system == "elo":
+            position = self.history.append(timestamp, games)
+            self._elo = elo_ratings(
+                self.history, self.k_factor, ratings=self._elo, games=position
+            )
+        else:
+            period = self._period(timestamp)
+            if self._open_period is not None and period != self._open_period:
+                # Close the open period, then idle through the empty ones
+                self._period_start = self._glicko
+                self._period_start.idle(period - self._open_period - 1)
+                self._open_games = slice(self.history.size, self.history.size)
+            position = self.history.append(timestamp, games)
+            self._open_period = period
+            self._open_games = slice(self._open_games.start, position.stop)
+            self._refresh_open_period()
+
+        involved = {agent for game in games for agent in game[:2]}
+        return {agent_id: self.rating(agent_id) for agent_id in involved}
+
+    def preview(self, timestamp: float, games: List[Game]) -> Dict[str, Dict[str, float]]:
+        """
+        Rating (and deviation for Glicko-2) that the agents of games would
+        have after record(timestamp, games), leaving the engine untouched.
+        Runs the same update code as record, so the values are identical.
+        """
+        pending = RatingHistory(capacity=max(len(games), 1))
+        pending.agent_ids = list(self.history.agent_ids)
+        pending.index = dict(self.history.index)
+        position = pending.append(timestamp, games)
+
+        deviations = None
+        if self.system == "elo":
+            ratings = elo_ratings(
+                pending, self.k_factor, ratings=self._elo, games=position
+            )
+        else:
+            period = self._period(timestamp)
+            if self._open_period is not None and period != self._open_period:
+                start = self._glicko.copy()
+                start.idle(period - self._open_period - 1)
+                open_games = slice(self.history.size, self.history.size)
+            else:
+                start = self._period_start.copy()
+                open_games = self._open_games
+            start.grow(len(pending.agent_ids))
+            a = np.concatenate([self.history.a[open_games], pending.a])
+            if len(a):
+                state = glicko2_period(
+                    start, a,
+                    np.concatenate([self.history.b[open_games], pending.b]),
+                    np.concatenate(
+                        [self.history.score[open_games], pending.score]
+                    ).astype(np.float64),
+                )
+            else:
+                state = start
+            ratings, deviations = state.ratings(), state.deviations()
+
+        result = {}
+        for agent_id in {agent for game in games for agent in game[:2]}:
+            idx = pending.index[agent_id]
+            entry = {"rating": float(ratings[idx])}
+            if deviations is not None:
+                entry["rating_deviation"] = float(deviations[idx])
+            result[agent_id] = entry
+        return result
+
+    def _ratings(self) -> np.ndarray:
+        if self.system == "elo":
+            return self._elo
+        return self._glicko.ratings()
+
+    def rating(self, agent_id: str) -> float:
+        """Current rating of an agent, the default rating if it never played."""
+        idx = self.history.index.get(agent_id)
+        ratings = self._ratings()
+        if idx is None or idx >= len(ratings):
+            return DEFAULT_RATING
+        return float(ratings[idx])
+
+    def deviation(self, agent_id: str) -> Optional[float]:
+        """Glicko-2 rating deviation of an agent, None for Elo."""
+        if self.system != "glicko2":
+            return None
+        idx = self.history.index.get(agent_id)
+        deviations = self._glicko.deviations()
+        if idx is None or idx >= len(deviations):
+            return GLICKO2_DEFAULT_RD
+        return float(deviations[idx])
+
+    def ratings(self) -> Dict[str, Dict[str, float]]:
+        """Current rating (and deviation for Glicko-2) of every rated agent."""
+        ratings = self._ratings()
+        deviations = (
+            self._glicko.deviations() if self.system == "glicko2" else None
+        )
+        result = {}
+        for idx, agent_id in enumerate(self.history.agent_ids):
+            entry = {"rating": float(ratings[idx])}
+            if deviations is not None:
+                entry["rating_deviation"] = float(deviations[idx])
+            result[agent_id] = entry
+        return result
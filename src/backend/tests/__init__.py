@@ -0,0 +1,22 @@
+# Test package for the AgentBeats backend
+
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from backend.db.storage import SQLiteStorage
+
+
+def use_temp_storage(test, *modules) -> SQLiteStorage:
+    """
+    Give a test case a fresh SQLiteStorage in a temporary directory,
+    patched in as the db of each of modules until the test ends.
+    """
+    directory = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+    storage = SQLiteStorage(directory)
+    for module in modules:
+        patcher = patch.object(module, "db", storage)
+        patcher.start()
+        test.addCleanup(patcher.stop)
+    return storage
@@ -0,0 +1,95 @@
+"""
+Tests for the AgentBeats backend admission control.
+"""
+
+import math
+import unittest
+from unittest.mock import patch
+
+from backend.services import admission as admission_module
+from backend.services.admission import (
+    QUEUE_FULL_RETRY_AFTER,
+    AdmissionController,
+    TokenBucket,
+)
+
+
+class ClockTestCase(unittest.TestCase):
+    """Drive time.monotonic of the admission module by hand."""
+
+    def setUp(self):
+        self.now = 100.0
+        patcher = patch.object(admission_module, "time")
+        clock = patcher.start()
+        self.addCleanup(patcher.stop)
+        clock.monotonic.side_effect = lambda: self.now
+
+
+class TestTokenBucket(ClockTestCase):
+    """Test TokenBucket."""
+
+    def test_burst_then_wait(self):
+        """Test a full bucket gives its burst, then says how long to wait."""
+        bucket = TokenBucket(rate=2, burst=4)
+        self.assertEqual(bucket.take(3), 0)
+        self.assertEqual(bucket.take(1), 0)
+        self.assertEqual(bucket.take(1), 0.5)
+        # A refused take costs nothing
+        self.assertEqual(bucket.take(2), 1.0)
+
+    def test_refill_up_to_burst(self):
+        bucket = TokenBucket(rate=2, burst=4)
+        bucket.take(4)
+        self.now += 1
+        self.assertEqual(bucket.take(2), 0)
+        self.assertGreater(bucket.take(1), 0)
+        self.now += 60
+        self.assertEqual(bucket.take(4), 0)
+        self.assertGreater(bucket.take(1), 0)
+
+    def test_no_refill(self):
+        bucket = TokenBucket(rate=0, burst=1)
+        self.assertEqual(bucket.take(), 0)
+        self.assertEqual(bucket.take(), math.inf)
+
+
+class TestAdmissionController(ClockTestCase):
+    """Test AdmissionController."""
+
+    def test_admit_battle_by_queue_depth(self):
+        controller = AdmissionController(max_queue_depth=2)
+        self.assertIsNone(controller.admit_battle(1))
+        self.assertEqual(controller.admit_battle(2), QUEUE_FULL_RETRY_AFTER)
+        self.assertIsNone(AdmissionController(max_queue_depth=0).admit_battle(10 ** 6))
+
+    def test_admit_events_per_battle(self):
+        """Test each battle has its own bucket, and waits are rounded up."""
+        controller = AdmissionController(event_rate=2, event_burst=4)
+        self.assertIsNone(controller.admit_events("b1", 4))
+        self.assertEqual(controller.admit_events("b1", 3), 2)
+        self.assertEqual(controller.admit_events("b1", 1), 1)
+        self.assertIsNone(controller.admit_events("b2", 4))
+
+    def test_oversized_batch_charges_burst(self):
+        """Test a batch larger than the burst is accepted once the bucket is full."""
+        controller = AdmissionController(event_rate=2, event_burst=4)
+        self.assertIsNone(controller.admit_events("b1", 10))
+        self.assertIsNotNone(controller.admit_events("b1", 10))
+        self.now += 2
+        self.assertIsNone(controller.admit_events("b1", 10))
+
+    def test_forget_resets_bucket(self):
+        controller = AdmissionController(event_rate=2, event_burst=4)
+        controller.admit_events("b1", 4)
+        controller.forget("b1")
+        self.assertIsNone(controller.admit_events("b1", 4))
+        self.assertEqual(controller.limits()["rate_limited_battles"], 1)
+
+    def test_disabled_event_limit(self):
+        controller = AdmissionController(event_rate=0)
+        self.assertIsNone(controller.admit_events("b1", 10 ** 6))
+        self.assertEqual(controller.limits()["rate_limited_battles"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
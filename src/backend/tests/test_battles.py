@@ -0,0 +1,495 @@
+"""
+Tests for the AgentBeats backend battle routes.
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from backend.routes import battles
+from backend.services.admission import QUEUE_FULL_RETRY_AFTER, AdmissionController
+from backend.services.event_feed import EventFeed
+from backend.services import blob_store as blob_store_module
+from backend.services import leaderboard as leaderboard_module
+from backend.services.leaderboard import Leaderboard
+from backend.services.rating import RatingEngine
+from backend.tests import use_temp_storage
+
+
+class BattleTestCase(unittest.TestCase):
+    """Fresh storage, queue, ratings and leaderboard for each test."""
+
+    def setUp(self):
+        self.db = use_temp_storage(self, battles, leaderboard_module, blob_store_module)
+        self.engine = RatingEngine("elo")
+        self.leaderboard = Leaderboard()
+        self.websocket_manager = MagicMock()
+        for name, value in (
+            ("rating_engine", self.engine),
+            ("leaderboard", self.leaderboard),
+            ("websocket_manager", self.websocket_manager),
+            ("battle_queue", []),
+            ("agent_leases", {}),
+            ("event_feed", EventFeed()),
+        ):
+            patcher = patch.object(battles, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.db.create("agents", {
+            "agent_id": "green", "status": "locked", "ready": True,
+            "register_info": {"alias": "judge", "is_green": True},
+        })
+        self.db.create("agents", {
+            "agent_id": "red", "status": "locked", "ready": True,
+            "register_info": {"alias": "attacker", "is_green": False},
+        })
+
+    def create_battle(
+        self, battle_id: str, state: str = "running", green: str = "green", opponent: str = "red"
+    ):
+        self.db.create("battles", {
+            "battle_id": battle_id,
+            "green_agent_id": green,
+            "opponents": [{"name": "red_agent", "agent_id": opponent}],
+            "state": state,
+        })
+
+    def client(self) -> TestClient:
+        app = FastAPI()
+        app.include_router(battles.router)
+        return TestClient(app)
+
+
+class TestFinalizeBattle(BattleTestCase):
+    """Test finalize_battle() finishes a battle atomically."""
+
+    def test_result_is_applied_together(self):
+        """Test the battle, agents, history, events and ratings all take the result."""
+        self.create_battle("b1")
+        battle = battles.finalize_battle(
+            "b1",
+            {"state": "finished", "result": {"winner": "red_agent"}},
+            winner="red_agent",
+            events=[{"message": "red wins"}],
+        )
+
+        self.assertEqual(battle["result"]["winner_agent_id"], "red")
+        self.assertEqual(self.db.read("battles", "b1")["state"], "finished")
+        for agent_id in ("green", "red"):
+            agent = self.db.read("agents", agent_id)
+            self.assertEqual(agent["status"], "unlocked")
+            self.assertFalse(agent["ready"])
+            self.assertEqual(agent["elo"]["stats"]["total_battles"], 1)
+        red = self.db.read("agents", "red")
+        self.assertEqual(red["elo"]["stats"]["wins"], 1)
+        self.assertEqual(red["elo"]["rating"], round(self.engine.rating("red"), 1))
+        self.assertGreater(self.engine.rating("red"), battles.DEFAULT_RATING)
+        events = self.db.list_battle_events("b1")
+        self.assertEqual([event["message"] for event in events], ["red wins"])
+        _, page = self.leaderboard.page()
+        self.assertEqual(page["entries"][0]["agent_id"], "red")
+
+    def test_failure_rolls_everything_back(self):
+        """Test a failing write leaves no partial result behind."""
+        self.create_battle("b1")
+        with patch.object(self.db, "add_battle_history_many", side_effect=RuntimeError("boom")):
+            with self.assertRaises(RuntimeError):
+                battles.finalize_battle(
+                    "b1",
+                    {"state": "finished", "result": {"winner": "red_agent"}},
+                    winner="red_agent",
+                    events=[{"message": "red wins"}],
+                )
+
+        self.assertEqual(self.db.read("battles", "b1")["state"], "running")
+        for agent_id in ("green", "red"):
+            agent = self.db.read("agents", agent_id)
+            self.assertEqual(agent["status"], "locked")
+            self.assertNotIn("elo", agent)
+        self.assertEqual(self.db.list_battle_events("b1"), [])
+        self.assertEqual(self.engine.rating("red"), battles.DEFAULT_RATING)
+        self.assertEqual(self.leaderboard.page()[1]["total"], 0)
+        self.websocket_manager.publish_agent_status.assert_not_called()
+
+    def test_finished_battle_is_left_alone(self):
+        """Test a second result for a finished battle changes nothing."""
+        self.create_battle("b1", state="finished")
+        self.assertIsNone(battles.finalize_battle("b1", {"state": "error"}))
+        self.assertEqual(self.db.read("battles", "b1")["state"], "finished")
+
+    def test_queued_battle_leaves_the_queue(self):
+        """Test a battle finished while queued is dequeued and never run."""
+        self.create_battle("b1", state="queued")
+        self.create_battle("b2", state="queued")
+        for battle_id in ("b1", "b2"):
+            self.db.enqueue_battle(battle_id)
+            battles.queue_battle(battle_id)
+
+        battles.finalize_battle("b1", {"state": "error", "error": "cancelled"})
+
+        self.assertEqual(self.db.list_battle_queue(), ["b2"])
+        self.assertEqual(battles.battle_queue, ["b2"])
+
+    def test_queued_battle_stays_queued_on_rollback(self):
+        """Test a failed finalize keeps the battle in both queues."""
+        self.create_battle("b1", state="queued")
+        self.db.enqueue_battle("b1")
+        battles.queue_battle("b1")
+
+        with patch.object(self.db, "add_battle_history_many", side_effect=RuntimeError("boom")):
+            with self.assertRaises(RuntimeError):
+                battles.finalize_battle("b1", {"state": "error", "error": "cancelled"})
+
+        self.assertEqual(self.db.list_battle_queue(), ["b1"])
+        self.assertEqual(battles.battle_queue, ["b1"])
+
+    def test_processor_skips_finished_battle(self):
+        """Test a dequeued battle that is no longer queued is not run again."""
+        self.create_battle("b1", state="finished")
+        asyncio.run(battles.process_battle("b1"))
+        self.assertEqual(self.db.read("battles", "b1")["state"], "finished")
+
+
+class TestPrewarm(BattleTestCase):
+    """Test pre-warming the agents of the next queued battle."""
+
+    def setUp(self):
+        super().setUp()
+        # Free agents with a launcher
+        for agent_id in ("green", "red", "green2", "red2"):
+            self.db.delete("agents", agent_id)
+            self.db.create("agents", {
+                "agent_id": agent_id, "status": "unlocked", "ready": True,
+                "register_info": {
+                    "alias": agent_id,
+                    "is_green": agent_id.startswith("green"),
+                    "launcher_url": f"http://launcher/{agent_id}",
+                    "agent_url": f"http://agent/{agent_id}",
+                },
+            })
+        self.a2a_client = MagicMock()
+        self.a2a_client.reset_agent_trigger = AsyncMock(return_value=True)
+        patcher = patch.object(battles, "a2a_client", self.a2a_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def queue(self, battle_id, green="green", opponent="red"):
+        self.create_battle(battle_id, state="queued", green=green, opponent=opponent)
+        self.db.enqueue_battle(battle_id)
+        battles.queue_battle(battle_id)
+
+    def prewarm(self, active_battle_id=None):
+        asyncio.run(battles.prewarm_queued_battles(active_battle_id))
+
+    def reset_agents(self):
+        return [call.kwargs["agent_id"] for call in self.a2a_client.reset_agent_trigger.call_args_list]
+
+    def test_head_is_prewarmed_and_claimed(self):
+        """Test the agents of the queue head are reset once and claimed by it."""
+        self.queue("b1")
+        self.prewarm()
+        self.prewarm()
+
+        self.assertEqual(self.reset_agents(), ["green", "red"])
+        self.assertFalse(self.db.read("agents", "red")["ready"])
+        self.assertEqual(battles.claim_prewarmed_agents("b1", ["green", "red"]), ["green", "red"])
+        self.assertEqual(battles.agent_leases, {})
+
+    def test_only_head_is_prewarmed(self):
+        """Test battles behind the queue head are left alone."""
+        self.queue("b1")
+        self.queue("b2", green="green2", opponent="red2")
+        self.prewarm()
+        self.assertEqual(self.reset_agents(), ["green", "red"])
+        self.assertTrue(self.db.read("agents", "red2")["ready"])
+
+    def test_busy_agents_are_not_prewarmed(self):
+        """Test the head is not pre-warmed while the active battle needs its agents."""
+        self.create_battle("active", state="running", green="green2", opponent="red")
+        self.queue("b1")
+        self.prewarm(active_battle_id="active")
+        self.assertEqual(self.reset_agents(), [])
+        self.assertEqual(battles.agent_leases, {})
+
+    def test_expired_lease_is_not_claimed(self):
+        """Test an agent whose lease expired is reset again by its battle."""
+        self.queue("b1")
+        self.prewarm()
+        for lease in battles.agent_leases.values():
+            lease["expires_at"] = time.time() - 1
+
+        self.assertEqual(battles.claim_prewarmed_agents("b1", ["green", "red"]), [])
+        self.assertEqual(battles.agent_leases, {})
+
+    def test_expired_leases_are_dropped(self):
+        """Test the look-ahead drops expired leases of battles no longer queued."""
+        battles.agent_leases["red2"] = {"battle_id": "gone", "expires_at": time.time() - 1, "reset": True}
+        self.prewarm()
+        self.assertEqual(battles.agent_leases, {})
+
+    def test_claim_by_other_battle(self):
+        """Test agents warmed up for one battle are not claimed by another."""
+        self.queue("b1")
+        self.prewarm()
+        self.assertEqual(battles.claim_prewarmed_agents("b2", ["green", "red"]), [])
+        # Released all the same, b2 resets them for itself
+        self.assertEqual(battles.agent_leases, {})
+
+    def test_dequeued_while_prewarming(self):
+        """Test resets stop once the battle claimed its agents mid-way."""
+        self.queue("b1")
+
+        async def reset(*args, **kwargs):
+            # Dequeued while its first agent resets
+            battles.claim_prewarmed_agents("b1", ["green", "red"])
+            return True
+        self.a2a_client.reset_agent_trigger.side_effect = reset
+
+        self.prewarm()
+        self.assertEqual(self.reset_agents(), ["green"])
+        self.assertEqual(battles.agent_leases, {})
+
+    def test_failed_reset_releases_leases(self):
+        """Test a launcher refusing the reset gives up pre-warming the battle."""
+        self.queue("b1")
+        self.a2a_client.reset_agent_trigger.return_value = False
+        self.prewarm()
+        self.assertEqual(self.reset_agents(), ["green"])
+        self.assertEqual(battles.agent_leases, {})
+
+
+class TestEventIngestion(BattleTestCase):
+    """Test POST /battles/{battle_id}/events:batch."""
+
+    def setUp(self):
+        super().setUp()
+        self.create_battle("b1")
+        self.api = self.client()
+
+    def post(self, events):
+        response = self.api.post("/battles/b1/events:batch", json=events)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_batch_gets_seq_numbers(self):
+        body = self.post([{"is_result": False, "message": str(i)} for i in range(3)])
+        self.assertEqual(body, {
+            "battle_id": "b1", "accepted": 3, "duplicates": 0, "first_seq": 1, "last_seq": 3,
+        })
+        body = self.post([{"is_result": False, "message": "3"}])
+        self.assertEqual((body["first_seq"], body["last_seq"]), (4, 4))
+        self.websocket_manager.publish_battle.assert_called()
+
+    def test_replayed_batch_counts_duplicates(self):
+        """Test sending the same batch twice stores it once."""
+        events = [
+            {"is_result": False, "message": str(i), "idempotency_key": f"k{i}"}
+            for i in range(3)
+        ]
+        self.post(events)
+        self.websocket_manager.publish_battle.reset_mock()
+
+        body = self.post(events)
+        self.assertEqual(body, {
+            "battle_id": "b1", "accepted": 0, "duplicates": 3, "first_seq": None, "last_seq": None,
+        })
+        self.websocket_manager.publish_battle.assert_not_called()
+
+        body = self.post(events[1:] + [{"is_result": False, "message": "3", "idempotency_key": "k3"}])
+        self.assertEqual((body["accepted"], body["duplicates"], body["first_seq"]), (1, 2, 4))
+        self.assertEqual(len(self.db.list_battle_events("b1")), 4)
+
+    def test_replayed_result(self):
+        """Test a result uploaded twice finishes the battle once."""
+        events = [
+            {"is_result": False, "message": "log", "idempotency_key": "k1"},
+            {"is_result": True, "winner": "red_agent", "idempotency_key": "k2"},
+        ]
+        self.assertEqual(self.post(events)["accepted"], 2)
+        self.assertEqual(self.post(events)["duplicates"], 2)
+        self.assertEqual(self.db.read("agents", "red")["elo"]["stats"]["total_battles"], 1)
+
+    def test_large_payload_offloaded(self):
+        """Test a large field is stored as a blob once, and inlined by GET /battles/{id}."""
+        output = "x" * (blob_store_module.blob_store.threshold + 1)
+        event = {"is_result": False, "terminal_output": output, "idempotency_key": "k1"}
+        self.post([event])
+        self.post([event])
+
+        stored, = self.db.list_battle_events("b1")
+        ref = stored["blobs"]["terminal_output"]
+        self.assertNotIn("terminal_output", stored)
+        self.assertEqual(self.db.read_blob(ref["hash"]), output.encode())
+
+        battle = self.api.get("/battles/b1").json()
+        self.assertEqual(battle["interact_history"][0]["terminal_output"], output)
+        battle = self.api.get("/battles/b1", params={"inline_blobs": False}).json()
+        self.assertEqual(battle["interact_history"][0]["blobs"]["terminal_output"], ref)
+
+    def test_result_must_be_last(self):
+        response = self.api.post("/battles/b1/events:batch", json=[
+            {"is_result": True, "winner": "draw"},
+            {"is_result": False, "message": "late"},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.db.list_battle_events("b1"), [])
+
+    def test_missing_is_result(self):
+        response = self.api.post("/battles/b1/events:batch", json=[{"message": "log"}])
+        self.assertEqual(response.status_code, 400)
+
+
+class TestGetBattleEvents(BattleTestCase):
+    """Test the cursor and long polling of GET /battles/{battle_id}/events."""
+
+    def setUp(self):
+        super().setUp()
+        self.create_battle("b1")
+
+    def get_events(self, after=0, limit=100, wait=0.0, battle_id="b1"):
+        started = time.monotonic()
+        page = asyncio.run(battles.get_battle_events(
+            battle_id, after=after, limit=limit, wait=wait, inline_blobs=False
+        ))
+        return page, time.monotonic() - started
+
+    def test_cursor_pages_through_events(self):
+        self.db.append_battle_events("b1", [{"message": str(i)} for i in range(1, 6)])
+
+        page, _ = self.get_events(limit=2)
+        self.assertEqual([e["seq"] for e in page["events"]], [1, 2])
+        self.assertEqual((page["next"], page["has_more"]), (2, True))
+        page, _ = self.get_events(after=page["next"], limit=2)
+        self.assertEqual([e["seq"] for e in page["events"]], [3, 4])
+        page, _ = self.get_events(after=page["next"], limit=2)
+        self.assertEqual([e["seq"] for e in page["events"]], [5])
+        self.assertEqual((page["next"], page["has_more"]), (5, False))
+        page, _ = self.get_events(after=5)
+        self.assertEqual((page["events"], page["next"], page["state"]), ([], 5, "running"))
+
+    def test_long_poll_wakes_on_upload(self):
+        """Test a waiting request returns as soon as an upload stores new events."""
+        upload = threading.Timer(
+            0.1, battles.ingest_battle_events, ["b1", [{"is_result": False, "message": "new"}]]
+        )
+        upload.start()
+        page, elapsed = self.get_events(wait=10)
+        upload.join()
+
+        self.assertEqual([e["message"] for e in page["events"]], ["new"])
+        self.assertLess(elapsed, 5)
+        self.assertEqual(battles.event_feed.waiting(), 0)
+
+    def test_long_poll_wakes_on_result(self):
+        finish = threading.Timer(
+            0.1, battles.ingest_battle_events, ["b1", [{"is_result": True, "winner": "draw"}]]
+        )
+        finish.start()
+        page, elapsed = self.get_events(wait=10)
+        finish.join()
+
+        self.assertEqual(page["state"], "finished")
+        self.assertTrue(page["events"][-1]["is_result"])
+        self.assertLess(elapsed, 5)
+
+    def test_long_poll_times_out(self):
+        page, elapsed = self.get_events(wait=0.2)
+        self.assertEqual((page["events"], page["next"]), ([], 0))
+        self.assertGreaterEqual(elapsed, 0.2)
+        self.assertEqual(battles.event_feed.waiting(), 0)
+
+    def test_no_wait_when_events_or_battle_over(self):
+        self.db.append_battle_events("b1", [{"message": "old"}])
+        _, elapsed = self.get_events(wait=10)
+        self.assertLess(elapsed, 5)
+
+        self.create_battle("b2", state="finished")
+        page, elapsed = self.get_events(wait=10, battle_id="b2")
+        self.assertEqual(page["events"], [])
+        self.assertLess(elapsed, 5)
+
+    def test_missing_battle(self):
+        with self.assertRaises(HTTPException) as raised:
+            self.get_events(battle_id="missing")
+        self.assertEqual(raised.exception.status_code, 404)
+
+
+class TestAdmission(BattleTestCase):
+    """Test battles and events are turned away past the admission limits."""
+
+    def setUp(self):
+        super().setUp()
+        self.admission = AdmissionController(max_queue_depth=2, event_rate=1, event_burst=3)
+        for name, value in (
+            ("admission", self.admission),
+            ("start_battle_processor", MagicMock()),
+        ):
+            patcher = patch.object(battles, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.db.update_many("agents", {
+            "green": {
+                "status": "unlocked",
+                "register_info": {
+                    "alias": "judge", "is_green": True,
+                    "participant_requirements": [{"name": "red_agent", "required": True}],
+                },
+            },
+            "red": {"status": "unlocked"},
+        })
+        self.request = {
+            "green_agent_id": "green",
+            "opponents": [{"name": "red_agent", "agent_id": "red"}],
+        }
+
+    def test_battle_accepted_below_queue_depth(self):
+        battles.battle_queue.append("earlier")
+        response = self.client().post("/battles", json=self.request)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["queue_position"], 2)
+        self.assertEqual(self.db.list_battle_queue(), [response.json()["battle_id"]])
+        created, queue_position = self.websocket_manager.publish_battle_created.call_args[0]
+        self.assertEqual((created["battle_id"], queue_position), (response.json()["battle_id"], 2))
+
+    def test_full_queue_rejects_battle(self):
+        """Test a full queue answers 503 with Retry-After and creates nothing."""
+        battles.battle_queue.extend(["earlier", "later"])
+        response = self.client().post("/battles", json=self.request)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], str(QUEUE_FULL_RETRY_AFTER))
+        self.assertEqual(self.db.list("battles"), [])
+        self.assertEqual(self.db.list_battle_queue(), [])
+
+    def test_event_flood_is_rate_limited(self):
+        """Test events past the battle's burst get 429 with Retry-After and are not stored."""
+        self.create_battle("b1")
+        client = self.client()
+        logs = [{"is_result": False, "message": str(i)} for i in range(3)]
+        self.assertEqual(client.post("/battles/b1/events:batch", json=logs).status_code, 200)
+
+        response = client.post("/battles/b1/events:batch", json=logs[:1])
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], "1")
+        response = client.post("/battles/b1", json={"is_result": False, "message": "single"})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(len(self.db.list_battle_events("b1")), 3)
+
+    def test_result_gets_through_rate_limit(self):
+        """Test a result is stored even when the battle's bucket is empty."""
+        self.create_battle("b1")
+        self.admission.admit_events("b1", 3)
+        response = self.client().post(
+            "/battles/b1/events:batch", json=[{"is_result": True, "winner": "draw"}]
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.db.read("battles", "b1")["state"], "finished")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+Tests for the AgentBeats backend blob store and GET /blobs.
+"""
+
+import hashlib
+import json
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.routes import blobs
+from backend.services import blob_store as blob_store_module
+from backend.services.blob_store import BlobStore
+from backend.tests import use_temp_storage
+
+
+class TestBlobStore(unittest.TestCase):
+    """Test offloading large event fields to blobs and inlining them back."""
+
+    def setUp(self):
+        self.db = use_temp_storage(self, blob_store_module)
+        self.store = BlobStore(threshold=10)
+
+    def test_large_fields_are_offloaded(self):
+        output = "x" * 20
+        event = self.store.offload({
+            "message": "m" * 20,
+            "terminal_output": output,
+            "markdown_content": "short",
+            "detail": {"lines": ["y" * 20]},
+        })
+
+        self.assertEqual(event["message"], "m" * 20)
+        self.assertEqual(event["markdown_content"], "short")
+        self.assertNotIn("terminal_output", event)
+        self.assertNotIn("detail", event)
+        self.assertEqual(event["blobs"]["terminal_output"], {
+            "hash": hashlib.sha256(output.encode()).hexdigest(),
+            "size": 20,
+            "content_type": "text/plain; charset=utf-8",
+        })
+        self.assertEqual(event["blobs"]["detail"]["content_type"], "application/json")
+        self.assertEqual(self.db.read_blob(event["blobs"]["terminal_output"]["hash"]), output.encode())
+
+    def test_text_detail_is_stored_as_text(self):
+        event = self.store.offload({"detail": "z" * 20})
+        self.assertEqual(event["blobs"]["detail"]["content_type"], "text/plain; charset=utf-8")
+
+    def test_same_payload_stored_once(self):
+        first = self.store.offload({"terminal_output": "x" * 20})
+        second = self.store.offload({"terminal_output": "x" * 20})
+        self.assertEqual(first["blobs"], second["blobs"])
+        with self.db._connect() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0], 1)
+
+    def test_inline_restores_fields(self):
+        original = {"message": "m", "terminal_output": "x" * 20, "detail": {"lines": ["y" * 20]}}
+        event = self.store.offload(dict(original))
+        self.assertEqual(self.store.inline(event), original)
+        # The stored event is left as it was
+        self.assertIn("blobs", event)
+
+    def test_inline_keeps_missing_references(self):
+        event = self.store.offload({"terminal_output": "x" * 20, "markdown_content": "y" * 20})
+        with self.db._connect() as conn:
+            conn.execute("DELETE FROM blobs WHERE hash = ?", (event["blobs"]["terminal_output"]["hash"],))
+        inlined = self.store.inline(event)
+        self.assertEqual(inlined["markdown_content"], "y" * 20)
+        self.assertEqual(list(inlined["blobs"]), ["terminal_output"])
+
+    def test_zero_threshold_disables_offload(self):
+        event = BlobStore(threshold=0).offload({"terminal_output": "x" * 20})
+        self.assertEqual(event, {"terminal_output": "x" * 20})
+
+
+class TestBlobRoute(unittest.TestCase):
+    """Test GET /blobs/{hash} and its byte ranges."""
+
+    def setUp(self):
+        use_temp_storage(self, blob_store_module)
+        self.data = b"0123456789"
+        self.hash = blob_store_module.blob_store.put(self.data, "text/plain; charset=utf-8")["hash"]
+        app = FastAPI()
+        app.include_router(blobs.router)
+        self.client = TestClient(app)
+
+    def get(self, range_header=None):
+        headers = {"Range": range_header} if range_header else {}
+        return self.client.get(f"/blobs/{self.hash}", headers=headers)
+
+    def test_whole_blob(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.data)
+        self.assertEqual(response.headers["content-type"], "text/plain; charset=utf-8")
+        self.assertEqual(response.headers["accept-ranges"], "bytes")
+        self.assertEqual(response.headers["etag"], f'"{self.hash}"')
+        self.assertIn("immutable", response.headers["cache-control"])
+
+    def test_ranges(self):
+        for range_header, content, content_range in (
+            ("bytes=2-5", b"2345", "bytes 2-5/10"),
+            ("bytes=7-", b"789", "bytes 7-9/10"),
+            ("bytes=-3", b"789", "bytes 7-9/10"),
+            ("bytes=8-100", b"89", "bytes 8-9/10"),
+            ("bytes=-100", self.data, "bytes 0-9/10"),
+        ):
+            with self.subTest(range_header):
+                response = self.get(range_header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response.content, content)
+                self.assertEqual(response.headers["content-range"], content_range)
+
+    def test_unsatisfiable_range(self):
+        for range_header in ("bytes=10-", "bytes=6-2"):
+            with self.subTest(range_header):
+                response = self.get(range_header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response.headers["content-range"], "bytes */10")
+
+    def test_unsupported_range_serves_whole_blob(self):
+        for range_header in ("bytes=0-1,4-5", "items=0-1", "bytes=-"):
+            with self.subTest(range_header):
+                response = self.get(range_header)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, self.data)
+
+    def test_missing_blob(self):
+        response = self.client.get("/blobs/" + "0" * 64)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(json.loads(response.content)["detail"], f"Blob {'0' * 64} not found")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Tests for the AgentBeats backend event feed.
+"""
+
+import asyncio
+import threading
+import unittest
+
+from backend.services.event_feed import EventFeed
+
+
+class TestEventFeed(unittest.TestCase):
+    """Test EventFeed wakes the waiters of a battle."""
+
+    def setUp(self):
+        self.feed = EventFeed()
+
+    def test_notify_from_thread_wakes_waiter(self):
+        async def run():
+            with self.feed.subscribe("b1") as news:
+                threading.Timer(0.05, self.feed.notify, ["b1"]).start()
+                await asyncio.wait_for(news, 5)
+            return self.feed.waiting()
+
+        self.assertEqual(asyncio.run(run()), 0)
+
+    def test_other_battle_does_not_wake(self):
+        async def run():
+            with self.feed.subscribe("b1") as news:
+                self.feed.notify("b2")
+                await asyncio.sleep(0.05)
+                return news.done(), self.feed.waiting()
+
+        self.assertEqual(asyncio.run(run()), (False, 1))
+
+    def test_notify_wakes_every_waiter_once(self):
+        """Test all waiters of a battle wake, and later subscriptions wait again."""
+        async def run():
+            with self.feed.subscribe("b1") as first, self.feed.subscribe("b1") as second:
+                self.feed.notify("b1")
+                await asyncio.wait_for(asyncio.gather(first, second), 5)
+            with self.feed.subscribe("b1") as third:
+                await asyncio.sleep(0.05)
+                return third.done()
+
+        self.assertFalse(asyncio.run(run()))
+
+    def test_unsubscribed_on_exit(self):
+        async def run():
+            with self.assertRaises(RuntimeError):
+                with self.feed.subscribe("b1"):
+                    raise RuntimeError("boom")
+            return self.feed.waiting()
+
+        self.assertEqual(asyncio.run(run()), 0)
+
+    def test_closed_loop_is_ignored(self):
+        """Test notifying a waiter whose loop is gone doesn't raise."""
+        async def leave_waiting():
+            subscription = self.feed.subscribe("b1")
+            subscription.__enter__()
+
+        asyncio.run(leave_waiting())
+        self.feed.notify("b1")
+        self.assertEqual(self.feed.waiting(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+"""
+Tests for the AgentBeats backend leaderboard.
+"""
+
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.routes import leaderboard as leaderboard_routes
+from backend.services import leaderboard as leaderboard_module
+from backend.services.leaderboard import Leaderboard
+from backend.tests import use_temp_storage
+
+
+def make_agent(agent_id, rating=1000.0, wins=0, total=0, is_green=False):
+    return {
+        "agent_id": agent_id,
+        "register_info": {"alias": agent_id, "is_green": is_green},
+        "elo": {
+            "rating": rating,
+            "stats": {"wins": wins, "losses": total - wins, "total_battles": total},
+        },
+    }
+
+
+class LeaderboardTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.db = use_temp_storage(self, leaderboard_module)
+        self.leaderboard = Leaderboard()
+
+    def update(self, agent):
+        with self.db.transaction():
+            self.leaderboard.update(agent)
+
+    def ids(self, **kwargs):
+        _, page = self.leaderboard.page(**kwargs)
+        return [entry["agent_id"] for entry in page["entries"]]
+
+
+class TestLeaderboard(LeaderboardTestCase):
+    """Test ranking, pagination and applying committed updates."""
+
+    def setUp(self):
+        super().setUp()
+        self.update(make_agent("high", rating=1200, wins=1, total=4))
+        self.update(make_agent("mid", rating=1100, wins=3, total=4))
+        self.update(make_agent("low", rating=900, wins=2, total=4))
+        self.update(make_agent("judge", rating=None, wins=4, total=4, is_green=True))
+
+    def test_sorted_by_rating_unrated_last(self):
+        self.assertEqual(self.ids(), ["high", "mid", "low", "judge"])
+
+    def test_sorted_by_win_rate(self):
+        self.assertEqual(self.ids(sort="win_rate"), ["judge", "mid", "low", "high"])
+
+    def test_pagination(self):
+        """Test pages carry their ranks and the total."""
+        _, page = self.leaderboard.page(limit=2, offset=1)
+        self.assertEqual(page["total"], 4)
+        self.assertEqual(
+            [(entry["rank"], entry["agent_id"]) for entry in page["entries"]],
+            [(2, "mid"), (3, "low")],
+        )
+        self.assertEqual(self.ids(limit=2, offset=4), [])
+
+    def test_update_moves_entry(self):
+        version = self.leaderboard.version
+        self.update(make_agent("low", rating=1300, wins=2, total=4))
+        self.assertEqual(self.ids(), ["low", "high", "mid", "judge"])
+        self.assertEqual(self.leaderboard.version, version + 1)
+
+    def test_unchanged_update_keeps_version(self):
+        version = self.leaderboard.version
+        self.update(make_agent("low", rating=900, wins=2, total=4))
+        self.assertEqual(self.leaderboard.version, version)
+
+    def test_remove(self):
+        with self.db.transaction():
+            self.leaderboard.remove("mid")
+        self.assertEqual(self.ids(), ["high", "low", "judge"])
+        self.assertEqual(self.db.read_leaderboard_entry("mid"), None)
+
+    def test_rolled_back_update_is_not_applied(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.leaderboard.update(make_agent("low", rating=1300))
+                raise RuntimeError("boom")
+        self.assertEqual(self.ids(), ["high", "mid", "low", "judge"])
+
+    def test_out_of_order_callbacks_keep_latest(self):
+        """Test callbacks of two commits, run in reverse order, leave the later entry."""
+        callbacks = []
+        with patch.object(self.db, "after_commit", callbacks.append):
+            self.update(make_agent("low", rating=1300))
+            self.update(make_agent("low", rating=1250))
+            with self.db.transaction():
+                self.leaderboard.remove("mid")
+            with self.db.transaction():
+                self.leaderboard.update(make_agent("mid", rating=800))
+        for callback in reversed(callbacks):
+            callback()
+
+        _, page = self.leaderboard.page()
+        self.assertEqual(
+            [(entry["agent_id"], entry["rating"]) for entry in page["entries"]],
+            [("low", 1250), ("high", 1200), ("mid", 800), ("judge", None)],
+        )
+
+    def test_load_builds_entries_from_agents(self):
+        """Test the first load fills the leaderboard table from the agents."""
+        db = use_temp_storage(self, leaderboard_module)
+        db.create("agents", make_agent("a", rating=1100))
+        db.create("agents", make_agent("b", rating=1200))
+        leaderboard = Leaderboard()
+        leaderboard.load()
+        _, page = leaderboard.page()
+        self.assertEqual([entry["agent_id"] for entry in page["entries"]], ["b", "a"])
+        self.assertEqual(len(db.list_leaderboard_entries()), 2)
+
+
+class TestLeaderboardRoute(LeaderboardTestCase):
+    """Test GET /leaderboard and its ETag."""
+
+    def setUp(self):
+        super().setUp()
+        patcher = patch.object(leaderboard_routes, "leaderboard", self.leaderboard)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        app = FastAPI()
+        app.include_router(leaderboard_routes.router)
+        self.client = TestClient(app)
+        self.update(make_agent("a", rating=1100))
+        self.update(make_agent("b", rating=1200))
+
+    def test_page(self):
+        response = self.client.get("/leaderboard", params={"limit": 1, "offset": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["etag"], self.leaderboard.etag)
+        body = response.json()
+        self.assertEqual(body["total"], 2)
+        self.assertEqual([entry["agent_id"] for entry in body["entries"]], ["a"])
+
+    def test_not_modified(self):
+        etag = self.client.get("/leaderboard").headers["etag"]
+        response = self.client.get("/leaderboard", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["etag"], etag)
+        self.assertEqual(response.content, b"")
+
+    def test_update_changes_etag(self):
+        etag = self.client.get("/leaderboard").headers["etag"]
+        self.update(make_agent("a", rating=1300))
+        response = self.client.get("/leaderboard", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["etag"], etag)
+        self.assertEqual(response.json()["entries"][0]["agent_id"], "a")
+
+    def test_invalid_sort(self):
+        self.assertEqual(self.client.get("/leaderboard", params={"sort": "name"}).status_code, 422)
+
+
+if __name__ == "__main__":
+    unittest.main()
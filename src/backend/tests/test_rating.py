@@ -0,0 +1,202 @@
+"""
+Tests for the AgentBeats backend rating engine.
+"""
+
+import random
+import time
+import unittest
+
+import numpy as np
+
+from backend.services.rating import (
+    DEFAULT_RATING,
+    ELO_MIN_BATCH_WIDTH,
+    GLICKO2_DEFAULT_RD,
+    RatingEngine,
+    RatingHistory,
+    _elo_levels,
+    _elo_sequential,
+    battle_games,
+    elo_ratings,
+)
+
+PERIOD = 3600.0
+
+
+def random_results(count, n_agents=50, start=0.0, spacing=60.0, seed=0):
+    """Random (timestamp, games) battles of one green agent and two opponents."""
+    rng = random.Random(seed)
+    agents = [f"agent{i}" for i in range(n_agents)]
+    greens = ["green0", "green1"]
+    results = []
+    for i in range(count):
+        green = rng.choice(greens)
+        opponents = rng.sample(agents, 2)
+        winner = rng.choice(opponents + [green, "draw"])
+        results.append((start + i * spacing, battle_games(green, opponents, winner)))
+    return results
+
+
+def reference_elo(results, k_factor=32.0):
+    """Plain sequential Elo over the games of results."""
+    ratings = {}
+    for _, games in results:
+        for x, y, score in games:
+            rx, ry = ratings.get(x, DEFAULT_RATING), ratings.get(y, DEFAULT_RATING)
+            delta = k_factor * (score - 1.0 / (1.0 + 10.0 ** ((ry - rx) / 400.0)))
+            ratings[x], ratings[y] = rx + delta, ry - delta
+    return ratings
+
+
+class TestBattleGames(unittest.TestCase):
+    """Test battle_games()."""
+
+    def test_winner_beats_every_other_participant(self):
+        self.assertEqual(
+            battle_games("g", ["a", "b"], "a"),
+            [("a", "g", 1.0), ("a", "b", 1.0)],
+        )
+
+    def test_draw_pairs_everyone(self):
+        self.assertEqual(
+            battle_games("g", ["a", "b"], "draw"),
+            [("g", "a", 0.5), ("g", "b", 0.5), ("a", "b", 0.5)],
+        )
+
+    def test_unknown_winner_has_no_games(self):
+        self.assertEqual(battle_games("g", ["a"], None), [])
+        self.assertEqual(battle_games("g", ["a"], "stranger"), [])
+
+
+class TestElo(unittest.TestCase):
+    """Test batched and incremental Elo."""
+
+    def test_batched_matches_sequential(self):
+        """Test applying games in conflict-free batches gives sequential Elo."""
+        history = RatingHistory()
+        # Many opponents and green agents, so batches are wide enough
+        rng = random.Random(1)
+        agents = [f"agent{i}" for i in range(400)]
+        history.extend(
+            (i, [(a, b, rng.choice((0.0, 0.5, 1.0)))])
+            for i, (a, b) in enumerate(rng.sample(agents, 2) for _ in range(5000))
+        )
+        levels = _elo_levels(history.a, history.b, len(history.agent_ids))
+        self.assertGreaterEqual(history.size, ELO_MIN_BATCH_WIDTH * (levels.max() + 1))
+
+        batched = elo_ratings(history)
+        sequential = np.full(len(history.agent_ids), DEFAULT_RATING)
+        _elo_sequential(
+            sequential, history.a, history.b,
+            history.score.astype(np.float64), 32.0,
+        )
+        np.testing.assert_allclose(batched, sequential, rtol=0, atol=1e-9)
+
+    def test_recompute_matches_reference(self):
+        results = random_results(2000)
+        engine = RatingEngine("elo")
+        engine.load(results)
+        for agent_id, rating in reference_elo(results).items():
+            self.assertAlmostEqual(engine.rating(agent_id), rating, places=6)
+
+    def test_incremental_matches_recompute(self):
+        """Test recording results one by one gives the ratings of a recompute."""
+        results = random_results(300)
+        engine = RatingEngine("elo")
+        for timestamp, games in results:
+            engine.record(timestamp, games)
+        recomputed = RatingEngine("elo")
+        recomputed.load(results)
+        for agent_id, entry in recomputed.ratings().items():
+            self.assertAlmostEqual(engine.rating(agent_id), entry["rating"], places=6)
+
+    def test_unrated_agent_has_default_rating(self):
+        engine = RatingEngine("elo")
+        self.assertEqual(engine.rating("nobody"), DEFAULT_RATING)
+        self.assertIsNone(engine.deviation("nobody"))
+
+
+class TestGlicko2(unittest.TestCase):
+    """Test incremental Glicko-2 against full recomputes."""
+
+    def assert_same_ratings(self, engine, expected):
+        for agent_id, entry in expected.ratings().items():
+            self.assertAlmostEqual(engine.rating(agent_id), entry["rating"], places=6)
+            self.assertAlmostEqual(
+                engine.deviation(agent_id), entry["rating_deviation"], places=6
+            )
+
+    def test_incremental_matches_recompute(self):
+        """Test every record, in the open period or a later one, matches a recompute."""
+        # Several games per period, with empty periods in between
+        results = random_results(120, spacing=PERIOD / 7)
+        results += random_results(30, start=results[-1][0] + 5 * PERIOD, spacing=PERIOD / 3, seed=1)
+        engine = RatingEngine("glicko2", period_seconds=PERIOD)
+        for count, (timestamp, games) in enumerate(results, start=1):
+            engine.record(timestamp, games)
+            if count % 10 == 0:
+                recomputed = RatingEngine("glicko2", period_seconds=PERIOD)
+                recomputed.load(results[:count])
+                self.assert_same_ratings(engine, recomputed)
+
+    def test_record_after_load_continues_open_period(self):
+        """Test recording after a recompute keeps the last period open."""
+        results = random_results(50, spacing=PERIOD / 4)
+        engine = RatingEngine("glicko2", period_seconds=PERIOD)
+        engine.load(results[:45])
+        for timestamp, games in results[45:]:
+            engine.record(timestamp, games)
+        recomputed = RatingEngine("glicko2", period_seconds=PERIOD)
+        recomputed.load(results)
+        self.assert_same_ratings(engine, recomputed)
+
+    def test_new_agent_has_default_deviation(self):
+        engine = RatingEngine("glicko2")
+        self.assertEqual(engine.rating("nobody"), DEFAULT_RATING)
+        self.assertEqual(engine.deviation("nobody"), GLICKO2_DEFAULT_RD)
+
+
+class TestPreview(unittest.TestCase):
+    """Test preview() gives what record() then stores, without storing it."""
+
+    def check_preview(self, system, timestamp):
+        engine = RatingEngine(system, period_seconds=PERIOD)
+        engine.load(random_results(40, spacing=PERIOD / 4))
+        games = battle_games("green0", ["agent1", "newcomer"], "newcomer")
+        before = engine.ratings()
+
+        preview = engine.preview(timestamp, games)
+        self.assertEqual(engine.ratings(), before)
+
+        engine.record(timestamp, games)
+        self.assertEqual(sorted(preview), ["agent1", "green0", "newcomer"])
+        for agent_id, entry in preview.items():
+            self.assertEqual(entry["rating"], engine.rating(agent_id))
+            if system == "glicko2":
+                self.assertEqual(entry["rating_deviation"], engine.deviation(agent_id))
+
+    def test_elo(self):
+        self.check_preview("elo", 40 * PERIOD)
+
+    def test_glicko2_open_period(self):
+        self.check_preview("glicko2", 39 * PERIOD / 4)
+
+    def test_glicko2_later_period(self):
+        self.check_preview("glicko2", 20 * PERIOD)
+
+
+class TestRecomputeSpeed(unittest.TestCase):
+    """Test rebuilding ratings over a large history stays fast."""
+
+    def test_100k_battles_under_a_second(self):
+        results = random_results(100_000, n_agents=200)
+        for system in ("elo", "glicko2"):
+            engine = RatingEngine(system)
+            started = time.perf_counter()
+            engine.load(results)
+            elapsed = time.perf_counter() - started
+            self.assertLess(elapsed, 1.0, f"{system} recompute took {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,214 @@
+"""
+Tests for the AgentBeats backend SQLite storage.
+"""
+
+import threading
+import time
+import unittest
+
+from backend.tests import use_temp_storage
+
+
+class TestTransactions(unittest.TestCase):
+    """Test transaction() and after_commit()."""
+
+    def setUp(self):
+        self.db = use_temp_storage(self)
+        self.db.create("agents", {"agent_id": "a1", "status": "unlocked"})
+
+    def test_commit_applies_writes_together(self):
+        """Test writes of a transaction are invisible to other threads until it commits."""
+        seen = []
+        written = threading.Event()
+        checked = threading.Event()
+
+        def read_outside():
+            written.wait()
+            seen.append(self.db.read("agents", "a1")["status"])
+            checked.set()
+
+        reader = threading.Thread(target=read_outside)
+        reader.start()
+        with self.db.transaction():
+            self.db.update("agents", "a1", {"status": "locked"})
+            written.set()
+            checked.wait(5)
+        reader.join()
+
+        self.assertEqual(seen, ["unlocked"])
+        self.assertEqual(self.db.read("agents", "a1")["status"], "locked")
+
+    def test_rollback_discards_writes_and_callbacks(self):
+        """Test an exception rolls every write back and drops after_commit callbacks."""
+        callbacks = []
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.update("agents", "a1", {"status": "locked"})
+                self.db.create("battles", {"battle_id": "b1"})
+                self.db.after_commit(lambda: callbacks.append("committed"))
+                raise RuntimeError("boom")
+
+        self.assertEqual(self.db.read("agents", "a1")["status"], "unlocked")
+        self.assertIsNone(self.db.read("battles", "b1"))
+        self.assertEqual(callbacks, [])
+
+    def test_after_commit_runs_once_committed(self):
+        """Test callbacks run in order after the commit, and see the committed data."""
+        callbacks = []
+        with self.db.transaction():
+            self.db.update("agents", "a1", {"status": "locked"})
+            self.db.after_commit(
+                lambda: callbacks.append(self.db.read("agents", "a1")["status"])
+            )
+            self.db.after_commit(lambda: callbacks.append("second"))
+            self.assertEqual(callbacks, [])
+        self.assertEqual(callbacks, ["locked", "second"])
+
+    def test_after_commit_outside_transaction_runs_now(self):
+        """Test a callback registered outside a transaction runs immediately."""
+        callbacks = []
+        self.db.after_commit(lambda: callbacks.append("now"))
+        self.assertEqual(callbacks, ["now"])
+
+    def test_nested_transaction_joins_outer(self):
+        """Test a nested transaction commits, or rolls back, with the outermost one."""
+        callbacks = []
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                with self.db.transaction():
+                    self.db.update("agents", "a1", {"status": "locked"})
+                    self.db.after_commit(lambda: callbacks.append("inner"))
+                self.assertEqual(callbacks, [])
+                raise RuntimeError("boom")
+
+        self.assertEqual(self.db.read("agents", "a1")["status"], "unlocked")
+        self.assertEqual(callbacks, [])
+
+    def test_transactions_serialize_writers(self):
+        """Test BEGIN IMMEDIATE makes a second transaction wait, then read the first one's writes."""
+        started = threading.Event()
+        seen = []
+
+        def second():
+            started.wait()
+            with self.db.transaction():
+                seen.append(self.db.read("agents", "a1")["status"])
+
+        thread = threading.Thread(target=second)
+        thread.start()
+        with self.db.transaction():
+            self.db.update("agents", "a1", {"status": "locked"})
+            started.set()
+            time.sleep(0.2)
+            self.db.update("agents", "a1", {"status": "locked again"})
+        thread.join()
+
+        self.assertEqual(seen, ["locked again"])
+
+
+class TestBatchedAccess(unittest.TestCase):
+    """Test read_many(), update_many() and the battle queue table."""
+
+    def setUp(self):
+        self.db = use_temp_storage(self)
+        # Several chunks per batch
+        self.db.MAX_BATCH_PARAMS = 2
+        for i in range(5):
+            self.db.create("agents", {"agent_id": f"a{i}", "ready": False})
+
+    def test_read_many_skips_missing(self):
+        """Test read_many returns found documents by id, across chunks."""
+        docs = self.db.read_many("agents", ["a4", "a0", "missing", "a0", "a2"])
+        self.assertEqual(sorted(docs), ["a0", "a2", "a4"])
+        self.assertEqual(docs["a4"]["agent_id"], "a4")
+
+    def test_update_many_merges(self):
+        """Test update_many merges partial updates and skips missing ids."""
+        docs = self.db.update_many("agents", {
+            "a1": {"ready": True},
+            "a3": {"status": "locked"},
+            "missing": {"ready": True},
+        })
+
+        self.assertEqual(sorted(docs), ["a1", "a3"])
+        self.assertEqual(self.db.read("agents", "a1"), {**docs["a1"], "ready": True})
+        self.assertEqual(self.db.read("agents", "a3")["status"], "locked")
+        self.assertFalse(self.db.read("agents", "a3")["ready"])
+        self.assertIsNone(self.db.read("agents", "missing"))
+
+    def test_update_many_rolls_back_with_transaction(self):
+        """Test update_many inside a failed transaction leaves no document changed."""
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.update_many("agents", {f"a{i}": {"ready": True} for i in range(5)})
+                raise RuntimeError("boom")
+        docs = self.db.read_many("agents", [f"a{i}" for i in range(5)])
+        self.assertFalse(any(doc["ready"] for doc in docs.values()))
+
+    def test_battle_queue_order(self):
+        """Test queued battles are listed in enqueue order, once each."""
+        for battle_id in ("b2", "b1", "b3", "b1"):
+            self.db.enqueue_battle(battle_id)
+        self.assertTrue(self.db.dequeue_battle("b1"))
+        self.assertFalse(self.db.dequeue_battle("b1"))
+        self.assertEqual(self.db.list_battle_queue(), ["b2", "b3"])
+
+
+class TestBattleEvents(unittest.TestCase):
+    """Test append_battle_events() and list_battle_events()."""
+
+    def setUp(self):
+        self.db = use_temp_storage(self)
+
+    def test_seq_numbers_are_consecutive_per_battle(self):
+        first = self.db.append_battle_events("b1", [{"message": "a"}, {"message": "b"}])
+        self.db.append_battle_events("b2", [{"message": "other"}])
+        second = self.db.append_battle_events("b1", [{"message": "c"}])
+
+        self.assertEqual([e["seq"] for e in first + second], [1, 2, 3])
+        self.assertEqual(
+            [(e["seq"], e["message"]) for e in self.db.list_battle_events("b1")],
+            [(1, "a"), (2, "b"), (3, "c")],
+        )
+        self.assertEqual([e["seq"] for e in self.db.list_battle_events("b1", after_seq=1, limit=1)], [2])
+        self.assertEqual(self.db.battle_event_seq("b1"), 3)
+        self.assertEqual(self.db.battle_event_seq("none"), 0)
+
+    def test_idempotency_keys_dedupe(self):
+        """Test events with a stored key, or repeated within the call, are skipped."""
+        self.db.append_battle_events("b1", [{"message": "a", "idempotency_key": "k1"}])
+        appended = self.db.append_battle_events("b1", [
+            {"message": "a again", "idempotency_key": "k1"},
+            {"message": "b", "idempotency_key": "k2"},
+            {"message": "b again", "idempotency_key": "k2"},
+            {"message": "no key"},
+        ])
+
+        self.assertEqual([(e["seq"], e["message"]) for e in appended], [(2, "b"), (3, "no key")])
+        self.assertEqual(len(self.db.list_battle_events("b1")), 3)
+        # Keys are scoped to their battle
+        self.assertEqual(
+            len(self.db.append_battle_events("b2", [{"message": "a", "idempotency_key": "k1"}])), 1
+        )
+
+    def test_prepare_runs_on_appended_events_only(self):
+        self.db.append_battle_events("b1", [{"message": "a", "idempotency_key": "k1"}])
+        prepared = []
+        self.db.append_battle_events(
+            "b1",
+            [{"message": "a", "idempotency_key": "k1"}, {"message": "b", "idempotency_key": "k2"}],
+            prepare=lambda event: prepared.append(event["message"]),
+        )
+        self.assertEqual(prepared, ["b"])
+
+    def test_rolled_back_events_free_their_seq(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.append_battle_events("b1", [{"message": "lost", "idempotency_key": "k1"}])
+                raise RuntimeError("boom")
+        appended = self.db.append_battle_events("b1", [{"message": "kept", "idempotency_key": "k1"}])
+        self.assertEqual([e["seq"] for e in appended], [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
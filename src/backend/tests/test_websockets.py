@@ -0,0 +1,400 @@
+"""
+Tests for the AgentBeats backend WebSocket broadcasts.
+"""
+
+import asyncio
+import json
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.routes import websockets
+from backend.routes.websockets import ClientChannel, WebSocketManager
+from backend.tests import use_temp_storage
+
+
+def _event(seq):
+    return {"seq": seq, "message": f"event {seq}"}
+
+
+class TestBattleDelta(unittest.TestCase):
+    """Test battle_delta only sends what changed since the last delta."""
+
+    def setUp(self):
+        """Serve battle events from a list instead of the database."""
+        self.events = []
+        patcher = patch.object(websockets, "db")
+        self.db = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.db.list_battle_events.side_effect = self.list_battle_events
+        self.db.battle_event_seq.side_effect = (
+            lambda battle_id: self.events[-1]["seq"] if self.events else 0
+        )
+        self.manager = WebSocketManager()
+
+    def list_battle_events(self, battle_id, after_seq=0):
+        # Reading events must not block publishers waiting on the lock
+        self.assertFalse(self.manager._lock.locked())
+        return [event for event in self.events if event["seq"] > after_seq]
+
+    def test_publish_after_finish_sends_nothing(self):
+        """Test publishing a finished battle again doesn't resend its history."""
+        self.events = [_event(1), _event(2)]
+        running = {"battle_id": "b1", "state": "running"}
+        finished = {"battle_id": "b1", "state": "finished"}
+
+        self.assertEqual(len(self.manager.battle_delta(running)["events"]), 2)
+        self.events.append(_event(3))
+        delta = self.manager.battle_delta(finished)
+        self.assertEqual([e["seq"] for e in delta["events"]], [3])
+        self.assertEqual(delta["changes"], {"state": "finished"})
+
+        self.assertIsNone(self.manager.battle_delta(finished))
+        self.assertEqual(self.db.list_battle_events.call_args[1]["after_seq"], 3)
+
+    def test_without_baseline_sends_latest_events(self):
+        """Test a battle with no previous delta doesn't resend its whole history."""
+        self.events = [_event(seq) for seq in range(1, 6)]
+        battle = {"battle_id": "b1", "state": "running"}
+        with patch.object(websockets, "MAX_REPLAY_EVENTS", 2):
+            delta = self.manager.battle_delta(battle)
+        self.assertEqual([e["seq"] for e in delta["events"]], [4, 5])
+        self.assertEqual(delta["seq"], 5)
+        self.assertEqual(delta["changes"], battle)
+
+        self.events.append(_event(6))
+        delta = self.manager.battle_delta(battle)
+        self.assertEqual([e["seq"] for e in delta["events"]], [6])
+        self.assertEqual(delta["changes"], {})
+
+    def test_finished_battles_forgotten_oldest_first(self):
+        """Test only the most recently finished battles are remembered."""
+        with patch.object(websockets, "FINISHED_SENT_SIZE", 2):
+            for battle_id in ("b1", "b2", "b3"):
+                self.manager.battle_delta({"battle_id": battle_id, "state": "finished"})
+            self.assertEqual(list(self.manager._finished_sent), ["b2", "b3"])
+            self.assertEqual(self.manager._sent, {})
+
+
+class TestSendBattleDelta(unittest.TestCase):
+    """Test who gets which part of a battle_delta."""
+
+    def setUp(self):
+        self.manager = WebSocketManager()
+        self.topics = {}
+        self.manager.subscribers = lambda topic: set(self.topics.get(topic, ()))
+        self.sent = []
+        self.manager._send_to = lambda clients, msg: self.sent.append((clients, json.loads(msg)))
+
+    def test_summary_delta_counts_events(self):
+        """Test summary subscribers get the event count instead of the events."""
+        self.topics = {websockets.SUMMARY_TOPIC: {"summary", "watcher"}, "battle:b1": {"watcher"}}
+        delta = {
+            "type": "battle_delta", "battle_id": "b1", "seq": 2,
+            "events": [_event(1), _event(2)], "changes": {},
+        }
+        self.manager._send_battle_delta(delta)
+
+        self.assertEqual(self.sent, [
+            ({"watcher"}, delta),
+            ({"summary"}, {**delta, "events": [], "changes": {"event_count": 2}}),
+        ])
+
+    def test_summary_delta_without_events(self):
+        """Test field changes reach summary subscribers without an event count."""
+        self.topics = {websockets.SUMMARY_TOPIC: {"summary"}}
+        self.manager._send_battle_delta({
+            "type": "battle_delta", "battle_id": "b1", "seq": 2,
+            "events": [], "changes": {"state": "finished"},
+        })
+        self.assertEqual(self.sent[0][1]["changes"], {"state": "finished"})
+
+
+class TestPublishBattle(unittest.TestCase):
+    """Test broadcasts of published battles."""
+
+    def setUp(self):
+        self.db = use_temp_storage(self, websockets)
+        self.manager = WebSocketManager(window=0, battle_frame_rate=0)
+        self.sent = []
+        self.manager._send_battle_delta = self.sent.append
+
+    def test_stale_copy_does_not_revert_state(self):
+        """Test publishing a copy read before the battle finished still broadcasts it finished."""
+        self.db.create("battles", {"battle_id": "b1", "state": "running"})
+        stale = self.db.read("battles", "b1")
+        self.db.update("battles", "b1", {"state": "finished"})
+
+        self.manager.publish_battle(self.db.read("battles", "b1"))
+        self.manager.publish_battle(stale)
+        asyncio.run(self.manager.flush())
+
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(self.sent[0]["changes"]["state"], "finished")
+        self.assertEqual(self.manager.pending(), 0)
+
+    def test_deleted_battle_sends_nothing(self):
+        """Test a battle deleted before the broadcast is skipped."""
+        self.manager.publish_battle({"battle_id": "gone", "state": "running"})
+        asyncio.run(self.manager.flush())
+        self.assertEqual(self.sent, [])
+
+
+class _Socket:
+    def __init__(self):
+        self.frames = []
+
+    async def send_text(self, text):
+        self.frames.append(text)
+
+
+class TestClientChannel(unittest.TestCase):
+    """Test frames are written in order."""
+
+    def test_release_sends_first_frames_before_held(self):
+        """Test frames built while the channel was held go before the frames held."""
+        async def run():
+            ws = _Socket()
+            channel = ClientChannel(ws)
+            channel.send("before")
+            channel.hold()
+            channel.send("live delta")
+            await asyncio.sleep(0.01)
+            channel.release(["subscribed", "replay"])
+            await asyncio.sleep(0.01)
+            channel.close()
+            return ws.frames
+
+        self.assertEqual(asyncio.run(run()), ["before", "subscribed", "replay", "live delta"])
+
+
+def _broadcast(manager, subscriptions, publish):
+    """Publish, flush and return the messages each subscribed socket got."""
+    async def run():
+        sockets = {}
+        for name, topics in subscriptions.items():
+            sockets[name] = _Socket()
+            manager.open_channel(sockets[name])
+            manager.subscribe(sockets[name], topics)
+        publish()
+        await manager.flush()
+        await asyncio.sleep(0.01)
+        for socket in sockets.values():
+            manager.remove_client(socket)
+        return {name: [json.loads(frame) for frame in socket.frames] for name, socket in sockets.items()}
+
+    return asyncio.run(run())
+
+
+class TestTopics(unittest.TestCase):
+    """Test clients only get the topics they subscribed to."""
+
+    def setUp(self):
+        self.db = use_temp_storage(self, websockets)
+        self.manager = WebSocketManager(window=0, battle_frame_rate=0)
+        for battle_id in ("b1", "b2"):
+            self.db.create("battles", {"battle_id": battle_id, "state": "running"})
+            self.db.append_battle_events(battle_id, [_event(1), _event(2)])
+
+    def broadcast(self, subscriptions, publish):
+        return _broadcast(self.manager, subscriptions, publish)
+
+    def publish_all(self):
+        for battle_id in ("b1", "b2"):
+            self.manager.publish_battle({"battle_id": battle_id})
+        self.manager.publish_agent_status("a1", {"ready": True})
+        self.manager.publish_battle_created({"battle_id": "b3", "state": "queued"}, queue_position=1)
+
+    def test_each_client_gets_its_topics(self):
+        received = self.broadcast({
+            "b1": [websockets.battle_topic("b1")],
+            "summary": [websockets.SUMMARY_TOPIC],
+            "agents": [websockets.AGENTS_TOPIC],
+            "nothing": [],
+        }, self.publish_all)
+
+        self.assertEqual(
+            [(msg["type"], msg["battle_id"], len(msg["events"])) for msg in received["b1"]],
+            [("battle_delta", "b1", 2)],
+        )
+        created, *deltas = received["summary"]
+        self.assertEqual((created["type"], created["battle"]["battle_id"]), ("battle_created", "b3"))
+        self.assertEqual(
+            sorted((msg["type"], msg["battle_id"]) for msg in deltas),
+            [("battle_delta", "b1"), ("battle_delta", "b2")],
+        )
+        self.assertTrue(all(not msg.get("events") for msg in received["summary"]))
+        self.assertEqual(received["agents"], [
+            {"type": "agent_delta", "agent_id": "a1", "changes": {"ready": True}},
+        ])
+        self.assertEqual(received["nothing"], [])
+
+    def test_battle_and_summary_subscriber_gets_full_delta_once(self):
+        received = self.broadcast(
+            {"both": [websockets.battle_topic("b2"), websockets.SUMMARY_TOPIC]},
+            lambda: self.manager.publish_battle({"battle_id": "b2"}),
+        )
+        self.assertEqual(len(received["both"]), 1)
+        self.assertEqual(len(received["both"][0]["events"]), 2)
+
+    def test_unsubscribed_topics_stop(self):
+        socket = _Socket()
+        self.manager.subscribe(socket, [websockets.battle_topic("b1"), websockets.SUMMARY_TOPIC])
+        self.assertEqual(
+            self.manager.unsubscribe(socket, [websockets.battle_topic("b1")]),
+            {websockets.SUMMARY_TOPIC},
+        )
+        self.assertEqual(self.manager.subscribers(websockets.battle_topic("b1")), set())
+        self.assertEqual(self.manager.unsubscribe(socket), set())
+        self.assertEqual(self.manager.subscribers(websockets.SUMMARY_TOPIC), set())
+
+
+class TestBattleCreated(unittest.TestCase):
+    """Test battle_created announcements."""
+
+    def setUp(self):
+        self.db = use_temp_storage(self, websockets)
+        self.manager = WebSocketManager(window=0, battle_frame_rate=0)
+        self.battle = self.db.create("battles", {
+            "battle_id": "b1",
+            "state": "queued",
+            "green_agent_id": "green",
+            "opponents": [{"name": "red_agent", "agent_id": "red"}],
+            "created_at": "2026-01-01T00:00:00Z",
+        })
+        self.battle["interact_history"] = []
+
+    def test_summary_with_queue_position(self):
+        received = _broadcast(
+            self.manager,
+            {"summary": [websockets.SUMMARY_TOPIC], "b1": [websockets.battle_topic("b1")]},
+            lambda: self.manager.publish_battle_created(self.battle, queue_position=3),
+        )
+        self.assertEqual(received["summary"], [{
+            "type": "battle_created",
+            "battle": {
+                "battle_id": "b1",
+                "state": "queued",
+                "green_agent_id": "green",
+                "opponents": [{"name": "red_agent", "agent_id": "red"}],
+                "winner": None,
+                "winner_agent_id": None,
+                "created_at": "2026-01-01T00:00:00Z",
+                "finish_time": None,
+                "event_count": 0,
+                "queue_position": 3,
+            },
+        }])
+        self.assertEqual(received["b1"], [])
+
+    def test_next_delta_only_carries_changes(self):
+        """Test the first delta of a new battle doesn't repeat what battle_created sent."""
+        self.manager.publish_battle_created(self.battle, queue_position=1)
+        self.db.update("battles", "b1", {"state": "running"})
+        received = _broadcast(
+            self.manager,
+            {"summary": [websockets.SUMMARY_TOPIC]},
+            lambda: self.manager.publish_battle({"battle_id": "b1"}),
+        )
+        delta = received["summary"][-1]
+        self.assertEqual((delta["type"], delta["changes"]), ("battle_delta", {"state": "running"}))
+
+
+class TestAgentDelta(unittest.TestCase):
+    """Test agent_delta messages of agent status changes."""
+
+    def setUp(self):
+        self.manager = WebSocketManager(window=0, battle_frame_rate=0)
+
+    def agent_deltas(self, *published):
+        def publish():
+            for agent_id, fields in published:
+                self.manager.publish_agent_status(agent_id, fields)
+        received = _broadcast(self.manager, {"agents": [websockets.AGENTS_TOPIC]}, publish)
+        return received["agents"]
+
+    def test_status_and_ready_changes(self):
+        """Test fields published in one window merge, and only status fields are sent."""
+        self.assertEqual(
+            self.agent_deltas(
+                ("a1", {"status": "locked", "elo": {"rating": 1000}}),
+                ("a1", {"ready": False}),
+                ("a2", {"agent_card": {}}),
+            ),
+            [{"type": "agent_delta", "agent_id": "a1", "changes": {"status": "locked", "ready": False}}],
+        )
+        self.assertEqual(
+            self.agent_deltas(("a1", {"status": "locked", "ready": True})),
+            [{"type": "agent_delta", "agent_id": "a1", "changes": {"ready": True}}],
+        )
+
+    def test_unchanged_status_is_not_resent(self):
+        self.agent_deltas(("a1", {"status": "unlocked", "ready": True, "live": True}))
+        self.assertEqual(self.agent_deltas(("a1", {"status": "unlocked", "live": True})), [])
+
+    def test_deletion(self):
+        """Test a deleted agent is announced, and starts afresh if it comes back."""
+        self.agent_deltas(("a1", {"status": "unlocked"}))
+        self.assertEqual(
+            self.agent_deltas(("a1", {"ready": True}), ("a1", {"deleted": True})),
+            [{"type": "agent_delta", "agent_id": "a1", "changes": {"deleted": True}}],
+        )
+        self.assertEqual(
+            self.agent_deltas(("a1", {"status": "unlocked"})),
+            [{"type": "agent_delta", "agent_id": "a1", "changes": {"status": "unlocked"}}],
+        )
+
+
+class TestBattlesSocket(unittest.TestCase):
+    """Test subscribing and resuming over /ws/battles."""
+
+    def setUp(self):
+        self.db = use_temp_storage(self, websockets)
+        patcher = patch.object(websockets, "websocket_manager", WebSocketManager())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.db.create("battles", {"battle_id": "b1", "state": "running"})
+        self.db.append_battle_events("b1", [_event(seq) for seq in range(1, 6)])
+        app = FastAPI()
+        app.include_router(websockets.router)
+        self.client = TestClient(app)
+
+    def subscribe(self, request):
+        """Subscribe and return the frames up to the reply to a ping sent after."""
+        with self.client.websocket_connect("/ws/battles") as ws:
+            self.assertEqual(ws.receive_json()["type"], "battle_summaries")
+            ws.send_json({"type": "subscribe", **request})
+            ws.send_json({"type": "ping"})
+            frames = []
+            while not frames or frames[-1]["type"] != "pong":
+                frames.append(ws.receive_json())
+            return frames[:-1]
+
+    def test_subscribe_without_resume(self):
+        frames = self.subscribe({"battle_ids": ["b1"], "summary": True})
+        self.assertEqual(frames, [{"type": "subscribed", "topics": ["battle:b1", "summary"]}])
+
+    def test_resume_replays_missed_events_only(self):
+        """Test a client resuming at seq 3 only gets events 4 and 5."""
+        subscribed, replay = self.subscribe({"battle_ids": ["b1"], "last_seq": {"b1": 3, "b2": 1}})
+        self.assertEqual(subscribed, {"type": "subscribed", "topics": ["battle:b1"]})
+        self.assertEqual(replay["type"], "battle_delta")
+        self.assertEqual([e["seq"] for e in replay["events"]], [4, 5])
+        self.assertEqual(replay["seq"], 5)
+        self.assertEqual(replay["changes"]["state"], "running")
+
+    def test_resume_up_to_date(self):
+        _, replay = self.subscribe({"battle_ids": ["b1"], "last_seq": {"b1": 5}})
+        self.assertEqual((replay["events"], replay["seq"]), ([], 5))
+
+    def test_resume_far_behind_gets_snapshot(self):
+        with patch.object(websockets, "MAX_REPLAY_EVENTS", 2):
+            _, snapshot = self.subscribe({"battle_ids": ["b1"], "last_seq": {"b1": 1}})
+        self.assertEqual(snapshot["type"], "battle_snapshot")
+        self.assertEqual(len(snapshot["battle"]["interact_history"]), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()